@@ -8,6 +8,9 @@ def create_database(datenbankname):
     connection = sqlite3.connect(datenbankname)
     cursor = connection.cursor()
 
+    # Freie Seiten schrittweise zurückgeben können (wirkt nur, solange noch keine Tabelle existiert)
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
     # Tabelle "Produkte" erstellen
     cursor.execute('''CREATE TABLE IF NOT EXISTS Produkt (
         P_ID INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -64,6 +67,109 @@ def create_database(datenbankname):
     );
     ''')
     
+    # Tabelle für bereits verarbeitete Anfragen der Kassen (Idempotenzschlüssel)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Kiosk_Anfrage (
+        Schluessel VARCHAR(100) PRIMARY KEY,
+        Antwort TEXT,
+        Datum DATE
+    );
+    ''')
+
+    # Prüfpunkt der Kontenprüfung: Summe aller bis Bis_TRANS_ID geprüften Buchungen je Konto
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Audit_Stand (
+        K_ID INTEGER PRIMARY KEY,
+        Summe DECIMAL(10, 2)
+    );
+    ''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Audit_Checkpoint (
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        Bis_TRANS_ID INT,
+        Datum DATE
+    );
+    ''')
+
+    # Letzte exportierte TRANS_ID je Exportformat für inkrementelle Exporte
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Export_Stand (
+        Format VARCHAR(20) PRIMARY KEY,
+        Bis_TRANS_ID INT,
+        Datum DATE
+    );
+    ''')
+
+    # Stündlich verdichtete Verkäufe je Produkt für die Verkaufsanalyse, fortgeschrieben bis Rollup_Stand.Bis_TRANS_ID
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Verkauf_Stunde (
+        Stunde VARCHAR(13),
+        P_ID INT,
+        Menge INT,
+        Umsatz DECIMAL(10, 2),
+        PRIMARY KEY (Stunde, P_ID)
+    );
+    ''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Rollup_Stand (
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        Bis_TRANS_ID INT,
+        Datum DATE
+    );
+    ''')
+
+    # Letzte Übertragsbuchung des Jahreswechsels; das Lagerjahr richtet sich nach den Buchungen danach
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Uebertrag_Stand (
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        Bis_TRANS_ID INT,
+        Datum DATE
+    );
+    ''')
+
+    # Lagerbestand je Produkt (wird bei jedem Kauf verringert) und gebuchte Wareneingänge
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Lagerbestand (
+        P_ID INTEGER PRIMARY KEY,
+        Bestand INT,
+        Meldebestand INT,
+        FOREIGN KEY (P_ID) REFERENCES Produkt(P_ID)
+    );
+    ''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Wareneingang (
+        WE_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        P_ID INT,
+        Menge INT,
+        Datum DATE,
+        FOREIGN KEY (P_ID) REFERENCES Produkt(P_ID)
+    );
+    ''')
+
+    # Einstellungen als Text; Typen, Standardwerte und Prüfung in EINSTELLUNGEN (Lagerbank.py)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Einstellungen (
+        Name VARCHAR(50) PRIMARY KEY,
+        Wert TEXT
+    );
+    ''')
+
+    # Höchstmenge je Produkt pro Teilnehmer und Tag; der Tagesbetrag steht in den Einstellungen
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Produktlimit (
+        P_ID INTEGER PRIMARY KEY,
+        Max_Menge INT,
+        FOREIGN KEY (P_ID) REFERENCES Produkt(P_ID)
+    );
+    ''')
+
+    # Preise mit Gültigkeitsbeginn, damit Preisänderungen frühere Käufe nicht umbewerten
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Preis_Historie (
+        PH_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        P_ID INT,
+        Preis DECIMAL(10, 2),
+        Gueltig_ab DATE,
+        FOREIGN KEY (P_ID) REFERENCES Produkt(P_ID)
+    );
+    ''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_preis_historie_produkt
+        ON Preis_Historie (P_ID, Gueltig_ab)
+    ''')
+
+    # Index für den seitenweisen Transaktionsverlauf pro Konto
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_transaktion_konto_datum
+        ON Transaktion (K_ID, Datum, TRANS_ID)
+    ''')
+
     cursor.execute('''INSERT INTO Teilnehmer (Name, TN_Barcode) VALUES ('Break', 'Break')''')
 
     # Verbindung schließen
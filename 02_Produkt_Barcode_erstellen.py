@@ -7,6 +7,9 @@ from tkinter import filedialog
 import pandas as pd
 import openpyxl 
 from openpyxl import load_workbook
+import csv
+from datetime import datetime
+import Barcode_Nummern
 
 
 def barcode_erstellen(datei):
@@ -25,23 +28,30 @@ def barcode_erstellen(datei):
         print(f"Fehler: {e}. Bitte installieren Sie die benötigte Bibliothek für die Verarbeitung von Excel-Dateien.")
         return
 
-    barcode_type = "code128"  # Änderung zu Code 128
+    barcode_type = "code128"  # Code 128; reine Ziffernfolgen codiert er im kompakten Zeichensatz C
+    neue_barcodes = Barcode_Nummern.naechste_barcodes(Barcode_Nummern.vergebene_barcodes(), Barcode_Nummern.ART_PRODUKT, len(df))
+    zuordnung = []
 
     # Schritt 3: Barcodes generieren und speichern
-    for index, row in df.iterrows():
-        # Zusammenführung von Vorname und Nachname zu einem eindeutigen String
+    for (index, row), barcode_data in zip(df.iterrows(), neue_barcodes):
         # Umlaute und Sonderzeichen umwandeln
         product_name = row['Product'].replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue')
 
-        barcode_data = product_name
         ean = barcode.get_barcode_class(barcode_type)
         barcode_instance = ean(barcode_data, writer=ImageWriter())
         
         # Den Barcode als Bilddatei speichern
-        output_file = f"barcode_{product_name}.png"
-        barcode_instance.save(output_file)
+        output_file = f"barcode_{product_name}"  # save() hängt die Endung selbst an
+        barcode_instance.save(output_file, text=product_name)  # Name als Klartext unter dem Code
+        zuordnung.append((row['Product'], barcode_data))
         print(f"Barcode für {product_name} wurde erstellt und gespeichert.")
 
+    # Zuordnung Name -> Barcode zum Eintragen in Lagerbank.py
+    # Eigene Datei je Lauf: sie reserviert die Nummern für den nächsten Lauf und wird nie überschrieben
+    with open(f"Barcodes_Produkte_{datetime.now():%Y%m%d_%H%M%S}.csv", "x", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Barcode"])
+        writer.writerows(zuordnung)
     print("Barcodes wurden erfolgreich erstellt und gespeichert.")
 
 
@@ -7,6 +7,9 @@ from tkinter import filedialog
 import pandas as pd
 import openpyxl 
 from openpyxl import load_workbook
+import csv
+from datetime import datetime
+import Barcode_Nummern
 
 
 def barcode_erstellen(datei):
@@ -25,24 +28,31 @@ def barcode_erstellen(datei):
         print(f"Fehler: {e}. Bitte installieren Sie die benötigte Bibliothek für die Verarbeitung von Excel-Dateien.")
         return
 
-    barcode_type = "code128"  # Änderung zu Code 128
+    barcode_type = "code128"  # Code 128; reine Ziffernfolgen codiert er im kompakten Zeichensatz C
+    neue_barcodes = Barcode_Nummern.naechste_barcodes(Barcode_Nummern.vergebene_barcodes(), Barcode_Nummern.ART_TEILNEHMER, len(df))
+    zuordnung = []
 
     # Schritt 3: Barcodes generieren und speichern
-    for index, row in df.iterrows():
-        # Zusammenführung von Vorname und Nachname zu einem eindeutigen String
+    for (index, row), barcode_data in zip(df.iterrows(), neue_barcodes):
         # Umlaute und Sonderzeichen umwandeln
         vorname = row['Vorname'].replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue')
         nachname = row['Nachname'].replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue')
 
-        barcode_data = vorname + nachname
         ean = barcode.get_barcode_class(barcode_type)
         barcode_instance = ean(barcode_data, writer=ImageWriter())
         
         # Den Barcode als Bilddatei speichern
-        output_file = f"barcode_{vorname}_{nachname}.png"
-        barcode_instance.save(output_file)
+        output_file = f"barcode_{vorname}_{nachname}"  # save() hängt die Endung selbst an
+        barcode_instance.save(output_file, text=f"{vorname} {nachname}")  # Name als Klartext unter dem Code
+        zuordnung.append((f"{row['Vorname']} {row['Nachname']}", barcode_data))
         print(f"Barcode für {vorname} {nachname} wurde erstellt und gespeichert.")
 
+    # Zuordnung Name -> Barcode zum Eintragen in Lagerbank.py
+    # Eigene Datei je Lauf: sie reserviert die Nummern für den nächsten Lauf und wird nie überschrieben
+    with open(f"Barcodes_Teilnehmer_{datetime.now():%Y%m%d_%H%M%S}.csv", "x", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Barcode"])
+        writer.writerows(zuordnung)
     print("Barcodes wurden erfolgreich erstellt und gespeichert.")
 
 
@@ -0,0 +1,97 @@
+# Kurze numerische Barcodes für Teilnehmer und Produkte, gemeinsam genutzt von den Barcode-Skripten und Lagerbank.py
+# Aufbau: Art (1 = Teilnehmer, 2 = Produkt), vierstellige laufende Nummer, Prüfziffer nach Luhn.
+# Sechs Ziffern codiert Code128 im Zeichensatz C in nur drei Symbolen; das Etikett bleibt kurz und wird schnell erkannt.
+import csv
+import glob
+import os
+import re
+import sqlite3
+from typing import List
+
+ART_TEILNEHMER = "1"
+ART_PRODUKT = "2"
+NUMMER_STELLEN = 4
+BARCODE_LAENGE = 1 + NUMMER_STELLEN + 1
+DB_NAME = "02_Lagerbank2024.db"  # Gleiche Datenbank wie Lagerbank.py
+
+def pruefziffer(ziffern: str) -> str:
+    # Luhn: erkennt jede einzelne falsche Ziffer und fast alle Vertauschungen benachbarter Ziffern
+    summe = 0
+    for i, ziffer in enumerate(reversed(ziffern)):
+        wert = int(ziffer)
+        if i % 2 == 0:  # Von rechts jede zweite Ziffer verdoppeln, beginnend mit der letzten
+            wert *= 2
+            if wert > 9:
+                wert -= 9
+        summe += wert
+    return str((10 - summe % 10) % 10)
+
+def barcode_bilden(art: str, nummer: int) -> str:
+    if not 0 < nummer < 10 ** NUMMER_STELLEN:
+        raise ValueError(f"Nummer {nummer} liegt außerhalb des Nummernkreises")
+    ziffern = f"{art}{nummer:0{NUMMER_STELLEN}d}"
+    return ziffern + pruefziffer(ziffern)
+
+def normalisieren(wert: str) -> str:
+    # Gleiche Form beim Erzeugen und beim Nachschlagen: Handscanner hängen oft Enter oder Tab an,
+    # von Hand eingegebene Nummern enthalten manchmal Leerzeichen oder Bindestriche
+    wert = (wert or "").strip()
+    ziffern = re.sub(r"[\s-]", "", wert)
+    return ziffern if ziffern.isdigit() else wert
+
+def ist_nummer(wert: str) -> bool:
+    # Hat die Form eines Barcodes aus diesem Nummernkreis (unabhängig von der Prüfziffer)
+    return len(wert) == BARCODE_LAENGE and wert.isdigit() and wert[0] in (ART_TEILNEHMER, ART_PRODUKT)
+
+def zulaessig(wert: str) -> bool:
+    # Falsch gelesene Nummern (Prüfziffer passt nicht) verwerfen; ältere Namens-Barcodes und EAN bleiben gültig
+    return not ist_nummer(wert) or pruefziffer(wert[:-1]) == wert[-1]
+
+def art_von(wert: str) -> str:
+    return wert[0] if ist_nummer(wert) and zulaessig(wert) else None
+
+def vorhandene_barcodes(verbindung: sqlite3.Connection) -> set:
+    # Alle vergebenen Teilnehmer- und Produktbarcodes, normalisiert
+    vorhanden = set()
+    for sql in ("SELECT TN_Barcode FROM Teilnehmer", "SELECT P_Barcode FROM Produkt", "SELECT Barcode FROM Produkt_Barcode"):
+        try:
+            vorhanden.update(normalisieren(str(zeile[0])) for zeile in verbindung.execute(sql) if zeile[0] is not None)
+        except sqlite3.OperationalError:
+            pass  # Tabelle existiert in einer neuen Datenbank noch nicht
+    return vorhanden
+
+def reservierte_barcodes(verzeichnis: str = ".") -> set:
+    # Von den Barcode-Skripten schon ausgegebene, aber evtl. noch nicht eingetragene Nummern (Barcodes_*.csv)
+    reserviert = set()
+    for pfad in glob.glob(os.path.join(verzeichnis, "Barcodes_*.csv")):
+        try:
+            with open(pfad, newline="", encoding="utf-8") as f:
+                reserviert.update(normalisieren(zeile.get("Barcode")) for zeile in csv.DictReader(f) if zeile.get("Barcode"))
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            print(f"Fehler beim Lesen von {pfad}: {e}")
+    return reserviert
+
+def vergebene_barcodes(db_name: str = DB_NAME, verzeichnis: str = ".") -> set:
+    # Schon vergebene Barcodes aus der Datenbank und aus früheren Läufen (Barcodes_*.csv),
+    # damit jede Nummer genau einem Datensatz gehört, auch wenn die CSV noch nicht eingetragen ist
+    vergeben = reservierte_barcodes(verzeichnis)
+    if not os.path.exists(db_name):
+        return vergeben
+    verbindung = sqlite3.connect(db_name)
+    try:
+        return vergeben | vorhandene_barcodes(verbindung)
+    finally:
+        verbindung.close()
+
+def naechste_barcodes(vorhanden: set, art: str, anzahl: int = 1) -> List[str]:
+    # Vergibt die nächsten freien Nummern hinter der höchsten vergebenen und prüft jede gegen "vorhanden"
+    nummern = [int(wert[1:-1]) for wert in vorhanden if art_von(wert) == art]
+    nummer = max(nummern, default=0)
+    neue = []
+    while len(neue) < anzahl:
+        nummer += 1
+        barcode = barcode_bilden(art, nummer)  # Wirft ValueError, wenn der Nummernkreis erschöpft ist
+        if barcode not in vorhanden:
+            neue.append(barcode)
+    vorhanden.update(neue)  # Auch innerhalb eines Durchlaufs keine Nummer doppelt vergeben
+    return neue
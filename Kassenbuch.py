@@ -0,0 +1,588 @@
+# Kassenbuch ohne Oberfläche: Datenbankzugriff, Änderungsereignisse, Einstellungen, Ausgabenlimits und Buchungen.
+# Gemeinsam genutzt von Lagerbank.py und dem Kassenserver; braucht weder Kamera noch tkinter und lässt sich daher allein testen.
+import re
+import json
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from time import monotonic, perf_counter
+from typing import List, Tuple, Callable
+
+import Barcode_Nummern
+
+DB_NAME = "02_Lagerbank2024.db"  # Definiert den Namen der Datenbank
+
+LATENZ_PLAETZE = 1000  # Gespeicherte Messwerte je Stufe für die Perzentile im Diagnose-Tab
+
+# Arten von Änderungsereignissen, die nach Schreibvorgängen veröffentlicht werden
+TEILNEHMER_HINZUGEFUEGT = "teilnehmer_hinzugefuegt"  # daten: name, barcode
+TEILNEHMER_GEAENDERT = "teilnehmer_geaendert"  # daten: alt, name, barcode
+TEILNEHMER_GELOESCHT = "teilnehmer_geloescht"  # daten: name
+TEILNEHMER_AUSGECHECKT = "teilnehmer_ausgecheckt"  # daten: namen
+PRODUKT_HINZUGEFUEGT = "produkt_hinzugefuegt"  # daten: name, barcode
+PRODUKT_GEAENDERT = "produkt_geaendert"  # daten: alt, name, barcode (optional), preis (optional)
+PRODUKT_GELOESCHT = "produkt_geloescht"  # daten: name
+KONTOSTAND_GEAENDERT = "kontostand_geaendert"  # daten: k_id oder name
+TABELLE_GEAENDERT = "tabelle_geaendert"  # daten: tabelle; für Schreibvorgänge ohne eigenes Ereignis
+DATENBANK_GEAENDERT = "datenbank_geaendert"  # Änderung durch einen anderen Prozess oder Löschen der Datenbank
+LAGERBESTAND_GEAENDERT = "lagerbestand_geaendert"  # daten: p_id; Wareneingang oder geänderter Meldebestand
+EINSTELLUNG_GEAENDERT = "einstellung_geaendert"  # daten: name, wert
+
+TEILNEHMER_EREIGNISSE = (TEILNEHMER_HINZUGEFUEGT, TEILNEHMER_GEAENDERT, TEILNEHMER_GELOESCHT)
+PRODUKT_EREIGNISSE = (PRODUKT_HINZUGEFUEGT, PRODUKT_GEAENDERT, PRODUKT_GELOESCHT)
+
+class AenderungsBus:
+    # Einfache Publish/Subscribe-Schicht, damit nur die betroffenen Widgets neu geladen werden
+    def __init__(self):
+        self._abonnenten = {}  # Ereignisart -> Liste von Callbacks (art, daten)
+
+    def abonnieren(self, callback: Callable, *arten: str):
+        for art in arten:
+            self._abonnenten.setdefault(art, []).append(callback)
+
+    def abbestellen(self, callback: Callable):
+        for callbacks in self._abonnenten.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def veroeffentlichen(self, art: str, **daten):
+        print(f"Ereignis: {art} {daten}")
+        for callback in list(self._abonnenten.get(art, ())):
+            try:
+                callback(art, daten)
+            except Exception as e:
+                # Ein fehlerhafter Abonnent darf den Schreibvorgang nicht abbrechen
+                print(f"Fehler im Abonnenten für {art}: {e}")
+
+class DatenbankGesperrt(Exception):
+    # Datenbank ist gesperrt oder nicht erreichbar (z.B. während Backup, VACUUM oder bei I/O-Fehlern)
+    pass
+
+# Primäre SQLite-Fehlercodes, bei denen ein späterer Versuch gelingen kann; alle anderen (z.B. fehlende Tabelle) bleiben Fehler
+GESPERRT_FEHLERCODES = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED, sqlite3.SQLITE_IOERR)
+
+def ist_gesperrt(e: sqlite3.Error) -> bool:
+    return (getattr(e, "sqlite_errorcode", None) or 0) & 0xFF in GESPERRT_FEHLERCODES  # Erweiterte Codes tragen den primären im unteren Byte
+
+class Latenzmessung:
+    # Laufzeiten je Stufe in begrenzten Ringpuffern; Perzentile werden erst beim Anzeigen berechnet
+    def __init__(self):
+        self._lock = threading.Lock()  # Spool-Thread und GUI messen gleichzeitig
+        self._werte = {}  # Stufe -> deque der letzten Laufzeiten in Sekunden
+        self._anzahl = {}  # Stufe -> Anzahl aller Messungen
+        self._start = monotonic()
+
+    def erfassen(self, stufe: str, dauer: float):
+        with self._lock:
+            self._werte.setdefault(stufe, deque(maxlen=LATENZ_PLAETZE)).append(dauer)
+            self._anzahl[stufe] = self._anzahl.get(stufe, 0) + 1
+
+    @contextmanager
+    def messen(self, stufe: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.erfassen(stufe, perf_counter() - start)
+
+    def gemessen(self, stufe: str):
+        # Dekorator für Funktionen, deren Laufzeit als Stufe erfasst werden soll
+        def dekorator(funktion):
+            def wrapper(*args, **kwargs):
+                with self.messen(stufe):
+                    return funktion(*args, **kwargs)
+            return wrapper
+        return dekorator
+
+    def statistik(self) -> List[tuple]:
+        # Liefert (Stufe, Anzahl, pro Minute, p50, p95, p99) mit Zeiten in Millisekunden
+        with self._lock:
+            werte = {stufe: list(dauern) for stufe, dauern in self._werte.items()}
+            anzahl = dict(self._anzahl)
+        import numpy as np  # Nur für die Anzeige im Diagnose-Tab; Buchungen kommen ohne numpy aus
+        minuten = max((monotonic() - self._start) / 60, 1 / 60)
+        zeilen = []
+        for stufe in sorted(werte):
+            p50, p95, p99 = np.percentile(np.array(werte[stufe]) * 1000, [50, 95, 99])
+            zeilen.append((stufe, anzahl[stufe], anzahl[stufe] / minuten, p50, p95, p99))
+        return zeilen
+
+_latenzen = Latenzmessung()
+
+class Abfrageergebnis:
+    # Schlankes Ergebnis für Tabellenansichten: Spaltennamen einmal, Zeilen als Tupel direkt vom sqlite3-Cursor
+    __slots__ = ("spalten", "zeilen")
+
+    def __init__(self, spalten: List[str], zeilen: List[Tuple]):
+        self.spalten = spalten
+        self.zeilen = zeilen
+
+    def spalte(self, name: str) -> int:
+        return self.spalten.index(name)
+
+class Database:
+    def __init__(self, nur_lesen: bool = False):
+        if nur_lesen:
+            # Nur lesend, z.B. für die Kontoanzeige: diese Verbindung kann das Kassenbuch nicht verändern.
+            # Ohne implizites BEGIN hält sie nach einer Abfrage keine Sperre, die Käufe der Kasse aufhalten könnte.
+            self.connection = sqlite3.connect(f"file:{DB_NAME}?mode=ro", uri=True, isolation_level=None)
+        else:
+            self.connection = sqlite3.connect(DB_NAME)  # Stellt eine Verbindung zur SQLite-Datenbank her
+        self.cursor = self.connection.cursor()  # Erstellt ein Cursor-Objekt, um SQL-Befehle auszuführen
+        self.bus = AenderungsBus()  # Verteilt Änderungsereignisse nach Schreibvorgängen
+        self._data_version = self._lese_data_version()
+        
+    def __enter__(self):
+        return self  # Unterstützung für den Kontextmanager (with-Anweisung)
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.connection.close()  # Stellt sicher, dass die Datenbankverbindung beim Verlassen des Kontexts geschlossen wird
+        
+    def execute_select(self, query: str, values: tuple = ()) -> List[Tuple]:
+        try:
+            print(f"Executing SELECT query: {query} with values: {values}")
+            with _latenzen.messen("SQL: " + " ".join(query.split())[:70]):  # Jede Abfrage als eigene Stufe im Diagnose-Tab
+                self.cursor.execute(query, values)
+                return self.cursor.fetchall()  # Ruft alle Zeilen vom letzten ausgeführten Befehl ab und gibt sie zurück
+        except sqlite3.Error as e:
+            print(f"Error executing select: {e}")
+            raise Exception(f"Error executing select: {e}")
+
+    def execute_select_tabelle(self, query: str, values: tuple = ()) -> Abfrageergebnis:
+        # Wie execute_select, zusätzlich mit den Spaltennamen für Treeview-Überschriften
+        zeilen = self.execute_select(query, values)
+        return Abfrageergebnis([desc[0] for desc in self.cursor.description], zeilen)
+        
+    def execute_insert(self, query: str, values: tuple, ereignis: Tuple[str, dict] = None) -> int:
+        try:
+            print(f"Executing INSERT query: {query} with values: {values}")
+            self.cursor.execute(query, values)
+            self.connection.commit()  # Führt die Transaktion aus
+            last_row_id = self.cursor.lastrowid  # Ruft die ID der zuletzt eingefügten Zeile ab
+            if last_row_id is None:
+                raise Exception("Keine Zeile eingefügt, lastrowid ist None")
+        except sqlite3.Error as e:
+            print(f"Fehler beim Ausführen der Einfügung: {e}")
+            raise Exception("Fehler beim Ausführen der Einfügung")
+        self._melde_aenderung(query, ereignis)
+        return last_row_id
+    
+    def execute_update(self, query: str, values: tuple, ereignis: Tuple[str, dict] = None) -> int:
+        try:
+            print(f"Executing UPDATE query: {query} with values: {values}")
+            self.cursor.execute(query, values)
+            self.connection.commit()  # Führt die Transaktion aus
+            rowcount = self.cursor.rowcount  # Anzahl der betroffenen Zeilen
+        except sqlite3.Error as e:
+            print(f"Error executing update: {e}")
+            raise Exception(f"Error executing update: {e}")
+        self._melde_aenderung(query, ereignis)
+        return rowcount  # Gibt die Anzahl der betroffenen Zeilen zurück
+        
+    def execute_delete(self, query: str, values: tuple, ereignis: Tuple[str, dict] = None) -> int:
+        try:
+            print(f"Executing DELETE query: {query} with values: {values}")
+            self.cursor.execute(query, values)
+            self.connection.commit()  # Führt die Transaktion aus
+            rowcount = self.cursor.rowcount  # Anzahl der betroffenen Zeilen
+        except sqlite3.Error as e:
+            print(f"Error executing delete: {e}")
+            raise Exception(f"Error executing delete: {e}")
+        self._melde_aenderung(query, ereignis)
+        return rowcount  # Gibt die Anzahl der betroffenen Zeilen zurück
+
+    def _melde_aenderung(self, query: str, ereignis: Tuple[str, dict] = None):
+        # Veröffentlicht das typisierte Ereignis oder, falls keines angegeben ist, die geänderte Tabelle
+        if ereignis is not None:
+            art, daten = ereignis
+            self.bus.veroeffentlichen(art, **daten)
+            return
+        treffer = re.match(r"\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(\w+)", query, re.IGNORECASE)
+        if treffer:
+            self.bus.veroeffentlichen(TABELLE_GEAENDERT, tabelle=treffer.group(1))
+
+    def melde(self, art: str, **daten):
+        # Für Schreibvorgänge, die direkt über transaction() laufen
+        self.bus.veroeffentlichen(art, **daten)
+
+    def _lese_data_version(self) -> int:
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def pruefe_externe_aenderungen(self) -> bool:
+        # PRAGMA data_version ändert sich nur, wenn ein anderer Prozess die Datenbank geschrieben hat
+        data_version = self._lese_data_version()
+        if data_version == self._data_version:
+            return False
+        self._data_version = data_version
+        self.bus.veroeffentlichen(DATENBANK_GEAENDERT, extern=True)
+        return True
+        
+    @contextmanager
+    def transaction(self):
+        # Mehrere Befehle über den Cursor ausführen und gemeinsam festschreiben oder zurückrollen
+        try:
+            yield self.cursor
+            with _latenzen.messen("Commit"):
+                self.connection.commit()
+        except sqlite3.Error as e:
+            try:
+                self.connection.rollback()
+            except sqlite3.Error:
+                pass  # Bei I/O-Fehlern kann auch das Zurückrollen scheitern
+            print(f"Error executing transaction: {e}")
+            if ist_gesperrt(e):
+                raise DatenbankGesperrt(f"Error executing transaction: {e}") from e
+            raise Exception(f"Error executing transaction: {e}")
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def delete_database(self):
+        try:
+            # Führt SQL-Befehle aus, um Tabellen zu löschen, falls sie existieren; alle auf einmal,
+            # sonst verweisen übrig gebliebene Zeilen (Preise, Bestände, Stände) auf neu vergebene IDs
+            for tabelle in DATENBANK_TABELLEN:
+                self.cursor.execute(f"DROP TABLE IF EXISTS {tabelle}")
+            self.connection.commit()  # Führt die Transaktion aus
+        except sqlite3.Error as e:
+            print(f"Error deleting database: {e}")
+            raise Exception(f"Error deleting database: {e}")
+        self.bus.veroeffentlichen(DATENBANK_GEAENDERT, extern=False)
+
+# Alle Tabellen aus 02_DB_erstellen.py; "Datenbank löschen" entfernt sie vollständig
+DATENBANK_TABELLEN = ("Produkt", "Teilnehmer", "Konto", "Transaktion", "Produkt_Barcode", "Kiosk_Anfrage",
+                      "Audit_Stand", "Audit_Checkpoint", "Export_Stand", "Verkauf_Stunde", "Rollup_Stand",
+                      "Uebertrag_Stand", "Lagerbestand", "Wareneingang", "Einstellungen", "Produktlimit", "Preis_Historie")
+# Beim Jahreswechsel geleerte Tabellen; Teilnehmer, Konten, Produkte, Barcodes, Limits und Lagerbestände bleiben erhalten
+JAHRESWECHSEL_LEEREN = ("Transaktion", "Kiosk_Anfrage", "Audit_Stand", "Audit_Checkpoint", "Export_Stand",
+                        "Verkauf_Stunde", "Rollup_Stand", "Wareneingang", "Preis_Historie")
+
+##### Einstellungen #####
+
+SCANNER_PROZESS = True  # Kamera und Dekodierung in einem eigenen Prozess ausführen, damit sie nicht mit der GUI um die GIL konkurrieren
+
+# Name -> (Typ, Standardwert, Minimum, Beschriftung); Werte werden als Text in der Tabelle Einstellungen gespeichert
+EINSTELLUNGEN = {
+    "ErsterTag": ("datum", None, None, "Erster Tag (JJJJ-MM-TT)"),
+    "Lagerdauer": ("ganzzahl", 14, 1, "Lagerdauer (Tage)"),
+    "Tageslimit": ("betrag", None, 0, "Tageslimit pro Teilnehmer (€, leer = keins)"),
+    "ScannerProzess": ("bool", SCANNER_PROZESS, None, "Scanner in eigenem Prozess (ja/nein)"),
+    "Kamera": ("ganzzahl", 0, 0, "Kamera-Index"),
+    "ScanSperrzeit": ("ganzzahl", 1500, 0, "Sperrzeit für denselben Barcode (ms)"),
+    "MengeAbfragen": ("bool", False, None, "Menge nach jedem Produktscan abfragen (ja/nein)"),
+    "AnzeigeKamera": ("ganzzahl", -1, -1, "Kamera der Kontoanzeige (-1 = nur Handscanner)"),
+    "BackupIntervall": ("ganzzahl", 0, 0, "Automatisches Backup alle ... Minuten (0 = aus)"),
+    "BackupVerzeichnis": ("text", "Backup", None, "Backup-Verzeichnis"),
+    "BackupAnzahl": ("ganzzahl", 10, 1, "Aufbewahrte automatische Backups"),
+}
+
+class Einstellungswerte:
+    # Typisierte Einstellungen; ein Attribut pro Eintrag in EINSTELLUNGEN
+    __slots__ = tuple(EINSTELLUNGEN)
+
+    def __init__(self, gespeichert: dict = None):
+        gespeichert = gespeichert or {}
+        for name, (typ, standard, minimum, beschriftung) in EINSTELLUNGEN.items():
+            wert = standard
+            if gespeichert.get(name) not in (None, ""):
+                try:
+                    wert = einstellung_lesen(name, gespeichert[name])
+                except ValueError as e:
+                    print(f"Ungültige Einstellung {name}, verwende Standardwert: {e}")
+            setattr(self, name, wert)
+
+    @property
+    def letzter_tag(self):
+        # None, solange kein Lagerbeginn eingetragen ist
+        if self.ErsterTag is None:
+            return None
+        return self.ErsterTag + timedelta(days=self.Lagerdauer)
+
+def einstellung_lesen(name: str, text: str):
+    # Wandelt den gespeicherten Text in den Typ der Einstellung um; wirft ValueError bei ungültigen Werten
+    if name not in EINSTELLUNGEN:
+        raise ValueError(f"Unbekannte Einstellung {name}")
+    typ, standard, minimum = EINSTELLUNGEN[name][:3]
+    text = str(text).strip()
+    if text == "":
+        return standard
+    if typ == "datum":
+        return datetime.strptime(text, '%Y-%m-%d').date()
+    if typ == "bool":
+        if text.lower() in ("1", "ja", "true", "an"):
+            return True
+        if text.lower() in ("0", "nein", "false", "aus"):
+            return False
+        raise ValueError("ja oder nein erwartet")
+    if typ == "text":
+        return text
+    wert = int(text) if typ == "ganzzahl" else round(float(text.replace(",", ".")), 2)
+    if minimum is not None and wert < minimum:
+        raise ValueError(f"mindestens {minimum}")
+    return wert
+
+def einstellung_als_text(name: str, wert) -> str:
+    if wert is None:
+        return ""
+    typ = EINSTELLUNGEN[name][0]
+    if typ == "datum":
+        return f"{wert:%Y-%m-%d}"
+    if typ == "bool":
+        return "ja" if wert else "nein"
+    if typ == "betrag":
+        return f"{wert:.2f}"
+    return str(wert)
+
+class Einstellungsspeicher:
+    # Lädt die Einstellungen einmal und hält sie bis zum nächsten Schreibvorgang im Speicher
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._werte = None
+
+    def ungueltig(self):
+        self._werte = None
+
+    def laden(self, cursor: sqlite3.Cursor) -> Einstellungswerte:
+        with self._lock:
+            if self._werte is None:
+                self._werte = Einstellungswerte(dict(cursor.execute("SELECT Name, Wert FROM Einstellungen").fetchall()))
+            return self._werte
+
+    def aktuell(self) -> Einstellungswerte:
+        # Zuletzt geladene Werte ohne Datenbankzugriff; im Kassenmodus ohne Datenbank die Standardwerte
+        werte = self._werte
+        return werte if werte is not None else Einstellungswerte()
+
+_einstellungen = Einstellungsspeicher()
+
+def get_einstellungen(db: Database) -> Einstellungswerte:
+    return _einstellungen.laden(db.cursor)
+
+def abonniere_einstellungen(db: Database):
+    _einstellungen.laden(db.cursor)
+    db.bus.abonnieren(lambda art, daten: _einstellungen.ungueltig(), DATENBANK_GEAENDERT)
+
+def setze_einstellung(db: Database, name: str, text: str):
+    # Prüft den Wert, speichert ihn als Text und verwirft den Zwischenspeicher; leer setzt den Standardwert
+    wert = einstellung_lesen(name, text)
+    with db.transaction() as cursor:
+        if str(text).strip() == "":
+            cursor.execute("DELETE FROM Einstellungen WHERE Name = ?", (name,))
+        else:
+            cursor.execute("INSERT INTO Einstellungen (Name, Wert) VALUES (?, ?) ON CONFLICT (Name) DO UPDATE SET Wert = excluded.Wert",
+                           (name, einstellung_als_text(name, wert)))
+    _einstellungen.ungueltig()
+    if name == "Tageslimit":
+        _ausgabenlimits.ungueltig()
+    db.bus.veroeffentlichen(EINSTELLUNG_GEAENDERT, name=name, wert=wert)
+    return wert
+
+class AusgabenlimitUeberschritten(ValueError):
+    pass
+
+class Ausgabenlimits:
+    # Laufende Tagessummen je Konto im Speicher, damit die Limitprüfung beim Scannen keine zusätzliche Abfrage braucht.
+    # Nach zurückgerollten Transaktionen oder Schreibvorgängen anderer Prozesse werden die Summen neu aus dem Kassenbuch geladen.
+    def __init__(self):
+        self._lock = threading.Lock()  # Kasse und Spool-Thread buchen gleichzeitig
+        self._geladen = False
+        self._tag = None
+        self.tagesbetrag = None  # Höchstbetrag in Euro pro Teilnehmer und Tag, None = unbegrenzt
+        self.produktlimits = {}  # P_ID -> Höchstmenge pro Teilnehmer und Tag
+        self._betraege = {}  # K_ID -> heute ausgegebener Betrag
+        self._mengen = {}  # (K_ID, P_ID) -> heute gekaufte Menge
+
+    def ungueltig(self):
+        self._geladen = False
+
+    def laden(self, cursor: sqlite3.Cursor):
+        with self._lock:
+            self._laden(cursor)
+
+    def _laden(self, cursor: sqlite3.Cursor):
+        self.tagesbetrag = _einstellungen.laden(cursor).Tageslimit
+        self.produktlimits = dict(cursor.execute("SELECT P_ID, Max_Menge FROM Produktlimit").fetchall())
+        # Käufe seit Mitternacht (Ortszeit); Datum ist in UTC gespeichert
+        zeilen = cursor.execute(f"""SELECT T.K_ID, T.P_ID, SUM(T.Menge), SUM(T.Menge * {PREIS_SQL})
+                                   FROM Transaktion T JOIN Produkt P ON P.P_ID = T.P_ID
+                                   WHERE T.Typ = 'Kauf' AND T.Datum >= datetime('now', 'localtime', 'start of day', 'utc')
+                                   GROUP BY T.K_ID, T.P_ID""").fetchall()
+        self._betraege, self._mengen = {}, {}
+        for k_id, p_id, menge, betrag in zeilen:
+            self._mengen[(k_id, p_id)] = menge
+            self._betraege[k_id] = self._betraege.get(k_id, 0.0) + betrag
+        self._tag = datetime.now().date()
+        self._geladen = True
+
+    def pruefen_und_verbuchen(self, cursor: sqlite3.Cursor, k_id: int, p_id: int, preis: float, menge: int, pruefen: bool = True,
+                              datum: str = None):
+        # Wirft AusgabenlimitUeberschritten, bevor der Kauf eingefügt wird; sonst wird er zur Tagessumme addiert.
+        # "datum" (UTC wie Transaktion.Datum) gehört zu nachgebuchten Käufen; nur Käufe von heute zählen zur Tagessumme.
+        with self._lock:
+            if not self._geladen:
+                self._laden(cursor)
+            elif self._tag != datetime.now().date():
+                self._betraege, self._mengen, self._tag = {}, {}, datetime.now().date()  # Neuer Tag beginnt bei null
+            if datum is not None and datetime.strptime(datum, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).astimezone().date() != self._tag:
+                return
+            menge_heute = self._mengen.get((k_id, p_id), 0) + menge
+            betrag_heute = self._betraege.get(k_id, 0.0) + preis * menge
+            if pruefen:
+                max_menge = self.produktlimits.get(p_id)
+                if max_menge is not None and menge_heute > max_menge:
+                    raise AusgabenlimitUeberschritten(f"Tageslimit für dieses Produkt erreicht (höchstens {max_menge} Stück pro Tag)")
+                if self.tagesbetrag is not None and betrag_heute > self.tagesbetrag + PRUEF_TOLERANZ:
+                    raise AusgabenlimitUeberschritten(f"Tageslimit von {self.tagesbetrag:.2f} € erreicht "
+                                                      f"(heute bereits {self._betraege.get(k_id, 0.0):.2f} € ausgegeben)")
+            self._mengen[(k_id, p_id)] = menge_heute
+            self._betraege[k_id] = betrag_heute
+
+_ausgabenlimits = Ausgabenlimits()
+
+def abonniere_ausgabenlimits(db: Database):
+    # Tagessummen beim Start aus dem Kassenbuch aufwärmen und nach Änderungen anderer Prozesse neu laden
+    _ausgabenlimits.laden(db.cursor)
+    db.bus.abonnieren(lambda art, daten: _ausgabenlimits.ungueltig(), DATENBANK_GEAENDERT)
+
+def setze_tageslimit(db: Database, betrag: float = None):
+    # None entfernt das Limit
+    setze_einstellung(db, "Tageslimit", "" if betrag is None else str(betrag))
+
+def setze_produktlimit(db: Database, produkt: str, max_menge: int = None):
+    # None entfernt das Limit für das Produkt
+    if max_menge is not None and max_menge < 0:
+        raise ValueError("Ungültige Menge!")
+    with db.transaction() as cursor:
+        P_ID = cursor.execute("SELECT P_ID FROM Produkt WHERE Beschreibung = ?", (produkt,)).fetchone()
+        if P_ID is None:
+            raise ValueError(f"Produkt {produkt} nicht gefunden")
+        if max_menge is None:
+            cursor.execute("DELETE FROM Produktlimit WHERE P_ID = ?", (P_ID[0],))
+        else:
+            cursor.execute("INSERT INTO Produktlimit (P_ID, Max_Menge) VALUES (?, ?) ON CONFLICT (P_ID) DO UPDATE SET Max_Menge = excluded.Max_Menge",
+                           (P_ID[0], max_menge))
+    _ausgabenlimits.ungueltig()
+
+def buche_kauf(cursor: sqlite3.Cursor, TN_Barcode: str, P_Barcode: str, menge: int, datum: str = None, limits_pruefen: bool = True) -> Tuple[int, int]:
+    # Bucht einen Kauf über den übergebenen Cursor, ohne festzuschreiben; liefert (K_ID, TRANS_ID)
+    # "datum" ist der Scanzeitpunkt in UTC, falls der Kauf nachträglich aus dem Spool gebucht wird
+    TN_Barcode, P_Barcode = Barcode_Nummern.normalisieren(TN_Barcode), Barcode_Nummern.normalisieren(P_Barcode)
+    K_ID = cursor.execute("SELECT Konto.K_ID FROM Konto JOIN Teilnehmer ON Konto.T_ID = Teilnehmer.T_ID WHERE Teilnehmer.TN_Barcode = ?", (TN_Barcode,)).fetchone()
+    if K_ID is None:
+        raise ValueError(f"Teilnehmer mit Barcode {TN_Barcode} nicht gefunden")
+    # Hauptbarcode oder zusätzlicher Barcode des Produkts
+    P_ID = cursor.execute("""SELECT P_ID, Preis FROM Produkt WHERE P_Barcode = ?
+                             UNION ALL SELECT Produkt.P_ID, Produkt.Preis FROM Produkt_Barcode JOIN Produkt ON Produkt.P_ID = Produkt_Barcode.P_ID
+                             WHERE Produkt_Barcode.Barcode = ? LIMIT 1""", (P_Barcode, P_Barcode)).fetchone()
+    if P_ID is None:
+        raise ValueError(f"Produkt mit Barcode {P_Barcode} nicht gefunden")
+    _ausgabenlimits.pruefen_und_verbuchen(cursor, K_ID[0], P_ID[0], P_ID[1], menge, pruefen=limits_pruefen, datum=datum)
+
+    # Neue Transaktion einfügen und zugehörige Tabellen aktualisieren
+    cursor.execute("INSERT INTO Transaktion (K_ID, P_ID, Menge, Typ, Datum) VALUES (?, ?, ?, 'Kauf', COALESCE(?, CURRENT_TIMESTAMP))", 
+                   (K_ID[0], P_ID[0], menge, datum))
+    trans_id = cursor.lastrowid
+    cursor.execute("UPDATE Konto SET Kontostand = Kontostand - ? * ? WHERE K_ID = ?", 
+                   (P_ID[1], menge, K_ID[0]))
+    cursor.execute("UPDATE Produkt SET Anzahl_verkauft = Anzahl_verkauft + ? WHERE P_ID = ?", 
+                   (menge, P_ID[0]))
+    # Lagerbestand mitführen; Produkte ohne Eintrag in Lagerbestand werden nicht gezählt
+    cursor.execute("UPDATE Lagerbestand SET Bestand = Bestand - ? WHERE P_ID = ?", (menge, P_ID[0]))
+    return K_ID[0], trans_id
+
+def buche_korb(cursor: sqlite3.Cursor, TN_Barcode: str, positionen: dict, limits_pruefen: bool = True) -> Tuple[int, List[int]]:
+    # Bucht alle Positionen (P_Barcode -> Menge) eines Einkaufs über denselben Cursor; liefert (K_ID, [TRANS_ID, ...])
+    k_id, trans_ids = None, []
+    try:
+        for P_Barcode, menge in positionen.items():
+            k_id, trans_id = buche_kauf(cursor, TN_Barcode, P_Barcode, menge, limits_pruefen=limits_pruefen)
+            trans_ids.append(trans_id)
+    except AusgabenlimitUeberschritten:
+        if trans_ids:
+            _ausgabenlimits.ungueltig()  # Frühere Positionen sind schon mitgezählt, werden aber zurückgerollt
+        raise
+    return k_id, trans_ids
+
+@contextmanager
+def kauf_transaktion(db: Database):
+    # db.transaction() für Buchungen über buche_kauf: wird zurückgerollt, sind bereits mitgezählte Käufe in den Tagessummen falsch
+    try:
+        with db.transaction() as cursor:
+            yield cursor
+    except AusgabenlimitUeberschritten:
+        raise  # Abgelehnt, bevor mitgezählt wurde; buche_korb verwirft frühere Positionen selbst
+    except Exception:
+        _ausgabenlimits.ungueltig()
+        raise
+
+PRUEF_TOLERANZ = 0.005  # Abweichungen unterhalb eines halben Cents gelten als Rundung
+
+def preis_sql(schema: str = "main") -> str:
+    # Preis eines Kaufs zum Buchungszeitpunkt (Aliase T und P) über den Index auf Preis_Historie (P_ID, Gueltig_ab).
+    # Produkte, deren Preis nie geändert wurde, haben keine Historie und gelten zum aktuellen Preis.
+    return f"""COALESCE((SELECT PH.Preis FROM {schema}.Preis_Historie PH
+                         WHERE PH.P_ID = T.P_ID AND PH.Gueltig_ab <= T.Datum
+                         ORDER BY PH.Gueltig_ab DESC LIMIT 1), P.Preis)"""
+
+PREIS_SQL = preis_sql()
+
+##### Mehrkassen-Betrieb #####
+
+def batch_buchen(db: Database, anfragen: List[dict]) -> List[dict]:
+    # Schreibanfragen der Kassen (kauf, korb, einzahlung) in einer Transaktion; jede Anfrage scheitert nur einzeln.
+    # Anfragen mit "schluessel" werden mit ihrer Antwort in Kiosk_Anfrage festgehalten und bei Wiederholung nicht erneut gebucht.
+    antworten = []
+    geaenderte_konten = set()
+    db.pruefe_externe_aenderungen()  # Z.B. in der Verwaltung geänderte Limits übernehmen
+    with kauf_transaktion(db) as cursor:
+        # sqlite3 öffnet vor SAVEPOINT kein implizites BEGIN; ohne eigenes BEGIN würde RELEASE jede Anfrage einzeln festschreiben
+        cursor.execute("BEGIN IMMEDIATE")
+        for anfrage in anfragen:
+            schluessel = anfrage.get("schluessel")
+            if schluessel:
+                # Idempotenz: eine wiederholte Anfrage derselben Kasse liefert die gespeicherte Antwort
+                vorher = cursor.execute("SELECT Antwort FROM Kiosk_Anfrage WHERE Schluessel = ?", (schluessel,)).fetchone()
+                if vorher is not None:
+                    antworten.append(json.loads(vorher[0]))
+                    continue
+            cursor.execute("SAVEPOINT anfrage")  # Fehler einer Anfrage dürfen den restlichen Batch nicht verwerfen
+            try:
+                if anfrage["op"] == "kauf":
+                    k_id, trans_id = buche_kauf(cursor, anfrage["tn_barcode"], anfrage["p_barcode"], int(anfrage.get("menge", 1)))
+                    antwort = {"ok": True, "trans_id": trans_id}
+                elif anfrage["op"] == "korb":
+                    positionen = {p_barcode: int(menge) for p_barcode, menge in anfrage["positionen"]}
+                    k_id, trans_ids = buche_korb(cursor, anfrage["tn_barcode"], positionen)
+                    antwort = {"ok": True, "trans_ids": trans_ids}
+                else:
+                    k_id, trans_id = buche_einzahlung(cursor, anfrage["tn_barcode"], float(anfrage["betrag"]))
+                    antwort = {"ok": True, "trans_id": trans_id}
+                if schluessel:
+                    cursor.execute("INSERT INTO Kiosk_Anfrage (Schluessel, Antwort, Datum) VALUES (?, ?, datetime('now', 'localtime'))",
+                                   (schluessel, json.dumps(antwort)))
+                cursor.execute("RELEASE anfrage")
+                geaenderte_konten.add(k_id)
+            except Exception as e:  # Auch fehlerhaft aufgebaute Anfragen (TypeError) scheitern nur einzeln
+                cursor.execute("ROLLBACK TO anfrage")
+                cursor.execute("RELEASE anfrage")
+                if not isinstance(e, AusgabenlimitUeberschritten) or anfrage.get("op") == "korb":
+                    _ausgabenlimits.ungueltig()  # Der Kauf war eventuell schon mitgezählt
+                antwort = {"ok": False, "fehler": str(e)}
+            antworten.append(antwort)
+    print(f"Kassenserver: {len(anfragen)} Anfragen in einer Transaktion geschrieben.")
+    for k_id in geaenderte_konten:
+        db.melde(KONTOSTAND_GEAENDERT, k_id=k_id)
+    return antworten
+
+
+def buche_einzahlung(cursor: sqlite3.Cursor, TN_Barcode: str, betrag: float) -> Tuple[int, int]:
+    if betrag <= 0:
+        raise ValueError("Ungültiger Betrag!")
+    K_ID = cursor.execute("SELECT Konto.K_ID FROM Konto JOIN Teilnehmer ON Konto.T_ID = Teilnehmer.T_ID WHERE Teilnehmer.TN_Barcode = ?", (TN_Barcode,)).fetchone()
+    if K_ID is None:
+        raise ValueError(f"Teilnehmer mit Barcode {TN_Barcode} nicht gefunden")
+    cursor.execute("UPDATE Konto SET Kontostand = Kontostand + ? WHERE K_ID = ?", (betrag, K_ID[0]))
+    cursor.execute("INSERT INTO Transaktion (K_ID, P_ID, Menge, Typ, Datum) VALUES (?, NULL, ?, 'Einzahlung', datetime('now', 'localtime'))", (K_ID[0], betrag))
+    return K_ID[0], cursor.lastrowid
@@ -1,11 +1,32 @@
 #!/usr/bin/python3
 # Standard library imports
 import datetime
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 import re
-from time import sleep
+import sys
+import json
+import uuid
+import socket
+import asyncio
+import argparse
+import threading
+import csv
+import io
+import base64
+import html
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+import bisect
+from time import monotonic, perf_counter
+from collections import Counter
+import cProfile
+import pstats
+import tracemalloc
 import subprocess
+from contextlib import contextmanager
+import multiprocessing as mp
+from multiprocessing import shared_memory
 from typing import List, Tuple, Callable
 
 # Third-party library imports
@@ -13,12 +34,25 @@ import cv2
 import psutil
 import sqlite3
 import numpy as np
-import pandas as pd
 import tkinter as tk
 from tkinter import Entry, StringVar, ttk, messagebox, simpledialog, filedialog
-import seaborn as sns
 import pyzbar.pyzbar as pyzbar
+import Barcode_Nummern  # Gemeinsames Barcode-Schema mit den Skripten zum Erzeugen der Etiketten
+from Kassenbuch import (  # Kassenbuch ohne Oberfläche, auch vom Kassenserver und den Tests genutzt
+    DB_NAME, LATENZ_PLAETZE, SCANNER_PROZESS,
+    TEILNEHMER_HINZUGEFUEGT, TEILNEHMER_GEAENDERT, TEILNEHMER_GELOESCHT, TEILNEHMER_AUSGECHECKT,
+    PRODUKT_HINZUGEFUEGT, PRODUKT_GEAENDERT, PRODUKT_GELOESCHT, KONTOSTAND_GEAENDERT, TABELLE_GEAENDERT,
+    DATENBANK_GEAENDERT, LAGERBESTAND_GEAENDERT, EINSTELLUNG_GEAENDERT, TEILNEHMER_EREIGNISSE, PRODUKT_EREIGNISSE,
+    AenderungsBus, DatenbankGesperrt, GESPERRT_FEHLERCODES, ist_gesperrt, Latenzmessung, _latenzen, Abfrageergebnis, Database,
+    DATENBANK_TABELLEN, JAHRESWECHSEL_LEEREN,
+    EINSTELLUNGEN, Einstellungswerte, einstellung_lesen, einstellung_als_text, Einstellungsspeicher, _einstellungen,
+    get_einstellungen, abonniere_einstellungen, setze_einstellung,
+    AusgabenlimitUeberschritten, Ausgabenlimits, _ausgabenlimits, abonniere_ausgabenlimits, setze_tageslimit, setze_produktlimit,
+    buche_kauf, buche_korb, kauf_transaktion, PRUEF_TOLERANZ, preis_sql, PREIS_SQL, batch_buchen, buche_einzahlung,
+)
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 # Check and handle the import of OpenCV separately
 try:
@@ -27,81 +61,42 @@ except ImportError as e:
     raise ImportError("Das Modul 'cv2' konnte nicht importiert werden. Stellen Sie sicher, dass es installiert ist.") from e
 
 
-DB_NAME = "02_Lagerbank2024.db"  # Definiert den Namen der Datenbank
 
-class Database:
-    def __init__(self):
-        self.connection = sqlite3.connect(DB_NAME)  # Stellt eine Verbindung zur SQLite-Datenbank her
-        self.cursor = self.connection.cursor()  # Erstellt ein Cursor-Objekt, um SQL-Befehle auszuführen
-        
-    def __enter__(self):
-        return self  # Unterstützung für den Kontextmanager (with-Anweisung)
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.connection.close()  # Stellt sicher, dass die Datenbankverbindung beim Verlassen des Kontexts geschlossen wird
-        
-    def execute_select(self, query: str, values: tuple = ()) -> List[Tuple]:
-        try:
-            print(f"Executing SELECT query: {query} with values: {values}")
-            self.cursor.execute(query, values)
-            return self.cursor.fetchall()  # Ruft alle Zeilen vom letzten ausgeführten Befehl ab und gibt sie zurück
-        except sqlite3.Error as e:
-            print(f"Error executing select: {e}")
-            raise Exception(f"Error executing select: {e}")
-        
-    def execute_insert(self, query: str, values: tuple) -> int:
-        try:
-            print(f"Executing INSERT query: {query} with values: {values}")
-            self.cursor.execute(query, values)
-            self.connection.commit()  # Führt die Transaktion aus
-            last_row_id = self.cursor.lastrowid  # Ruft die ID der zuletzt eingefügten Zeile ab
-            if last_row_id is None:
-                raise Exception("Keine Zeile eingefügt, lastrowid ist None")
-            return last_row_id
-        except sqlite3.Error as e:
-            print(f"Fehler beim Ausführen der Einfügung: {e}")
-            raise Exception("Fehler beim Ausführen der Einfügung")
-    
-    def execute_update(self, query: str, values: tuple) -> int:
-        try:
-            print(f"Executing UPDATE query: {query} with values: {values}")
-            self.cursor.execute(query, values)
-            self.connection.commit()  # Führt die Transaktion aus
-            return self.cursor.rowcount  # Gibt die Anzahl der betroffenen Zeilen zurück
-        except sqlite3.Error as e:
-            print(f"Error executing update: {e}")
-            raise Exception(f"Error executing update: {e}")
-        
-    def execute_delete(self, query: str, values: tuple) -> int:
-        try:
-            print(f"Executing DELETE query: {query} with values: {values}")
-            self.cursor.execute(query, values)
-            self.connection.commit()  # Führt die Transaktion aus
-            return self.cursor.rowcount  # Gibt die Anzahl der betroffenen Zeilen zurück
-        except sqlite3.Error as e:
-            print(f"Error executing delete: {e}")
-            raise Exception(f"Error executing delete: {e}")
-        
-    def delete_database(self):
-        try:
-            # Führt SQL-Befehle aus, um Tabellen zu löschen, falls sie existieren
-            self.cursor.execute("DROP TABLE IF EXISTS Teilnehmer")
-            self.cursor.execute("DROP TABLE IF EXISTS Produkt")
-            self.cursor.execute("DROP TABLE IF EXISTS Konto")
-            self.cursor.execute("DROP TABLE IF EXISTS Transaktion")
-            self.cursor.execute("DROP TABLE IF EXISTS Produkt_Barcode")
-            self.connection.commit()  # Führt die Transaktion aus
-        except sqlite3.Error as e:
-            print(f"Error deleting database: {e}")
-            raise Exception(f"Error deleting database: {e}")
+AENDERUNGS_PRUEFINTERVALL_MS = 2000  # Wie oft PRAGMA data_version auf Änderungen anderer Prozesse geprüft wird
+
+KIOSK_PORT = 8765  # Standard-Port des lokalen Kassenservers
+KIOSK_BATCH_GROESSE = 50  # Maximale Anzahl Schreibanfragen, die der Server in einer Transaktion bündelt
+KIOSK_BATCH_WARTEZEIT = 0.02  # Sekunden, die der Server auf weitere Schreibanfragen für den Batch wartet
+KIOSK_TIMEOUT = 5  # Sekunden, die eine Kasse auf eine Antwort des Servers wartet
+
+SPOOL_DATEI = "Kauf_Spool.jsonl"  # Append-only-Datei für Käufe, die nicht sofort gebucht werden konnten
+SPOOL_FSYNC_INTERVALL = 0.2  # Sekunden, in denen neue Spool-Einträge gesammelt mit fsync gesichert werden
+SPOOL_WIEDERHOLUNG = 2.0  # Sekunden bis zum nächsten Versuch, wenn die Datenbank gesperrt ist
+SPOOL_MAX_GROESSE = 1024 * 1024  # Vollständig abgearbeitete Spool-Datei ab dieser Größe leeren
+KASSE_BUSY_TIMEOUT_MS = 250  # So lange wartet ein Scan höchstens auf eine gesperrte Datenbank, danach wird gespoolt
+
+WARTUNG_INTERVALL_MS = 5000  # Wie oft geprüft wird, ob ein Wartungsschritt ansteht
+WARTUNG_LEERLAUF_S = 60  # Sekunden ohne Kauf oder Schreibvorgang, ab denen die Kasse als unbeschäftigt gilt
+WARTUNG_VACUUM_SEITEN = 200  # Höchstens so viele freie Seiten gibt ein Wartungsschritt zurück
+WARTUNG_ANALYSE_LIMIT = 400  # analysis_limit für ANALYZE/optimize: Zeilen pro Index, die höchstens gelesen werden
+WARTUNG_OPTIMIZE_S = 3600  # Abstand zwischen zwei PRAGMA optimize
+WARTUNG_QUICK_CHECK_S = 6 * 3600  # Abstand zwischen zwei quick_check
+
+SCANNER_BILD_FORM = (480, 640, 3)  # Höhe, Breite und Farbkanäle der Vorschaubilder im Shared Memory
+SCANNER_RINGPUFFER_PLAETZE = 4  # Anzahl der Bilder im Ringpuffer
+SCANNER_ZEITEN_PLAETZE = 500  # Anzahl der letzten Bilder, deren Aufnahme- und Dekodierzeit der Scanner-Prozess festhält
+
+DIAGNOSE_INTERVALL_MS = 2000  # Aktualisierung des Diagnose-Tabs
 
 class MultitabGUI:
     def __init__(self, db: Database):
-        self.db = db  # Speichert das Datenbankobjekt
+        self.db = db  # Speichert das Datenbankobjekt, im Kassenmodus ohne lokale Datenbank None
         self.root = tk.Tk()  # Erstellt das Hauptfenster
         self.root.title("BuLa Online Banking")  # Setzt den Fenstertitel
         self.root.geometry("960x540")  # Setzt die Fenstergröße
         self.tab_control = ttk.Notebook(self.root)  # Erstellt ein Tab-Control-Widget
+        if db is not None:
+            abonniere_such_indizes(db.bus)  # Suchindizes zuerst, damit Dropdowns danach den aktuellen Stand lesen
         
     def add_tab_with_content(self, name: str, content_creator: Callable):
         tab = ttk.Frame(self.tab_control)  # Erstellt einen neuen Tab
@@ -110,7 +105,37 @@ class MultitabGUI:
         
     def run(self):
         self.tab_control.pack(expand=1, fill="both")  # Zeigt das Tab-Control an
+        if self.db is not None:
+            self.wartung = Datenbankwartung(self.db)
+            self.root.after(AENDERUNGS_PRUEFINTERVALL_MS, self.pruefe_externe_aenderungen)
+            self.root.after(WARTUNG_INTERVALL_MS, self.wartungsschritt)
+            self.letztes_backup = monotonic()
+            self.root.after(BACKUP_PRUEFINTERVALL_MS, self.automatisches_backup)
         self.root.mainloop()  # Startet die Hauptschleife
+
+    def automatisches_backup(self):
+        try:
+            intervall = get_einstellungen(self.db).BackupIntervall  # Auch ein Lesefehler darf die weiteren Backups nicht stoppen
+            if intervall and monotonic() - self.letztes_backup >= intervall * 60:
+                self.letztes_backup = monotonic()
+                erstelle_automatisches_backup(self.db)
+        except Exception as e:
+            print(f"Fehler beim automatischen Backup: {e}")
+        self.root.after(BACKUP_PRUEFINTERVALL_MS, self.automatisches_backup)
+
+    def wartungsschritt(self):
+        try:
+            self.wartung.schritt()
+        except Exception as e:
+            print(f"Fehler bei der Datenbankwartung: {e}")
+        self.root.after(WARTUNG_INTERVALL_MS, self.wartungsschritt)
+
+    def pruefe_externe_aenderungen(self):
+        try:
+            self.db.pruefe_externe_aenderungen()  # Schreibvorgänge anderer Prozesse erkennen
+        except Exception as e:
+            print(f"Fehler beim Prüfen auf externe Änderungen: {e}")
+        self.root.after(AENDERUNGS_PRUEFINTERVALL_MS, self.pruefe_externe_aenderungen)
         
     def destroy(self):
         self.root.destroy()  # Zerstört das Hauptfenster
@@ -139,37 +164,1130 @@ def fetch_tn_barcode(db: Database) -> str:
 
 def add_transaction(db: Database, TN_Barcode: str, P_Barcode: str, menge: int):
     try:
-        # IDs basierend auf Benutzer- und Produktbarcode abrufen
-        T_ID = db.execute_select("SELECT T_ID FROM Teilnehmer WHERE TN_Barcode = ?", (TN_Barcode,))
-        K_ID = db.execute_select("SELECT K_ID FROM Konto WHERE T_ID = ?", (T_ID[0][0],))
-        P_ID = db.execute_select("SELECT P_ID FROM Produkt WHERE P_Barcode = ?", (P_Barcode,))
-        
-        # Neue Transaktion einfügen und zugehörige Tabellen aktualisieren
-        db.execute_insert("INSERT INTO Transaktion (K_ID, P_ID, Menge, Typ, Datum) VALUES (?, ?, ?, 'Kauf', CURRENT_TIMESTAMP)", 
-                          (K_ID[0][0], P_ID[0][0], menge))
-        db.execute_update("UPDATE Konto SET Kontostand = Kontostand - (SELECT Preis FROM Produkt WHERE P_ID = ?) * ? WHERE K_ID = ?", 
-                          (P_ID[0][0], menge, K_ID[0][0]))
-        db.execute_update("UPDATE Produkt SET Anzahl_verkauft = Anzahl_verkauft + ? WHERE P_ID = ?", 
-                          (menge, P_ID[0][0]))
+        # Transaktion, Kontostand und Verkaufszähler gemeinsam festschreiben
+        with kauf_transaktion(db) as cursor:
+            k_id, _ = buche_kauf(cursor, TN_Barcode, P_Barcode, menge)
+        db.melde(KONTOSTAND_GEAENDERT, k_id=k_id)
         print("Erfolg: Transaktion erfolgreich hinzugefügt!")
     except Exception as e:
         messagebox.showerror("Fehler", f"Fehler beim Hinzufügen der Transaktion: {e}")
 
-def fetch_transactions(db: Database, user_id: int) -> List[Tuple]:
-    transactions = db.execute_select("SELECT * FROM Transaktion WHERE K_ID = ? ORDER BY Datum DESC", (user_id,))  # Ruft Transaktionen für einen bestimmten Benutzer ab
+GELD_STUECKELUNG = [  # Scheine und Münzen in Cent mit Bezeichnung, absteigend sortiert
+    (2000, "20€ Scheine"), (1000, "10€ Scheine"), (500, "5€ Scheine"),
+    (200, "2€ Münzen"), (100, "1€ Münzen"), (50, "50 Cent Münzen"),
+    (20, "20 Cent Münzen"), (10, "10 Cent Münzen"), (5, "5 Cent Münzen"),
+    (2, "2 Cent Münzen"), (1, "1 Cent Münzen"),
+]
+
+def berechne_geldaufteilung(betrag: float) -> List[int]:
+    # Rechnet in ganzen Cent, damit keine Rundungsfehler der Gleitkomma-Kaskade entstehen
+    rest = max(0, int(round(betrag * 100)))
+    anzahl = []
+    for wert, _ in GELD_STUECKELUNG:
+        stueck, rest = divmod(rest, wert)
+        anzahl.append(stueck)
+    return anzahl
+
+# Beim Checkout wird der Kontostand ausgeglichen: Guthaben als Auszahlung, ein Fehlbetrag als bar eingesammelte Einzahlung
+CHECKOUT_AUSGLEICH_SQL = """INSERT INTO Transaktion (K_ID, P_ID, Menge, Typ, Datum)
+                            SELECT K_ID, NULL, ABS(ROUND(Kontostand, 2)), CASE WHEN Kontostand > 0 THEN 'Auszahlung' ELSE 'Einzahlung' END,
+                                   datetime('now', 'localtime')
+                            FROM Konto WHERE K_ID = ? AND ROUND(Kontostand, 2) != 0"""
+
+def batch_checkout(db: Database, namen: List[str]) -> List[Tuple[str, float, List[int]]]:
+    # Alle Kontostände in einer Abfrage laden, Auszahlungen berechnen und alles in einer Transaktion festschreiben
+    if not namen:
+        return []
+    platzhalter = ", ".join("?" for _ in namen)
+    with db.transaction() as cursor:
+        cursor.execute("BEGIN IMMEDIATE")  # Kontostände unter der Schreibsperre lesen, damit kein gleichzeitiger Kauf verloren geht
+        konten = cursor.execute(f"""
+            SELECT Teilnehmer.T_ID, Teilnehmer.Name, Konto.K_ID, ROUND(Konto.Kontostand, 2)
+            FROM Teilnehmer
+            JOIN Konto ON Konto.T_ID = Teilnehmer.T_ID
+            WHERE Teilnehmer.Name IN ({platzhalter}) AND Teilnehmer.Checkout = 0
+            ORDER BY Teilnehmer.Name
+        """, tuple(namen)).fetchall()
+        cursor.executemany(CHECKOUT_AUSGLEICH_SQL, [(k_id,) for _, _, k_id, _ in konten])
+        cursor.executemany("UPDATE Konto SET Kontostand = 0 WHERE K_ID = ?", [(k_id,) for _, _, k_id, _ in konten])
+        cursor.executemany("UPDATE Teilnehmer SET Checkout = 1 WHERE T_ID = ?", [(t_id,) for t_id, _, _, _ in konten])
+    auszahlungen = [(name, kontostand, berechne_geldaufteilung(kontostand)) for _, name, _, kontostand in konten]
+    highlighted_users.extend(name for name, _, _ in auszahlungen)
+    db.melde(TEILNEHMER_AUSGECHECKT, namen=[name for name, _, _ in auszahlungen])
+    print(f"Erfolg: {len(auszahlungen)} Teilnehmer ausgecheckt.")
+    return auszahlungen
+
+def schreibe_auszahlungsliste(auszahlungen: List[Tuple[str, float, List[int]]], dateiname: str) -> str:
+    # Erstellt eine druckbare Auszahlungsliste mit Gesamtbedarf an Scheinen und Münzen
+    gesamt = [0] * len(GELD_STUECKELUNG)
+    zeilen = [f"Auszahlungsliste vom {datetime.now():%d.%m.%Y %H:%M}", "", f"{'Name':<30} {'Betrag':>10}  Unterschrift"]
+    zeilen.append("-" * 70)
+    for name, kontostand, anzahl in auszahlungen:
+        hinweis = "" if kontostand >= 0 else "  (Fehlbetrag!)"
+        zeilen.append(f"{name:<30} {kontostand:>8.2f} €  ____________________{hinweis}")
+        gesamt = [g + a for g, a in zip(gesamt, anzahl)]
+    zeilen.append("-" * 70)
+    summe = sum(max(0, kontostand) for _, kontostand, _ in auszahlungen)
+    zeilen.append(f"{'Summe':<30} {summe:>8.2f} €")
+    zeilen.append("")
+    zeilen.append("Benötigte Geldaufteilung:")
+    for (wert, bezeichnung), stueck in zip(GELD_STUECKELUNG, gesamt):
+        zeilen.append(f"{bezeichnung}: {stueck}")
+    text = "\n".join(zeilen)
+    with open(dateiname, 'w', encoding='utf-8') as f:
+        f.write(text + "\n")
+    print(f"Auszahlungsliste wurde in {dateiname} gespeichert.")
+    return text
+
+# Betrag einer Transaktion aus Sicht des Kontos: Einzahlungen und Auszahlungen stehen in Menge, Käufe zum Produktpreis
+BUCHUNGSBETRAG_SQL = f"""CASE WHEN T.Typ = 'Einzahlung' THEN T.Menge
+                             WHEN T.Typ = 'Auszahlung' THEN -T.Menge
+                             WHEN T.Typ = 'Kauf' THEN -T.Menge * {PREIS_SQL}
+                             ELSE 0 END"""
+
+def setze_preis(db: Database, produkt: str, preis: float):
+    # Neuer Preis gilt ab jetzt; frühere Käufe behalten über Preis_Historie ihren damaligen Preis.
+    # Produkt.Preis bleibt der aktuelle Preis, den die Kasse ohne weitere Abfrage beim Barcode-Lookup liest.
+    if preis < 0:
+        raise ValueError("Ungültiger Preis!")
+    with db.transaction() as cursor:
+        zeile = cursor.execute("SELECT P_ID, Preis FROM Produkt WHERE Beschreibung = ?", (produkt,)).fetchone()
+        if zeile is None:
+            raise ValueError(f"Produkt {produkt} nicht gefunden")
+        p_id, alter_preis = zeile
+        if cursor.execute("SELECT 1 FROM Preis_Historie WHERE P_ID = ? LIMIT 1", (p_id,)).fetchone() is None:
+            # Produkt aus der Zeit vor der Preishistorie: bisherigen Preis für alle bisherigen Käufe festhalten
+            cursor.execute("""INSERT INTO Preis_Historie (P_ID, Preis, Gueltig_ab)
+                              SELECT ?, ?, COALESCE(MIN(Datum), CURRENT_TIMESTAMP) FROM Transaktion WHERE P_ID = ?""",
+                           (p_id, alter_preis, p_id))
+        cursor.execute("INSERT INTO Preis_Historie (P_ID, Preis, Gueltig_ab) VALUES (?, ?, CURRENT_TIMESTAMP)", (p_id, preis))
+        cursor.execute("UPDATE Produkt SET Preis = ? WHERE P_ID = ?", (preis, p_id))
+    db.melde(PRODUKT_GEAENDERT, alt=produkt, name=produkt, preis=preis)
+
+def fetch_preis_zum_zeitpunkt(db: Database, p_id: int, zeitpunkt: str) -> float:
+    # Stichtagsabfrage; zeitpunkt im Format von Transaktion.Datum (UTC)
+    zeile = db.execute_select("""SELECT COALESCE((SELECT Preis FROM Preis_Historie WHERE P_ID = ? AND Gueltig_ab <= ?
+                                                  ORDER BY Gueltig_ab DESC LIMIT 1), Preis)
+                                 FROM Produkt WHERE P_ID = ?""", (p_id, zeitpunkt, p_id))
+    return zeile[0][0] if zeile else None
+
+# Umsatz je Preisperiode; Produkte ohne Historie bilden eine Periode mit leerem Beginn
+PREISPERIODEN_SQL = """
+    WITH Perioden AS (
+        SELECT P_ID, Preis, Gueltig_ab, LEAD(Gueltig_ab) OVER (PARTITION BY P_ID ORDER BY Gueltig_ab) AS Gueltig_bis
+        FROM Preis_Historie
+        UNION ALL
+        SELECT P_ID, Preis, '', NULL FROM Produkt WHERE P_ID NOT IN (SELECT P_ID FROM Preis_Historie)
+    )
+    SELECT P.Beschreibung, ROUND(Per.Preis, 2), Per.Gueltig_ab, Per.Gueltig_bis,
+           COALESCE(SUM(T.Menge), 0), ROUND(COALESCE(SUM(T.Menge), 0) * Per.Preis, 2)
+    FROM Perioden Per
+    JOIN Produkt P ON P.P_ID = Per.P_ID
+    LEFT JOIN Transaktion T ON T.P_ID = Per.P_ID AND T.Typ = 'Kauf'
+         AND T.Datum >= Per.Gueltig_ab AND (Per.Gueltig_bis IS NULL OR T.Datum < Per.Gueltig_bis)
+    GROUP BY Per.P_ID, Per.Gueltig_ab
+    ORDER BY P.Beschreibung, Per.Gueltig_ab
+"""
+
+def pruefe_konten(db: Database, inkrementell: bool = False) -> dict:
+    # Berechnet die erwarteten Kontostände aus dem Transaktionslog und meldet Abweichungen und verwaiste Zeilen.
+    # Inkrementell werden nur Transaktionen nach dem letzten Prüfpunkt gelesen und auf die gespeicherten Summen addiert.
+    with db.transaction() as cursor:
+        cursor.execute("BEGIN")  # Lesende Abfragen sehen denselben Stand der Datenbank
+        checkpoint = 0
+        if inkrementell:
+            row = cursor.execute("SELECT Bis_TRANS_ID FROM Audit_Checkpoint WHERE ID = 1").fetchone()
+            checkpoint = row[0] if row else 0
+        bis = cursor.execute("SELECT COALESCE(MAX(TRANS_ID), 0) FROM Transaktion").fetchone()[0]
+        gespeicherte_summe = "COALESCE(A.Summe, 0) + " if inkrementell else ""
+        konten = cursor.execute(f"""
+            SELECT Konto.K_ID, Teilnehmer.Name, ROUND(Konto.Kontostand, 2),
+                   ROUND({gespeicherte_summe}COALESCE(N.Summe, 0), 2) AS Erwartet
+            FROM Konto
+            LEFT JOIN Teilnehmer ON Teilnehmer.T_ID = Konto.T_ID
+            LEFT JOIN Audit_Stand A ON A.K_ID = Konto.K_ID
+            LEFT JOIN (
+                SELECT T.K_ID, SUM({BUCHUNGSBETRAG_SQL}) AS Summe
+                FROM Transaktion T
+                LEFT JOIN Produkt P ON P.P_ID = T.P_ID
+                WHERE T.TRANS_ID > ? AND T.TRANS_ID <= ?
+                GROUP BY T.K_ID
+            ) N ON N.K_ID = Konto.K_ID
+        """, (checkpoint, bis)).fetchall()
+        verwaiste_transaktionen = [row[0] for row in cursor.execute(
+            "SELECT TRANS_ID FROM Transaktion WHERE K_ID IS NULL OR K_ID NOT IN (SELECT K_ID FROM Konto)")]
+        verwaiste_konten = [row[0] for row in cursor.execute(
+            "SELECT K_ID FROM Konto WHERE T_ID IS NULL OR T_ID NOT IN (SELECT T_ID FROM Teilnehmer)")]
+        kaeufe_ohne_produkt = [row[0] for row in cursor.execute(
+            "SELECT TRANS_ID FROM Transaktion WHERE Typ = 'Kauf' AND (P_ID IS NULL OR P_ID NOT IN (SELECT P_ID FROM Produkt))")]
+
+        # Neuen Prüfpunkt speichern
+        cursor.executemany("INSERT OR REPLACE INTO Audit_Stand (K_ID, Summe) VALUES (?, ?)",
+                           [(k_id, erwartet) for k_id, _, _, erwartet in konten])
+        cursor.execute("INSERT OR REPLACE INTO Audit_Checkpoint (ID, Bis_TRANS_ID, Datum) VALUES (1, ?, datetime('now', 'localtime'))", (bis,))
+
+    abweichungen = [(k_id, name, kontostand, erwartet, round(kontostand - erwartet, 2))
+                    for k_id, name, kontostand, erwartet in konten
+                    if abs(kontostand - erwartet) > PRUEF_TOLERANZ]
+    print(f"Kontenprüfung: {len(konten)} Konten, {len(abweichungen)} Abweichungen, "
+          f"{len(verwaiste_transaktionen)} verwaiste Transaktionen, {len(verwaiste_konten)} verwaiste Konten, "
+          f"{len(kaeufe_ohne_produkt)} Käufe ohne Produkt (Transaktionen {checkpoint + 1} bis {bis})")
+    return {
+        "konten": len(konten),
+        "abweichungen": abweichungen,
+        "verwaiste_transaktionen": verwaiste_transaktionen,
+        "verwaiste_konten": verwaiste_konten,
+        "kaeufe_ohne_produkt": kaeufe_ohne_produkt,
+        "bis_trans_id": bis,
+    }
+
+EXPORT_BLOCKGROESSE = 5000  # Zeilen pro Block beim Export, damit nie die ganze Tabelle im Speicher liegt
+
+EXPORT_TRANSAKTIONEN_SQL = f"""
+    SELECT T.TRANS_ID, T.Datum, T.Typ, Teilnehmer.Name AS Teilnehmer, Teilnehmer.TN_Barcode,
+           P.Beschreibung AS Produkt, P.P_Barcode, T.Menge, ROUND({PREIS_SQL}, 2) AS Preis,
+           ROUND({BUCHUNGSBETRAG_SQL}, 2) AS Betrag
+    FROM Transaktion T
+    LEFT JOIN Konto ON Konto.K_ID = T.K_ID
+    LEFT JOIN Teilnehmer ON Teilnehmer.T_ID = Konto.T_ID
+    LEFT JOIN Produkt P ON P.P_ID = T.P_ID
+    WHERE T.TRANS_ID > ? AND T.TRANS_ID <= ?
+    ORDER BY T.TRANS_ID
+"""
+EXPORT_TRANSAKTIONEN_TYPEN = ["int64", "string", "string", "string", "string", "string", "string", "float64", "float64", "float64"]
+
+EXPORT_KONTOSTAENDE_SQL = """
+    SELECT Teilnehmer.T_ID, Teilnehmer.Name, Teilnehmer.TN_Barcode, Konto.K_ID,
+           ROUND(Konto.Einzahlung, 2) AS Einzahlung, ROUND(Konto.Kontostand, 2) AS Kontostand, Teilnehmer.Checkout
+    FROM Teilnehmer
+    JOIN Konto ON Konto.T_ID = Teilnehmer.T_ID
+    ORDER BY Teilnehmer.Name
+"""
+EXPORT_KONTOSTAENDE_TYPEN = ["int64", "string", "string", "int64", "float64", "float64", "int64"]
+
+def iter_bloecke(db: Database, query: str, values: tuple = ()):
+    # Liefert Spaltennamen und danach Blöcke von Zeilen über einen eigenen Cursor
+    cursor = db.connection.cursor()  # Eigener Cursor, damit andere Abfragen den Export nicht unterbrechen
+    try:
+        cursor.execute(query, values)
+        yield [desc[0] for desc in cursor.description]
+        while True:
+            block = cursor.fetchmany(EXPORT_BLOCKGROESSE)
+            if not block:
+                break
+            yield block
+    finally:
+        cursor.close()
+
+def schreibe_export(db: Database, query: str, values: tuple, dateiname: str, format: str = "csv", typen: List[str] = None) -> int:
+    # Schreibt das Abfrageergebnis blockweise als CSV oder Parquet; liefert die Anzahl der Zeilen.
+    # "typen" legt die Parquet-Spaltentypen fest, damit alle Blöcke dasselbe Schema haben.
+    bloecke = iter_bloecke(db, query, values)
+    spalten = next(bloecke)
+    anzahl = 0
+    if format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise Exception("Für den Parquet-Export wird das Paket 'pyarrow' benötigt.") from e
+        schema = pa.schema([(spalte, getattr(pa, typ)()) for spalte, typ in zip(spalten, typen)])
+        with pq.ParquetWriter(dateiname, schema) as writer:
+            for block in bloecke:
+                spalten_werte = list(zip(*block))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(werte, type=feld.type) for werte, feld in zip(spalten_werte, schema)], schema=schema))
+                anzahl += len(block)
+    else:
+        with open(dateiname, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(spalten)
+            for block in bloecke:
+                writer.writerows(block)
+                anzahl += len(block)
+    print(f"Export: {anzahl} Zeilen nach {dateiname} geschrieben.")
+    return anzahl
+
+def exportiere_kassenbuch(db: Database, praefix: str, format: str = "csv", seit_trans_id: int = None) -> Tuple[str, str]:
+    # Exportiert Transaktionen (optional nur neue seit dem letzten Export) und aktuelle Kontostände
+    if seit_trans_id is None:
+        row = db.execute_select("SELECT Bis_TRANS_ID FROM Export_Stand WHERE Format = ?", (format,))
+        seit_trans_id = row[0][0] if row else 0
+    endung = "parquet" if format == "parquet" else "csv"
+    transaktionen_datei = f"{praefix}_transaktionen.{endung}"
+    kontostaende_datei = f"{praefix}_kontostaende.{endung}"
+    bis = db.execute_select("SELECT COALESCE(MAX(TRANS_ID), 0) FROM Transaktion")[0][0]
+    schreibe_export(db, EXPORT_TRANSAKTIONEN_SQL, (seit_trans_id, bis), transaktionen_datei, format, EXPORT_TRANSAKTIONEN_TYPEN)
+    schreibe_export(db, EXPORT_KONTOSTAENDE_SQL, (), kontostaende_datei, format, EXPORT_KONTOSTAENDE_TYPEN)
+    db.execute_update("INSERT OR REPLACE INTO Export_Stand (Format, Bis_TRANS_ID, Datum) VALUES (?, ?, datetime('now', 'localtime'))", (format, bis))
+    return transaktionen_datei, kontostaende_datei
+
+KONTOAUSZUG_SQL = f"""
+    SELECT Konto.K_ID, Teilnehmer.Name, ROUND(Konto.Kontostand, 2),
+           T.Datum, T.Typ, P.Beschreibung, T.Menge, ROUND({PREIS_SQL}, 2), ROUND({BUCHUNGSBETRAG_SQL}, 2)
+    FROM Konto
+    JOIN Teilnehmer ON Teilnehmer.T_ID = Konto.T_ID
+    LEFT JOIN Transaktion T ON T.K_ID = Konto.K_ID
+    LEFT JOIN Produkt P ON P.P_ID = T.P_ID
+    ORDER BY Teilnehmer.Name, Konto.K_ID, T.Datum, T.TRANS_ID
+"""
+
+KONTOAUSZUG_STIL = """<style>
+body { font-family: sans-serif; font-size: 11pt; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border-bottom: 1px solid #999; padding: 2px 6px; text-align: left; }
+td.betrag { text-align: right; }
+.auszug { page-break-after: always; }
+</style>"""
+
+def iter_kontoauszuege(db: Database):
+    # Liest das Kassenbuch in einem geordneten Durchlauf und liefert je Teilnehmer die Daten für einen Kontoauszug
+    bloecke = iter_bloecke(db, KONTOAUSZUG_SQL)
+    next(bloecke)  # Spaltennamen
+    zeilen = itertools.chain.from_iterable(bloecke)
+    for (k_id, name, kontostand), gruppe in itertools.groupby(zeilen, key=lambda z: z[:3]):
+        buchungen = [z[3:] for z in gruppe if z[4] is not None]  # Konten ohne Buchungen liefern eine leere Zeile
+        yield {"k_id": k_id, "name": name, "kontostand": kontostand, "buchungen": buchungen}
+
+def render_kontoauszug(auszug: dict, verzeichnis: str) -> str:
+    # Läuft in einem Worker-Thread: schreibt den HTML-Auszug eines Teilnehmers und liefert das HTML-Fragment
+    summen = {"Einzahlung": 0.0, "Kauf": 0.0, "Auszahlung": 0.0}
+    zeilen = []
+    for datum, typ, produkt, menge, preis, betrag in auszug["buchungen"]:
+        summen[typ] = summen.get(typ, 0.0) + (betrag or 0.0)
+        zeilen.append(
+            f"<tr><td>{html.escape(str(datum))}</td><td>{html.escape(typ)}</td><td>{html.escape(produkt or '')}</td>"
+            f"<td class='betrag'>{menge if typ == 'Kauf' else ''}</td>"
+            f"<td class='betrag'>{f'{preis:.2f} €' if typ == 'Kauf' and preis is not None else ''}</td>"
+            f"<td class='betrag'>{(betrag or 0.0):+.2f} €</td></tr>")
+    fragment = (
+        f"<div class='auszug'><h2>Kontoauszug {html.escape(auszug['name'])}</h2>"
+        f"<p>Erstellt am {datetime.now():%d.%m.%Y %H:%M}</p>"
+        "<table><tr><th>Datum</th><th>Art</th><th>Produkt</th><th>Menge</th><th>Preis</th><th>Betrag</th></tr>"
+        + "".join(zeilen) +
+        "</table>"
+        f"<p>Einzahlungen: {summen['Einzahlung']:.2f} €<br>"
+        f"Einkäufe: {abs(summen['Kauf']):.2f} €<br>"
+        f"Auszahlungen: {abs(summen['Auszahlung']):.2f} €<br>"
+        f"<b>Aktueller Kontostand: {auszug['kontostand']:.2f} €</b></p></div>")
+    dateiname = os.path.join(verzeichnis, f"Kontoauszug_{auszug['k_id']}_{re.sub(r'[^A-Za-z0-9]+', '_', normalisiere_suchbegriff(auszug['name'])).strip('_')}.html")
+    with open(dateiname, 'w', encoding='utf-8') as f:
+        f.write(f"<html><head><meta charset='utf-8'>{KONTOAUSZUG_STIL}</head><body>{fragment}</body></html>")
+    return fragment
+
+def erstelle_kontoauszuege(db: Database, verzeichnis: str = None, threads: int = None) -> str:
+    # Erstellt für alle Teilnehmer einen Kontoauszug; Rendern und Schreiben der Dateien laufen in einem Thread-Pool.
+    # Kein Prozesspool: jeder per spawn gestartete Worker würde dieses Modul samt cv2, Tk und matplotlib neu importieren.
+    # Zusätzlich entsteht eine Sammeldatei mit Seitenumbrüchen zum Drucken aller Auszüge auf einmal.
+    verzeichnis = verzeichnis or f"Kontoauszuege_{datetime.now():%Y%m%d_%H%M%S}"
+    os.makedirs(verzeichnis, exist_ok=True)
+    sammeldatei = os.path.join(verzeichnis, "Alle_Kontoauszuege.html")
+    anzahl = 0
+    with ThreadPoolExecutor(max_workers=threads) as pool, \
+            open(sammeldatei, 'w', encoding='utf-8') as f:
+        f.write(f"<html><head><meta charset='utf-8'>{KONTOAUSZUG_STIL}</head><body>")
+        auszuege = iter_kontoauszuege(db)
+        for fragment in pool.map(render_kontoauszug, auszuege, itertools.repeat(verzeichnis)):
+            f.write(fragment)  # Reihenfolge bleibt wie im Kassenbuch (nach Name)
+            anzahl += 1
+        f.write("</body></html>")
+    print(f"{anzahl} Kontoauszüge in {verzeichnis} erstellt.")
+    return sammeldatei
+
+def aktualisiere_verkaufs_rollup(db: Database, neu_aufbauen: bool = False) -> int:
+    # Überträgt nur die seit dem letzten Lauf hinzugekommenen Käufe in die Stundentabelle Verkauf_Stunde.
+    # Der Umsatz wird mit dem zum Kaufzeitpunkt gültigen Preis berechnet.
+    with db.transaction() as cursor:
+        if neu_aufbauen:
+            cursor.execute("DELETE FROM Verkauf_Stunde")
+            cursor.execute("DELETE FROM Rollup_Stand")
+        stand = cursor.execute("SELECT Bis_TRANS_ID FROM Rollup_Stand WHERE ID = 1").fetchone()
+        seit = stand[0] if stand else 0
+        bis = cursor.execute("SELECT COALESCE(MAX(TRANS_ID), 0) FROM Transaktion").fetchone()[0]
+        if bis <= seit:
+            return seit
+        cursor.execute(f"""
+            INSERT INTO Verkauf_Stunde (Stunde, P_ID, Menge, Umsatz)
+            SELECT strftime('%Y-%m-%d %H', T.Datum, 'localtime'), T.P_ID, SUM(T.Menge), SUM(T.Menge * {PREIS_SQL})
+            FROM Transaktion T JOIN Produkt P ON P.P_ID = T.P_ID
+            WHERE T.Typ = 'Kauf' AND T.TRANS_ID > ? AND T.TRANS_ID <= ?
+            GROUP BY 1, 2
+            ON CONFLICT (Stunde, P_ID) DO UPDATE SET Menge = Menge + excluded.Menge, Umsatz = Umsatz + excluded.Umsatz
+        """, (seit, bis))
+        cursor.execute("""INSERT INTO Rollup_Stand (ID, Bis_TRANS_ID, Datum) VALUES (1, ?, CURRENT_TIMESTAMP)
+                          ON CONFLICT (ID) DO UPDATE SET Bis_TRANS_ID = excluded.Bis_TRANS_ID, Datum = excluded.Datum""", (bis,))
+    return bis
+
+VERKAUFSDIAGRAMME = ("Verkäufe nach Uhrzeit", "Verkäufe pro Tag", "Umsatz pro Tag")
+VERKAUFSDIAGRAMM_TOP_PRODUKTE = 8  # Anzahl Produkte, die im Tagesdiagramm einzeln dargestellt werden
+_diagramm_cache = {}  # (Diagramm, Rollup-Stand) -> PNG als Base64
+_diagramm_executor = None
+
+def lade_diagrammdaten(db: Database, art: str) -> dict:
+    # Liest die vorverdichteten Stundenwerte; Tageswerte entstehen durch Gruppieren der Stunden
+    if art == "Verkäufe nach Uhrzeit":
+        zeilen = db.execute_select("""SELECT P.Beschreibung, CAST(substr(V.Stunde, 12, 2) AS INTEGER), SUM(V.Menge)
+                                      FROM Verkauf_Stunde V JOIN Produkt P ON P.P_ID = V.P_ID
+                                      GROUP BY 1, 2 ORDER BY 1""")
+    elif art == "Verkäufe pro Tag":
+        zeilen = db.execute_select("""SELECT P.Beschreibung, substr(V.Stunde, 1, 10), SUM(V.Menge)
+                                      FROM Verkauf_Stunde V JOIN Produkt P ON P.P_ID = V.P_ID
+                                      GROUP BY 1, 2 ORDER BY 2""")
+    else:
+        zeilen = db.execute_select("""SELECT substr(Stunde, 1, 10), ROUND(SUM(Umsatz), 2)
+                                      FROM Verkauf_Stunde GROUP BY 1 ORDER BY 1""")
+    return {"art": art, "zeilen": zeilen}
+
+def render_verkaufsdiagramm(daten: dict) -> str:
+    # Läuft im Hintergrund-Thread: zeichnet mit einer eigenen Figure (ohne pyplot) und liefert ein PNG als Base64
+    art, zeilen = daten["art"], daten["zeilen"]
+    fig = Figure(figsize=(9, 5), dpi=90)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if not zeilen:
+        ax.text(0.5, 0.5, "Noch keine Verkäufe", ha="center", va="center")
+        ax.set_axis_off()
+    elif art == "Verkäufe nach Uhrzeit":
+        produkte = sorted({z[0] for z in zeilen})
+        matrix = np.zeros((len(produkte), 24))
+        for produkt, stunde, menge in zeilen:
+            matrix[produkte.index(produkt), stunde] = menge
+        bild = ax.imshow(matrix, aspect="auto", cmap="YlOrRd")
+        ax.set_xticks(range(24))
+        ax.set_yticks(range(len(produkte)), labels=produkte)
+        ax.set_xlabel("Uhrzeit")
+        fig.colorbar(bild, ax=ax, label="Verkaufte Menge")
+    elif art == "Verkäufe pro Tag":
+        tage = sorted({z[1] for z in zeilen})
+        mengen = {}
+        for produkt, tag, menge in zeilen:
+            mengen.setdefault(produkt, np.zeros(len(tage)))[tage.index(tag)] = menge
+        top = sorted(mengen, key=lambda p: mengen[p].sum(), reverse=True)[:VERKAUFSDIAGRAMM_TOP_PRODUKTE]
+        for produkt in top:
+            ax.plot(tage, mengen[produkt], marker="o", label=produkt)
+        ax.set_ylabel("Verkaufte Menge")
+        ax.legend(fontsize="small")
+        ax.tick_params(axis="x", labelrotation=45)
+    else:
+        ax.bar([z[0] for z in zeilen], [z[1] for z in zeilen])
+        ax.set_ylabel("Umsatz (€)")
+        ax.tick_params(axis="x", labelrotation=45)
+    ax.set_title(art)
+    fig.tight_layout()
+    puffer = io.BytesIO()
+    fig.savefig(puffer, format="png")
+    return base64.b64encode(puffer.getvalue()).decode("ascii")
+
+def leere_diagramm_cache(art=None, daten=None):
+    # Produktnamen stecken in den gezeichneten Diagrammen, daher bei Produktänderungen neu zeichnen
+    _diagramm_cache.clear()
+
+def verkaufsdiagramm_anfordern(db: Database, art: str):
+    # Aktualisiert die Rollups und liefert ein Future mit dem Diagramm; unveränderte Diagramme kommen aus dem Cache
+    global _diagramm_executor
+    stand = aktualisiere_verkaufs_rollup(db)
+    schluessel = (art, stand)
+    for alt in [k for k in _diagramm_cache if k[0] == art and k != schluessel]:
+        del _diagramm_cache[alt]  # Veraltete Stände desselben Diagramms verwerfen
+    if schluessel not in _diagramm_cache:
+        if _diagramm_executor is None:
+            _diagramm_executor = ThreadPoolExecutor(max_workers=1)
+        _diagramm_cache[schluessel] = _diagramm_executor.submit(render_verkaufsdiagramm, lade_diagrammdaten(db, art))
+    return _diagramm_cache[schluessel]
+
+LAGER_MELDEBESTAND_STANDARD = 10  # Meldebestand für Produkte, deren Bestand zum ersten Mal gebucht wird
+PROGNOSE_TAGE = 3  # Zeitraum der Verkäufe, aus dem die Verkaufsgeschwindigkeit für die Reichweite berechnet wird
+
+def buche_wareneingang(db: Database, produkt: str, menge: int) -> int:
+    # Bucht einen Wareneingang (negative Menge = Korrektur, z.B. Bruch) und liefert den neuen Bestand
+    if menge == 0:
+        raise ValueError("Ungültige Menge!")
+    with db.transaction() as cursor:
+        P_ID = cursor.execute("SELECT P_ID FROM Produkt WHERE Beschreibung = ?", (produkt,)).fetchone()
+        if P_ID is None:
+            raise ValueError(f"Produkt {produkt} nicht gefunden")
+        cursor.execute("INSERT INTO Wareneingang (P_ID, Menge, Datum) VALUES (?, ?, CURRENT_TIMESTAMP)", (P_ID[0], menge))
+        cursor.execute("""INSERT INTO Lagerbestand (P_ID, Bestand, Meldebestand) VALUES (?, ?, ?)
+                          ON CONFLICT (P_ID) DO UPDATE SET Bestand = Bestand + excluded.Bestand""",
+                       (P_ID[0], menge, LAGER_MELDEBESTAND_STANDARD))
+        bestand = cursor.execute("SELECT Bestand FROM Lagerbestand WHERE P_ID = ?", (P_ID[0],)).fetchone()[0]
+    db.melde(LAGERBESTAND_GEAENDERT, p_id=P_ID[0])
+    return bestand
+
+def setze_meldebestand(db: Database, produkt: str, meldebestand: int):
+    if meldebestand < 0:
+        raise ValueError("Ungültiger Meldebestand!")
+    with db.transaction() as cursor:
+        P_ID = cursor.execute("SELECT P_ID FROM Produkt WHERE Beschreibung = ?", (produkt,)).fetchone()
+        if P_ID is None:
+            raise ValueError(f"Produkt {produkt} nicht gefunden")
+        cursor.execute("""INSERT INTO Lagerbestand (P_ID, Bestand, Meldebestand) VALUES (?, 0, ?)
+                          ON CONFLICT (P_ID) DO UPDATE SET Meldebestand = excluded.Meldebestand""", (P_ID[0], meldebestand))
+    db.melde(LAGERBESTAND_GEAENDERT, p_id=P_ID[0])
+
+def fetch_niedriger_bestand(db: Database) -> List[Tuple[str, int]]:
+    # Eine Zeile je gezähltem Produkt, daher auch nach jedem Kauf günstig genug
+    return db.execute_select("""SELECT P.Beschreibung, L.Bestand FROM Lagerbestand L JOIN Produkt P ON P.P_ID = L.P_ID
+                                WHERE L.Bestand <= L.Meldebestand ORDER BY L.Bestand""")
+
+def prognose_lagerreichweite(db: Database) -> List[tuple]:
+    # Liefert je gezähltem Produkt (Beschreibung, Bestand, Meldebestand, Verkauf pro Tag, Tage bis leer).
+    # Die Verkaufsgeschwindigkeit stammt aus den Stunden-Rollups der letzten PROGNOSE_TAGE Tage.
+    aktualisiere_verkaufs_rollup(db)
+    fenster = f"-{PROGNOSE_TAGE} days"
+    zeilen = db.execute_select("""
+        SELECT P.Beschreibung, L.Bestand, L.Meldebestand, COALESCE(SUM(V.Menge), 0)
+        FROM Lagerbestand L JOIN Produkt P ON P.P_ID = L.P_ID
+        LEFT JOIN Verkauf_Stunde V ON V.P_ID = L.P_ID AND V.Stunde >= strftime('%Y-%m-%d %H', 'now', ?, 'localtime')
+        GROUP BY L.P_ID ORDER BY P.Beschreibung
+    """, (fenster,))
+    if not zeilen:
+        return []
+    # Liegt der erste Verkauf im Fenster später (z.B. am ersten Lagertag), nur die tatsächlich vergangene Zeit zählen
+    erste_stunde = db.execute_select("SELECT MIN(Stunde) FROM Verkauf_Stunde WHERE Stunde >= strftime('%Y-%m-%d %H', 'now', ?, 'localtime')",
+                                     (fenster,))[0][0]
+    tage = PROGNOSE_TAGE
+    if erste_stunde is not None:
+        vergangen = datetime.now() - datetime.strptime(erste_stunde, "%Y-%m-%d %H")
+        tage = min(PROGNOSE_TAGE, max(vergangen.total_seconds() / 86400, 1 / 24))
+
+    bestand = np.array([z[1] for z in zeilen], dtype=float)
+    verkauft = np.array([z[3] for z in zeilen], dtype=float)
+    pro_tag = verkauft / tage
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reichweite = np.where(pro_tag > 0, np.maximum(bestand, 0) / pro_tag, np.inf)
+    return [(z[0], z[1], z[2], float(v), float(r)) for z, v, r in zip(zeilen, pro_tag, reichweite)]
+
+SIMULATION_PREISSCHRITTE = np.round(np.arange(-0.5, 0.51, 0.1), 2)  # Preisänderungen in Euro für die Szenario-Tabelle
+SIMULATION_ZUSATZTAGE = np.arange(0, 5)  # Zusätzliche Lagertage für die Szenario-Tabelle
+
+class Budgetsimulation:
+    # Was-wäre-wenn-Rechnung für Preise und Lagerdauer. Kaufmengen je Teilnehmer und Produkt und die Kontostände
+    # werden einmal in NumPy-Arrays geladen; jedes Szenario ist danach nur noch Matrixrechnung ohne Datenbank.
+    def __init__(self, db: Database):
+        teilnehmer = db.execute_select("""SELECT T.T_ID, T.Name, K.Kontostand FROM Teilnehmer T JOIN Konto K ON K.T_ID = T.T_ID
+                                          WHERE T.Checkout = 0 ORDER BY T.Name""")
+        produkte = db.execute_select("SELECT P_ID, Beschreibung, Preis FROM Produkt ORDER BY Beschreibung")
+        self.namen = [z[1] for z in teilnehmer]
+        self.produkte = [z[1] for z in produkte]
+        self.kontostaende = np.array([z[2] or 0 for z in teilnehmer], dtype=float)
+        self.preise = np.array([z[2] or 0 for z in produkte], dtype=float)
+
+        # Bisher gekaufte Mengen als Matrix (Teilnehmer x Produkte)
+        zeile_von = {z[0]: i for i, z in enumerate(teilnehmer)}
+        spalte_von = {z[0]: j for j, z in enumerate(produkte)}
+        mengen = np.zeros((len(teilnehmer), len(produkte)))
+        kaeufe = [(zeile_von[t_id], spalte_von[p_id], menge) for t_id, p_id, menge in db.execute_select("""
+            SELECT K.T_ID, T.P_ID, SUM(T.Menge) FROM Transaktion T JOIN Konto K ON K.K_ID = T.K_ID
+            WHERE T.Typ = 'Kauf' GROUP BY K.T_ID, T.P_ID""") if t_id in zeile_von and p_id in spalte_von]
+        if kaeufe:
+            zeilen, spalten, werte = zip(*kaeufe)
+            mengen[list(zeilen), list(spalten)] = werte
+
+        # Bisherige Lagertage ab dem ersten Tag laut Einstellungen, sonst ab dem ersten Kauf
+        einstellungen = get_einstellungen(db)
+        jetzt = datetime.now()
+        if einstellungen.ErsterTag is not None:
+            beginn = datetime.combine(einstellungen.ErsterTag, datetime.min.time())
+        else:
+            erster_kauf = db.execute_select("SELECT MIN(Datum) FROM Transaktion WHERE Typ = 'Kauf'")[0][0]
+            beginn = datetime.strptime(erster_kauf[:10], "%Y-%m-%d") if erster_kauf else jetzt
+        self.vergangene_tage = max((jetzt - beginn).total_seconds() / 86400, 1.0)
+        letzter_tag = einstellungen.letzter_tag
+        self.rest_tage = max((letzter_tag - jetzt.date()).days, 0) if letzter_tag is not None else 0
+        self.pro_tag = mengen / self.vergangene_tage  # Stück pro Tag je Teilnehmer und Produkt
+
+    def endkontostaende(self, preisaenderungen, zusatztage) -> np.ndarray:
+        # preisaenderungen: (Szenarien, Produkte) in Euro, zusatztage: (Szenarien,); liefert (Szenarien, Teilnehmer)
+        preisaenderungen = np.atleast_2d(np.asarray(preisaenderungen, dtype=float))
+        zusatztage = np.asarray(zusatztage, dtype=float).reshape(-1)
+        if (zusatztage < 0).any():
+            raise ValueError("Zusatztage dürfen nicht negativ sein!")
+        tage = self.rest_tage + zusatztage
+        ausgaben_pro_tag = np.maximum(self.preise + preisaenderungen, 0) @ self.pro_tag.T  # Senkungen enden bei 0 €, sonst brächten Käufe Geld
+        return self.kontostaende - ausgaben_pro_tag * tage[:, None]
+
+    def preisaenderung(self, produkt: str = None, betrag: float = 0.0) -> np.ndarray:
+        # Änderung für ein Produkt oder, ohne Produkt, für alle Produkte
+        aenderung = np.zeros(len(self.produkte))
+        if produkt is None:
+            aenderung[:] = betrag
+        else:
+            aenderung[self.produkte.index(produkt)] = betrag
+        return aenderung
+
+    def raster(self, produkt: str = None, preisschritte=SIMULATION_PREISSCHRITTE, zusatztage=SIMULATION_ZUSATZTAGE) -> np.ndarray:
+        # Anzahl Teilnehmer im Minus für jede Kombination aus Preisschritt und Zusatztagen, in einem Rechenschritt
+        einheit = self.preisaenderung(produkt, 1.0)
+        aenderungen = np.repeat(np.outer(preisschritte, einheit), len(zusatztage), axis=0)
+        tage = np.tile(zusatztage, len(preisschritte))
+        return (self.endkontostaende(aenderungen, tage) < 0).sum(axis=1).reshape(len(preisschritte), len(zusatztage))
+
+def render_endkontostaende(endstaende: np.ndarray, titel: str) -> str:
+    # Histogramm der Endkontostände als PNG (Base64), gezeichnet ohne pyplot wie die Verkaufsdiagramme
+    fig = Figure(figsize=(8, 3.5), dpi=90)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if endstaende.size == 0:
+        ax.text(0.5, 0.5, "Keine Teilnehmer", ha="center", va="center")
+        ax.set_axis_off()
+    else:
+        _, grenzen, balken = ax.hist(endstaende, bins=min(30, max(endstaende.size, 1)), edgecolor="white")
+        for balken_einzeln, links in zip(balken, grenzen[:-1]):
+            balken_einzeln.set_facecolor("tab:red" if links < 0 else "tab:green")
+        ax.axvline(0, color="black", linewidth=1)
+        ax.set_xlabel("Kontostand am Lagerende (€)")
+        ax.set_ylabel("Teilnehmer")
+    ax.set_title(titel)
+    fig.tight_layout()
+    puffer = io.BytesIO()
+    fig.savefig(puffer, format="png")
+    return base64.b64encode(puffer.getvalue()).decode("ascii")
+
+ARCHIV_VERZEICHNIS = "Archiv"  # Abgeschlossene Lagerjahre als schreibgeschützte, kompaktierte Datenbanken
+def jahr_des_kassenbuchs(db: Database) -> str:
+    # Erste Buchung nach den Überträgen, sonst gäbe ein Jahreswechsel im Dezember dem nächsten Lager das alte Jahr
+    jahr = db.execute_select("""SELECT strftime('%Y', MIN(Datum)) FROM Transaktion
+                                WHERE TRANS_ID > COALESCE((SELECT Bis_TRANS_ID FROM Uebertrag_Stand WHERE ID = 1), 0)""")[0][0]
+    return jahr or f"{datetime.now():%Y}"
+
+def jahreswechsel(db: Database, verzeichnis: str = ARCHIV_VERZEICHNIS) -> str:
+    # Archiviert das laufende Lagerjahr mit VACUUM INTO und beginnt in derselben Datei ein neues Kassenbuch.
+    # Restguthaben werden als erste Buchung des neuen Jahres übertragen, damit die Kontenprüfung aufgeht.
+    if _kauf_spool is not None and _kauf_spool.ausstehend():
+        raise ValueError("Es sind noch Käufe im Spool, bitte warten bis alle gebucht sind.")
+    os.makedirs(verzeichnis, exist_ok=True)
+    jahr = jahr_des_kassenbuchs(db)
+    archiv = os.path.join(verzeichnis, f"Lagerbank_{jahr}.db")
+    nummer = 2
+    while os.path.exists(archiv):
+        archiv = os.path.join(verzeichnis, f"Lagerbank_{jahr}_{nummer}.db")
+        nummer += 1
+    db.connection.commit()
+    db.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")  # Ältere Datenbanken beim folgenden VACUUM umstellen
+    # VACUUM INTO läuft nicht in einer Transaktion; Schreibvorgänge anderer Verbindungen danach würden ungesichert gelöscht
+    data_version = db._lese_data_version()
+    db.connection.execute("VACUUM INTO ?", (archiv,))  # Kompakte, konsistente Kopie ohne freie Seiten
+    os.chmod(archiv, 0o444)  # Archiv schreibgeschützt ablegen
+    print(f"Lagerjahr {jahr} wurde nach {archiv} archiviert.")
+
+    with db.transaction() as cursor:
+        cursor.execute("BEGIN IMMEDIATE")
+        if db._lese_data_version() != data_version:
+            os.chmod(archiv, 0o644)
+            os.remove(archiv)  # Unvollständiges Archiv verwerfen, damit ein neuer Versuch denselben Namen bekommt
+            raise ValueError("Während der Archivierung wurde gebucht, bitte den Jahreswechsel erneut ausführen.")
+        for tabelle in JAHRESWECHSEL_LEEREN:
+            cursor.execute(f"DELETE FROM {tabelle}")
+        cursor.execute("""INSERT INTO Transaktion (K_ID, Menge, Typ, Datum)
+                          SELECT K_ID, ABS(ROUND(Kontostand, 2)), CASE WHEN Kontostand > 0 THEN 'Einzahlung' ELSE 'Auszahlung' END, CURRENT_TIMESTAMP
+                          FROM Konto WHERE ROUND(Kontostand, 2) != 0""")
+        cursor.execute("""INSERT INTO Uebertrag_Stand (ID, Bis_TRANS_ID, Datum) VALUES (1, (SELECT COALESCE(MAX(TRANS_ID), 0) FROM Transaktion), CURRENT_TIMESTAMP)
+                          ON CONFLICT (ID) DO UPDATE SET Bis_TRANS_ID = excluded.Bis_TRANS_ID, Datum = excluded.Datum""")
+        cursor.execute("UPDATE Konto SET Kontostand = ROUND(Kontostand, 2), Einzahlung = MAX(ROUND(Kontostand, 2), 0), Eröffnungsdatum = CURRENT_TIMESTAMP")
+        cursor.execute("UPDATE Teilnehmer SET Checkout = 0")
+        cursor.execute("UPDATE Produkt SET Anzahl_verkauft = 0")  # Lagerbestand bleibt: die Ware liegt noch im Lager
+    db.connection.execute("VACUUM")  # Laufende Datenbank wieder klein machen
+    _ausgabenlimits.ungueltig()
+    _diagramm_cache.clear()
+    db.bus.veroeffentlichen(DATENBANK_GEAENDERT, extern=False)
+    return archiv
+
+def _jahres_sql(schema: str, mit_historie: bool) -> Tuple[str, str]:
+    # Kennzahlen je Jahr und Umsatz je Produkt für ein angehängtes Schema
+    preis = preis_sql(schema) if mit_historie else "P.Preis"  # Archive von vor der Preishistorie
+    jahr_sql = f"""
+        SELECT ?, (SELECT COUNT(*) FROM {schema}.Konto),
+               (SELECT COALESCE(SUM(Menge), 0) FROM {schema}.Transaktion WHERE Typ = 'Einzahlung'),
+               (SELECT COALESCE(ROUND(SUM(T.Menge * {preis}), 2), 0) FROM {schema}.Transaktion T
+                JOIN {schema}.Produkt P ON P.P_ID = T.P_ID WHERE T.Typ = 'Kauf')
+    """
+    produkt_sql = f"""
+        SELECT ?, P.Beschreibung, SUM(T.Menge), ROUND(SUM(T.Menge * {preis}), 2)
+        FROM {schema}.Transaktion T JOIN {schema}.Produkt P ON P.P_ID = T.P_ID
+        WHERE T.Typ = 'Kauf' GROUP BY P.P_ID ORDER BY 3 DESC
+    """
+    return jahr_sql, produkt_sql
+
+def jahresvergleich(db: Database, verzeichnis: str = ARCHIV_VERZEICHNIS) -> Tuple[List[tuple], List[tuple]]:
+    # Hängt die Archive nacheinander per ATTACH an und liefert (Jahre, Produkte) einschließlich des laufenden Jahres.
+    # Jahre: (Jahr, Teilnehmer, Einzahlungen, Umsatz); Produkte: (Jahr, Produkt, Menge, Umsatz)
+    quellen = []
+    if os.path.isdir(verzeichnis):
+        quellen = [(name[len("Lagerbank_"):-len(".db")], os.path.join(verzeichnis, name))
+                   for name in sorted(os.listdir(verzeichnis)) if name.startswith("Lagerbank_") and name.endswith(".db")]
+    jahre, produkte = [], []
+    for jahr, pfad in quellen:
+        db.connection.execute("ATTACH DATABASE ? AS archiv", (pfad,))
+        try:
+            mit_historie = db.execute_select("SELECT 1 FROM archiv.sqlite_master WHERE name = 'Preis_Historie'") != []
+            jahr_sql, produkt_sql = _jahres_sql("archiv", mit_historie)
+            jahre += db.execute_select(jahr_sql, (jahr,))
+            produkte += db.execute_select(produkt_sql, (jahr,))
+        finally:
+            db.connection.execute("DETACH DATABASE archiv")
+    laufend = f"{jahr_des_kassenbuchs(db)} (laufend)"
+    jahr_sql, produkt_sql = _jahres_sql("main", True)
+    jahre += db.execute_select(jahr_sql, (laufend,))
+    produkte += db.execute_select(produkt_sql, (laufend,))
+    return jahre, produkte
+
+class Datenbankwartung:
+    # Führt im Leerlauf der Kasse jeweils einen kleinen Wartungsschritt aus: Statistiken für den Query-Planer,
+    # Rückgabe freier Seiten per incremental_vacuum und quick_check. Leerlauf = keine Käufe und keine Schreibvorgänge.
+    # quick_check liest immer die ganze Datei; er läuft deshalb in einem eigenen Thread mit eigener Leseverbindung,
+    # sein Ergebnis wertet ein späterer Schritt im GUI-Thread aus, und neue Aktivität bricht ihn ab.
+    def __init__(self, db: Database):
+        self.db = db
+        self.letzte_aktivitaet = monotonic()
+        self.letzter_optimize = None
+        self.letzter_quick_check = None
+        self.integritaet = None  # Ergebnis des letzten quick_check
+        self._executor = None
+        self._quick_check = None  # Future des laufenden quick_check
+        self._pruef_verbindung = None  # Verbindung des laufenden quick_check, zum Abbrechen
+        db.bus.abonnieren(self.aktivitaet, KONTOSTAND_GEAENDERT, TABELLE_GEAENDERT, DATENBANK_GEAENDERT)
+
+    def aktivitaet(self, art=None, daten=None):
+        self.letzte_aktivitaet = monotonic()
+        verbindung = self._pruef_verbindung
+        if verbindung is not None:
+            try:
+                verbindung.interrupt()  # Die Lesesperre des Checks soll keine Käufe aufhalten
+            except sqlite3.Error:
+                pass  # Check ist gerade fertig geworden
+
+    def _quick_check_ausfuehren(self, pfad: str) -> List[str]:
+        # Läuft im Worker-Thread
+        verbindung = sqlite3.connect(f"file:{pfad}?mode=ro", uri=True, isolation_level=None, check_same_thread=False)
+        self._pruef_verbindung = verbindung
+        try:
+            return [zeile[0] for zeile in verbindung.execute("PRAGMA quick_check(10)")]
+        finally:
+            self._pruef_verbindung = None
+            verbindung.close()
+
+    def _quick_check_auswerten(self):
+        future, self._quick_check = self._quick_check, None
+        try:
+            ergebnis = future.result()
+        except sqlite3.Error as e:
+            if getattr(e, "sqlite_errorcode", None) == sqlite3.SQLITE_INTERRUPT:
+                self.letzter_quick_check = None  # Durch einen Kauf abgebrochen: im nächsten Leerlauf erneut prüfen
+            print(f"Wartung: quick_check nicht abgeschlossen: {e}")
+            return
+        self.integritaet = ergebnis
+        if ergebnis != ["ok"]:
+            print(f"Wartung: quick_check meldet Fehler: {ergebnis}")
+            messagebox.showerror("Fehler", "Die Datenbank ist beschädigt:\n" + "\n".join(ergebnis) + "\nBitte sofort ein Backup erstellen.")
+        else:
+            print("Wartung: quick_check ohne Befund.")
+
+    def leerlauf(self) -> bool:
+        return monotonic() - self.letzte_aktivitaet >= WARTUNG_LEERLAUF_S and not self.db.connection.in_transaction
+
+    def schritt(self, erzwingen: bool = False) -> str:
+        # Liefert den Namen des ausgeführten Schritts oder None; pro Aufruf höchstens ein Schritt
+        if self._quick_check is not None:
+            if not self._quick_check.done():
+                return None  # Kein weiterer Schritt, solange der Check die Datei liest
+            self._quick_check_auswerten()
+            return "quick_check"
+        if not erzwingen and not self.leerlauf():
+            return None
+        jetzt = monotonic()
+        verbindung = self.db.connection
+        if self.letzter_optimize is None or jetzt - self.letzter_optimize >= WARTUNG_OPTIMIZE_S:
+            verbindung.execute(f"PRAGMA analysis_limit = {WARTUNG_ANALYSE_LIMIT}")
+            if verbindung.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is None:
+                verbindung.execute("ANALYZE")  # Erste Statistiken; optimize allein analysiert nur bei Bedarf
+            verbindung.execute("PRAGMA optimize")
+            verbindung.commit()
+            self.letzter_optimize = jetzt
+            print("Wartung: Statistiken für den Query-Planer aktualisiert.")
+            return "optimize"
+        if verbindung.execute("PRAGMA auto_vacuum").fetchone()[0] == 2 and verbindung.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            verbindung.executescript(f"PRAGMA incremental_vacuum({WARTUNG_VACUUM_SEITEN})")  # execute() gäbe nur eine Seite pro Schritt frei
+            print(f"Wartung: bis zu {WARTUNG_VACUUM_SEITEN} freie Seiten zurückgegeben.")
+            return "incremental_vacuum"
+        if self.letzter_quick_check is None or jetzt - self.letzter_quick_check >= WARTUNG_QUICK_CHECK_S:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            pfad = verbindung.execute("PRAGMA database_list").fetchone()[2]  # Datei der Hauptdatenbank
+            self.letzter_quick_check = jetzt
+            self._quick_check = self._executor.submit(self._quick_check_ausfuehren, pfad)
+            print("Wartung: quick_check gestartet.")
+            return "quick_check_gestartet"
+        return None
+
+    def alles(self):
+        # Vollständige Wartung ohne Leerlaufprüfung, z.B. über --wartung bei stehender Kasse
+        self.letzter_optimize = self.letzter_quick_check = None
+        if self.db.connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self.db.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.db.connection.execute("VACUUM")  # Einmalige Umstellung älterer Datenbanken
+            print("Wartung: Datenbank auf auto_vacuum=INCREMENTAL umgestellt.")
+        while self.schritt(erzwingen=True) is not None:
+            if self._quick_check is not None:
+                self._quick_check.exception()  # Hier darf gewartet werden, die Kasse steht
+
+BACKUP_PRUEFINTERVALL_MS = 60 * 1000  # Wie oft geprüft wird, ob laut Einstellung ein automatisches Backup fällig ist
+
+def erstelle_automatisches_backup(db: Database) -> str:
+    # Kopie über die Backup-API von SQLite; nur die neuesten BackupAnzahl Dateien bleiben erhalten
+    einstellungen = get_einstellungen(db)
+    os.makedirs(einstellungen.BackupVerzeichnis, exist_ok=True)
+    pfad = os.path.join(einstellungen.BackupVerzeichnis, f"Auto_Backup_{datetime.now():%Y%m%d_%H%M%S}.db")
+    ziel = sqlite3.connect(pfad)
+    try:
+        db.connection.backup(ziel)
+    finally:
+        ziel.close()
+    alte = sorted(name for name in os.listdir(einstellungen.BackupVerzeichnis) if name.startswith("Auto_Backup_") and name.endswith(".db"))
+    for name in alte[:-einstellungen.BackupAnzahl]:
+        os.remove(os.path.join(einstellungen.BackupVerzeichnis, name))
+    print(f"Automatisches Backup erstellt: {pfad}")
+    return pfad
+
+VERLAUF_SEITENGROESSE = 100  # Anzahl der Transaktionen, die pro Seite im Verlauf geladen werden
+
+def fetch_transactions(db: Database, user_id: int, nach: Tuple = None, limit: int = VERLAUF_SEITENGROESSE) -> List[Tuple]:
+    # Keyset-Pagination über (Datum, TRANS_ID): "nach" ist (Datum, TRANS_ID) der letzten Zeile der vorherigen Seite
+    query = f"""
+        SELECT T.TRANS_ID, T.Datum, T.Typ, P.Beschreibung, T.Menge,
+               ROUND({PREIS_SQL}, 2),
+               ROUND(CASE WHEN T.Typ = 'Kauf' THEN {PREIS_SQL} * T.Menge ELSE T.Menge END, 2)
+        FROM Transaktion T
+        LEFT JOIN Produkt P ON P.P_ID = T.P_ID
+        WHERE T.K_ID = ?
+    """
+    values = (user_id,)
+    if nach is not None:
+        query += " AND (T.Datum, T.TRANS_ID) < (?, ?)"
+        values += tuple(nach)
+    query += " ORDER BY T.Datum DESC, T.TRANS_ID DESC LIMIT ?"
+    transactions = db.execute_select(query, values + (limit,))  # Ruft eine Seite der Transaktionen für einen bestimmten Benutzer ab
     return transactions
 
+def normalisiere_suchbegriff(text: str) -> str:
+    # Gleiche Umwandlung wie bei der Barcode-Erstellung, damit "Müller" und "Mueller" gefunden werden
+    return str(text).strip().casefold().replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue').replace('ß', 'ss')
+
+class SuchIndex:
+    # Sortiertes Array aus (Suchschlüssel, Anzeigename) für Präfixsuche mit bisect, ohne Datenbankabfrage pro Tastendruck
+    def __init__(self):
+        self._schluessel = []  # Sortierte Liste von (normalisierter Begriff, Anzeigename)
+        self._begriffe = {}  # Anzeigename -> Liste seiner normalisierten Begriffe, in Einfügereihenfolge
+        self._namen = []  # Sortierte Anzeigenamen, wie ORDER BY Name, auch nach einzelnen Änderungen
+        self._exakt = {}  # Name oder Barcode in Originalschreibweise -> Anzeigenamen
+        self._roh = {}  # Anzeigename -> seine Namen und Barcodes in Originalschreibweise
+
+    def hinzufuegen(self, anzeige: str, *begriffe: str):
+        for begriff in (anzeige, *begriffe):
+            if begriff is None:
+                continue
+            exakt = Barcode_Nummern.normalisieren(str(begriff))
+            if anzeige not in self._exakt.setdefault(exakt, []):
+                self._exakt[exakt].append(anzeige)
+                self._roh.setdefault(anzeige, []).append(exakt)
+            schluessel = normalisiere_suchbegriff(begriff)
+            if schluessel in self._begriffe.get(anzeige, ()):
+                continue
+            if anzeige not in self._begriffe:
+                bisect.insort(self._namen, anzeige)
+            bisect.insort(self._schluessel, (schluessel, anzeige))
+            self._begriffe.setdefault(anzeige, []).append(schluessel)
+
+    def entfernen(self, anzeige: str):
+        if anzeige in self._begriffe:
+            del self._namen[bisect.bisect_left(self._namen, anzeige)]
+        for exakt in self._roh.pop(anzeige, []):
+            self._exakt[exakt].remove(anzeige)
+            if not self._exakt[exakt]:
+                del self._exakt[exakt]
+        for schluessel in self._begriffe.pop(anzeige, []):
+            i = bisect.bisect_left(self._schluessel, (schluessel, anzeige))
+            if i < len(self._schluessel) and self._schluessel[i] == (schluessel, anzeige):
+                del self._schluessel[i]
+
+    def umbenennen(self, alt: str, neu: str, *begriffe: str):
+        self.entfernen(alt)
+        self.hinzufuegen(neu, *begriffe)
+
+    def begriffe(self, anzeige: str) -> List[str]:
+        return list(self._begriffe.get(anzeige, []))
+
+    def __contains__(self, anzeige: str) -> bool:
+        return anzeige in self._begriffe
+
+    def aufloesen(self, begriff: str):
+        # Liefert den Anzeigenamen zu einem exakt passenden Namen oder Barcode; nur wenn es den nicht gibt,
+        # zählt die normalisierte Schreibweise ("Mueller" für "Müller"), und auch dann nur bei genau einem Treffer
+        if begriff in self._begriffe:
+            return begriff
+        anzeigen = self._exakt.get(Barcode_Nummern.normalisieren(str(begriff or "")), [])
+        if len(anzeigen) == 1:
+            return anzeigen[0]
+        if anzeigen:
+            return None  # Gleicher Barcode bei mehreren Einträgen: nicht raten
+        schluessel = normalisiere_suchbegriff(begriff)
+        i = bisect.bisect_left(self._schluessel, (schluessel,))
+        treffer = set()
+        while i < len(self._schluessel) and self._schluessel[i][0] == schluessel:
+            treffer.add(self._schluessel[i][1])
+            i += 1
+        return treffer.pop() if len(treffer) == 1 else None
+
+    def alle(self) -> List[str]:
+        return list(self._namen)
+
+    def suche(self, text: str, limit: int = 50) -> List[str]:
+        schluessel = normalisiere_suchbegriff(text)
+        if not schluessel:
+            return self.alle()
+        treffer = {}
+        # Präfixtreffer über binäre Suche
+        i = bisect.bisect_left(self._schluessel, (schluessel,))
+        while i < len(self._schluessel) and self._schluessel[i][0].startswith(schluessel) and len(treffer) < limit:
+            treffer[self._schluessel[i][1]] = None
+            i += 1
+        # Teilstring-Treffer (z.B. Nachname) ergänzen, rein im Speicher
+        if len(treffer) < limit:
+            for begriff, anzeige in self._schluessel:
+                if schluessel in begriff and anzeige not in treffer:
+                    treffer[anzeige] = None
+                    if len(treffer) >= limit:
+                        break
+        return list(treffer)
+
+_user_index = None
+_product_index = None
+
+def get_user_index(db: Database) -> SuchIndex:
+    global _user_index
+    if _user_index is None:
+        _user_index = SuchIndex()
+        for name, tn_barcode in db.execute_select("SELECT Name, TN_Barcode FROM Teilnehmer ORDER BY Name"):
+            _user_index.hinzufuegen(name, tn_barcode)
+    return _user_index
+
+def get_product_index(db: Database) -> SuchIndex:
+    global _product_index
+    if _product_index is None:
+        _product_index = SuchIndex()
+        for beschreibung, p_barcode in db.execute_select("SELECT Beschreibung, P_Barcode FROM Produkt ORDER BY Preis"):
+            _product_index.hinzufuegen(beschreibung, p_barcode)
+        for beschreibung, barcode in db.execute_select("SELECT Produkt.Beschreibung, Produkt_Barcode.Barcode FROM Produkt_Barcode JOIN Produkt ON Produkt.P_ID = Produkt_Barcode.P_ID"):
+            _product_index.hinzufuegen(beschreibung, barcode)
+    return _product_index
+
+def reset_such_indizes():
+    # Verwirft die Indizes, z.B. nachdem die Datenbank gelöscht wurde
+    global _user_index, _product_index
+    _user_index = None
+    _product_index = None
+
+def _such_indizes_aktualisieren(art: str, daten: dict):
+    # Hält die Suchindizes über Änderungsereignisse inkrementell aktuell
+    if art == DATENBANK_GEAENDERT:
+        reset_such_indizes()  # Unbekannte Änderung: beim nächsten Zugriff neu aufbauen
+        return
+    index = _user_index if art in TEILNEHMER_EREIGNISSE else _product_index
+    if index is None:
+        return  # Noch nicht aufgebaut, wird beim ersten Zugriff vollständig geladen
+    if art in (TEILNEHMER_HINZUGEFUEGT, PRODUKT_HINZUGEFUEGT):
+        index.hinzufuegen(daten["name"], daten.get("barcode"))
+    elif art == TEILNEHMER_GEAENDERT:
+        index.umbenennen(daten["alt"], daten["name"], daten.get("barcode"))  # Teilnehmer haben genau einen Barcode
+    elif art == PRODUKT_GEAENDERT:
+        if daten["alt"] != daten["name"]:
+            alter_name = normalisiere_suchbegriff(daten["alt"])
+            index.umbenennen(daten["alt"], daten["name"], *[b for b in index.begriffe(daten["alt"]) if b != alter_name])
+        index.hinzufuegen(daten["name"], daten.get("barcode"))  # Produkte behalten alle zusätzlichen Barcodes
+    elif art in (TEILNEHMER_GELOESCHT, PRODUKT_GELOESCHT):
+        index.entfernen(daten["name"])
+
+def abonniere_such_indizes(bus: AenderungsBus):
+    bus.abonnieren(_such_indizes_aktualisieren, *TEILNEHMER_EREIGNISSE, *PRODUKT_EREIGNISSE, DATENBANK_GEAENDERT)
+
+def _aktiviere_typeahead(combobox: ttk.Combobox, db: Database, get_index: Callable, arten: Tuple[str, ...]):
+    # Filtert die Werte der Combobox während der Eingabe und aktualisiert sie nur bei passenden Änderungen
+    def filtern(event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        combobox['values'] = get_index(db).suche(combobox.get())
+    def aktualisieren(art, daten):
+        combobox['values'] = get_index(db).alle()
+    combobox['values'] = get_index(db).alle()
+    combobox.bind("<KeyRelease>", filtern)
+    db.bus.abonnieren(aktualisieren, *arten, DATENBANK_GEAENDERT)
+
+def aktiviere_user_typeahead(combobox: ttk.Combobox, db: Database):
+    _aktiviere_typeahead(combobox, db, get_user_index, TEILNEHMER_EREIGNISSE)
+
+def aktiviere_product_typeahead(combobox: ttk.Combobox, db: Database):
+    _aktiviere_typeahead(combobox, db, get_product_index, PRODUKT_EREIGNISSE)
+
 def update_product_dropdowns(product_combobox: ttk.Combobox, db: Database):
-    products = fetch_products(db)  # Ruft Produktbeschreibungen ab
+    products = get_product_index(db).alle()  # Produktbeschreibungen aus dem Suchindex statt erneuter Abfrage
     product_combobox['values'] = products  # Aktualisiert die Werte der Combobox
  
 def update_user_dropdowns(*comboboxes, db):
-    users = fetch_users(db)  # Ruft Benutzernamen ab
+    users = get_user_index(db).alle()  # Benutzernamen aus dem Suchindex statt erneuter Abfrage
     for combobox in comboboxes:
         combobox['values'] = users  # Aktualisiert die Werte der Comboboxes
       
-def barcode_scanner():
-            cap = cv2.VideoCapture(0)
+KAMERAPROFIL_DATEI = "Kameraprofile.json"  # Eingemessene Aufnahmeeinstellungen je Kamera
+# Getestete Modi (Codec, Breite, Höhe, FPS); MJPEG liefert bei USB-Kameras hohe Auflösungen mit voller Bildrate
+KAMERA_MODI = [("MJPG", 1280, 720, 30), ("MJPG", 1920, 1080, 30), ("MJPG", 800, 600, 30), ("MJPG", 640, 480, 30),
+               ("YUYV", 1280, 720, 10), ("YUYV", 640, 480, 30)]
+KAMERA_TEST_BILDER = 15  # Bilder pro Modus, aus denen die tatsächliche Bildrate gemessen wird
+KAMERA_MIN_FPS = 15  # Modi mit geringerer Bildrate wirken beim Scannen träge
+KAMERA_MAX_PIXEL = 1280 * 720  # Mehr Auflösung hilft pyzbar kaum, kostet aber Dekodierzeit
+
+def kamera_kennung(index: int) -> str:
+    # Gerätename unter Linux, damit das Profil auch nach geänderter Reihenfolge der USB-Kameras passt
+    try:
+        with open(f"/sys/class/video4linux/video{index}/name") as datei:
+            return datei.read().strip()
+    except OSError:
+        return f"Kamera {index}"
+
+def _fourcc_text(wert: float) -> str:
+    code = int(wert)
+    return "".join(chr((code >> 8 * i) & 0xFF) for i in range(4))
+
+def lade_kameraprofil(index: int) -> dict:
+    try:
+        with open(KAMERAPROFIL_DATEI, encoding="utf-8") as datei:
+            return json.load(datei).get(kamera_kennung(index))
+    except (OSError, ValueError):
+        return None
+
+def speichere_kameraprofil(index: int, profil: dict):
+    try:
+        with open(KAMERAPROFIL_DATEI, encoding="utf-8") as datei:
+            profile = json.load(datei)
+    except (OSError, ValueError):
+        profile = {}
+    profile[kamera_kennung(index)] = profil
+    with open(KAMERAPROFIL_DATEI, "w", encoding="utf-8") as datei:
+        json.dump(profile, datei, indent=2, ensure_ascii=False)
+
+def _kamera_einstellen(cap: cv2.VideoCapture, profil: dict):
+    # Codec vor der Auflösung setzen, sonst verwerfen manche V4L2-Treiber die Auflösung wieder
+    if profil.get("fourcc"):
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*profil["fourcc"]))
+    if profil.get("breite") and profil.get("hoehe"):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, profil["breite"])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, profil["hoehe"])
+    if profil.get("fps"):
+        cap.set(cv2.CAP_PROP_FPS, profil["fps"])
+    # Optional von Hand im Profil eingetragen, z.B. fester Fokus auf die Ablagefläche statt suchendem Autofokus
+    if "autofokus" in profil:
+        cap.set(cv2.CAP_PROP_AUTOFOCUS, 1 if profil["autofokus"] else 0)
+    if "fokus" in profil:
+        cap.set(cv2.CAP_PROP_FOCUS, profil["fokus"])
+    if "belichtung" in profil:
+        cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)  # V4L2: 1 = manuelle Belichtung
+        cap.set(cv2.CAP_PROP_EXPOSURE, profil["belichtung"])
+
+def kamera_oeffnen(index: int, standard: dict = None) -> cv2.VideoCapture:
+    # Öffnet die Kamera mit dem eingemessenen Profil (sonst "standard") und nur einem Bild Puffer,
+    # damit nach einer Pause kein veraltetes Bild dekodiert wird
+    cap = cv2.VideoCapture(index)
+    profil = lade_kameraprofil(index) or standard
+    if profil:
+        _kamera_einstellen(cap, profil)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+def kamera_modi_testen(index: int) -> List[dict]:
+    # Öffnet die Kamera für jeden Modus neu und misst, was der Treiber tatsächlich liefert
+    ergebnisse = []
+    for fourcc, breite, hoehe, fps in KAMERA_MODI:
+        cap = cv2.VideoCapture(index)
+        try:
+            if not cap.isOpened():
+                raise Exception(f"Kamera {index} kann nicht geöffnet werden")
+            _kamera_einstellen(cap, {"fourcc": fourcc, "breite": breite, "hoehe": hoehe, "fps": fps})
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            ret, bild = cap.read()  # Das erste Bild enthält die Anlaufzeit der Kamera
+            if not ret:
+                continue
+            start = perf_counter()
+            gelesen = 0
+            for _ in range(KAMERA_TEST_BILDER):
+                ret, neues_bild = cap.read()
+                if not ret:
+                    break
+                bild = neues_bild  # Nur gültige Bilder übernehmen; ein Lesefehler liefert None
+                gelesen += 1
+            dauer = perf_counter() - start
+            if gelesen == 0:
+                continue  # Modus liefert nach dem ersten Bild nichts mehr
+            ergebnisse.append({
+                "fourcc": _fourcc_text(cap.get(cv2.CAP_PROP_FOURCC)) or fourcc,
+                "breite": int(bild.shape[1]),
+                "hoehe": int(bild.shape[0]),
+                "fps": fps,
+                "gemessen_fps": round(gelesen / dauer, 1) if dauer > 0 else 0.0,
+            })
+        finally:
+            cap.release()
+    return ergebnisse
+
+def waehle_kameramodus(ergebnisse: List[dict]) -> dict:
+    # Höchste Auflösung bis KAMERA_MAX_PIXEL unter den flüssigen Modi, sonst der schnellste Modus
+    if not ergebnisse:
+        return None
+    fluessig = [e for e in ergebnisse if e["gemessen_fps"] >= KAMERA_MIN_FPS]
+    if not fluessig:
+        return max(ergebnisse, key=lambda e: e["gemessen_fps"])
+    return max(fluessig, key=lambda e: (min(e["breite"] * e["hoehe"], KAMERA_MAX_PIXEL), e["gemessen_fps"]))
+
+def kamera_einmessen(index: int) -> Tuple[dict, List[dict]]:
+    # Testet die Modi, speichert den besten als Profil der Kamera und liefert (Profil, alle Ergebnisse)
+    stop_scanner_prozess()  # Der Scanner-Prozess hält die Kamera sonst belegt
+    ergebnisse = kamera_modi_testen(index)
+    profil = waehle_kameramodus(ergebnisse)
+    if profil is None:
+        raise Exception(f"Kamera {index} liefert keine Bilder")
+    speichere_kameraprofil(index, profil)
+    print(f"Kameraprofil für {kamera_kennung(index)} gespeichert: {profil}")
+    return profil, ergebnisse
+
+def dekodiere_barcodes(frame) -> List[str]:
+    # Alle Barcodes eines Bildes, normalisiert wie beim Erzeugen; Nummern mit falscher Prüfziffer gelten als Fehllesung
+    werte = [Barcode_Nummern.normalisieren(obj.data.decode("utf-8")) for obj in pyzbar.decode(frame)]
+    return [wert for wert in werte if Barcode_Nummern.zulaessig(wert)]
+
+KORB_BESTAETIGUNG_BILDER = 8  # So viele aufeinanderfolgende Bilder müssen denselben Korb zeigen
+
+class KorbErkennung:
+    # Korbmodus: alle Barcodes eines Bildes zählen; bestätigt wird erst, wenn mehrere Bilder hintereinander dasselbe zeigen
+    def __init__(self, bilder: int = KORB_BESTAETIGUNG_BILDER):
+        self.bilder = bilder
+        self._letzter = None
+        self._gleich = 0
+
+    def bild(self, barcodes: List[str]):
+        # Liefert ((Barcode, Anzahl), ...) sortiert, sobald der Korb bestätigt ist, sonst None
+        korb = tuple(sorted(Counter(barcodes).items()))  # Gleiche Produkte nebeneinander ergeben die Anzahl
+        if korb != self._letzter:
+            self._letzter, self._gleich = korb, 0
+        self._gleich += 1
+        if not korb or self._gleich < self.bilder:
+            return None
+        return korb
+
+def barcode_scanner(korb_annehmen: Callable = None):
+            # Liefert einen Barcode oder im Korbmodus den bestätigten Korb als ((Barcode, Anzahl), ...)
+            einstellungen = _einstellungen.aktuell()
+            if einstellungen.ScannerProzess:
+                return get_scanner_prozess().scan(korb_annehmen)  # Aufnahme und Dekodierung laufen im Kindprozess
+            cap = kamera_oeffnen(einstellungen.Kamera)
+            korb_erkennung = KorbErkennung() if korb_annehmen is not None else None
             barcode_value = None
             while True:
                 ret, frame = cap.read()
@@ -178,9 +1296,17 @@ def barcode_scanner():
                     cap.release()
                     cv2.destroyAllWindows()
                     return None
-                decoded_objects = pyzbar.decode(frame)
-                if decoded_objects:
-                    barcode_value = decoded_objects[0].data.decode("utf-8")
+                werte = dekodiere_barcodes(frame)
+                if korb_erkennung is not None:
+                    korb = korb_erkennung.bild(werte)
+                    if korb is not None and korb_annehmen(korb):
+                        print(f"Korb erkannt: {korb}")
+                        cap.release()
+                        cv2.destroyAllWindows()
+                        return korb
+                    werte = [wert for wert in werte if wert == "Brake"]  # Im Korbmodus beendet nur Brake den Scan
+                if werte:
+                    barcode_value = werte[0]
                     if barcode_value == "Brake":
                         print("Barcode Brake erkannt")
                         cap.release()
@@ -197,17 +1323,643 @@ def barcode_scanner():
                     cv2.destroyAllWindows()
                     return None
 
+def _scanner_prozess_schleife(shm_name, form, plaetze, kamera, bild_zaehler, zeiten, verbindung, steuerung, stop_event):
+    # Läuft im Kindprozess: Bilder direkt in den Ringpuffer lesen, dekodieren und nur Barcodes zurückschicken
+    # Die Kamera ist nur zwischen "start" und "pause" geöffnet, damit andere Teile des Programms sie nutzen können
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((plaetze, *form), dtype=np.uint8, buffer=shm.buf)  # NumPy-Sicht auf den gemeinsamen Speicher, keine Kopie
+    cap = None
+    zaehler = 0
+    platz = None
+    letzter_wert = None
+    letzte_zeit = 0.0
+    korb_erkennung = KorbErkennung()
+    letzter_korb = None
+    letzte_korb_zeit = 0.0
+    try:
+        while not stop_event.is_set():
+            if steuerung.poll(0 if cap is not None else 0.1):
+                befehl = steuerung.recv()
+                if befehl == "start" and cap is None:
+                    cap = kamera_oeffnen(kamera, {"breite": form[1], "hoehe": form[0]})  # Eingemessenes Profil, sonst Größe des Ringpuffers; andere Größen werden unten skaliert
+                    korb_erkennung = KorbErkennung()
+                    letzter_wert = letzter_korb = None  # Neuer Scan: auch denselben Barcode wieder melden
+                elif befehl == "pause" and cap is not None:
+                    cap.release()
+                    cap = None
+                    bild_zaehler.value = -1  # Kein veraltetes Bild als Vorschau zeigen
+            if cap is None:
+                continue
+            platz = ring[zaehler % plaetze]
+            zeit_platz = 2 * (zaehler % (len(zeiten) // 2))  # Aufnahme- und Dekodierzeit für den Diagnose-Tab
+            start = perf_counter()
+            ret, frame = cap.read(platz)  # OpenCV schreibt direkt in den Platz, wenn Größe und Typ passen
+            if not ret:
+                verbindung.send(("fehler", "Kamerafehler!"))
+                cap.release()
+                cap = None
+                continue
+            if not np.may_share_memory(frame, platz):
+                cv2.resize(frame, (form[1], form[0]), dst=platz)  # Andere Kameraauflösung: in den Platz skalieren
+            zeiten[zeit_platz] = perf_counter() - start
+            bild_zaehler.value = zaehler  # Platz ist vollständig geschrieben und darf angezeigt werden
+            zaehler += 1
+            start = perf_counter()
+            werte = dekodiere_barcodes(frame)  # Volle Auflösung des Profils dekodieren, der Ringpuffer dient nur der Vorschau
+            zeiten[zeit_platz + 1] = perf_counter() - start
+            jetzt = monotonic()
+            for barcode_value in werte:
+                # Denselben Barcode nicht bei jedem Bild erneut senden, damit die Pipe nicht vollläuft
+                if barcode_value != letzter_wert or jetzt - letzte_zeit > 1.0:
+                    verbindung.send(("barcode", barcode_value))
+                    letzter_wert, letzte_zeit = barcode_value, jetzt
+            korb = korb_erkennung.bild(werte)
+            if korb is not None and (korb != letzter_korb or jetzt - letzte_korb_zeit > 1.0):
+                verbindung.send(("korb", korb))  # Alle Barcodes des Bildes für den Korbmodus
+                letzter_korb, letzte_korb_zeit = korb, jetzt
+    finally:
+        if cap is not None:
+            cap.release()
+        del ring, platz
+        shm.close()
+        verbindung.close()
+        steuerung.close()
+
+class ScannerProzess:
+    def __init__(self, form: Tuple[int, int, int] = SCANNER_BILD_FORM, plaetze: int = SCANNER_RINGPUFFER_PLAETZE, kamera: int = 0):
+        ctx = mp.get_context("spawn")  # Kein fork, da der Elternprozess bereits Tk initialisiert hat
+        self.form = form
+        self.plaetze = plaetze
+        self.kamera = kamera
+        self.shm = shared_memory.SharedMemory(create=True, size=plaetze * int(np.prod(form)))
+        self.ring = np.ndarray((plaetze, *form), dtype=np.uint8, buffer=self.shm.buf)
+        self.bild_zaehler = ctx.Value('q', -1)  # Index des zuletzt vollständig geschriebenen Bildes
+        self.zeiten = ctx.Array('d', 2 * SCANNER_ZEITEN_PLAETZE, lock=False)  # Je Bild: Aufnahme- und Dekodierzeit
+        self.start = monotonic()
+        self.verbindung, kind_verbindung = ctx.Pipe(duplex=False)
+        kind_steuerung, self.steuerung = ctx.Pipe(duplex=False)  # "start"/"pause": Kamera nur während eines Scans belegen
+        self.stop_event = ctx.Event()
+        self.prozess = ctx.Process(
+            target=_scanner_prozess_schleife,
+            args=(self.shm.name, form, plaetze, kamera, self.bild_zaehler, self.zeiten, kind_verbindung, kind_steuerung, self.stop_event),
+            daemon=True,
+        )
+        self.prozess.start()
+        kind_verbindung.close()  # Der Elternprozess liest nur
+        kind_steuerung.close()
+
+    def aktuelles_bild(self):
+        zaehler = self.bild_zaehler.value
+        if zaehler < 0:
+            return None
+        return self.ring[zaehler % self.plaetze]  # Sicht auf den Ringpuffer, keine Kopie
+
+    def scan(self, korb_annehmen: Callable = None):
+        # Mit korb_annehmen: auf einen bestätigten Korb warten, den die Funktion annimmt (Korbmodus)
+        # Veraltete Ereignisse aus der Zeit vor dem Scan verwerfen
+        while self.verbindung.poll():
+            self.verbindung.recv()
+        try:
+            self.steuerung.send("start")
+            while True:
+                if not self.prozess.is_alive():
+                    messagebox.showerror("Fehler", "Kamerafehler!")
+                    return None
+                if self.verbindung.poll(0.03):
+                    art, barcode_value = self.verbindung.recv()
+                    if art == "fehler":
+                        messagebox.showerror("Fehler", barcode_value)
+                        return None
+                    if art == "korb":
+                        if korb_annehmen is not None and korb_annehmen(barcode_value):
+                            print(f"Korb erkannt: {barcode_value}")
+                            return barcode_value
+                        continue
+                    if barcode_value == "Brake":
+                        print("Barcode Brake erkannt")
+                        return None
+                    if korb_annehmen is not None:
+                        continue  # Im Korbmodus zählen nur bestätigte Körbe
+                    print(f"Barcode erkannt: {barcode_value}")
+                    return barcode_value
+                bild = self.aktuelles_bild()
+                if bild is not None:
+                    cv2.imshow("Barcode Scanner", bild)
+                key = cv2.waitKey(1)
+                if key & 0xFF == ord('q') or key & 0xFF == 27:  # 27 is the ASCII code for ESC
+                    return None
+        except (EOFError, OSError):
+            messagebox.showerror("Fehler", "Kamerafehler!")
+            return None
+        finally:
+            try:
+                self.steuerung.send("pause")  # Kamera freigeben, bis der nächste Scan beginnt
+            except OSError:
+                pass  # Kindprozess ist bereits beendet
+            cv2.destroyAllWindows()
+
+    def zeiten_statistik(self) -> List[tuple]:
+        # Wie Latenzmessung.statistik, aus den Zeiten, die der Kindprozess in den gemeinsamen Speicher schreibt
+        bilder = self.bild_zaehler.value + 1
+        if bilder <= 0:
+            return []
+        zeiten = np.ctypeslib.as_array(self.zeiten).reshape(-1, 2)[:min(bilder, SCANNER_ZEITEN_PLAETZE)] * 1000
+        minuten = max((monotonic() - self.start) / 60, 1 / 60)
+        zeilen = []
+        for spalte, stufe in enumerate(("Kamera: Bild lesen", "Kamera: pyzbar.decode")):
+            p50, p95, p99 = np.percentile(zeiten[:, spalte], [50, 95, 99])
+            zeilen.append((stufe, bilder, bilder / minuten, p50, p95, p99))
+        return zeilen
+
+    def beenden(self):
+        self.stop_event.set()
+        self.prozess.join(timeout=2)
+        if self.prozess.is_alive():
+            self.prozess.terminate()
+        self.verbindung.close()
+        self.steuerung.close()
+        self.ring = None
+        self.shm.close()
+        self.shm.unlink()
+
+_scanner_prozess = None
+
+def get_scanner_prozess() -> ScannerProzess:
+    global _scanner_prozess
+    kamera = _einstellungen.aktuell().Kamera
+    if _scanner_prozess is None or not _scanner_prozess.prozess.is_alive() or _scanner_prozess.kamera != kamera:
+        if _scanner_prozess is not None:
+            _scanner_prozess.beenden()
+        _scanner_prozess = ScannerProzess(kamera=kamera)  # Startet den Scanner-Prozess beim ersten Scan oder nach Wechsel der Kamera
+    return _scanner_prozess
+
+def stop_scanner_prozess():
+    global _scanner_prozess
+    if _scanner_prozess is not None:
+        _scanner_prozess.beenden()
+        _scanner_prozess = None
+
 highlighted_users = []
 
+##### Mehrkassen-Betrieb #####
+
+class KaufSpool:
+    # Dauerhafte Warteschlange für Käufe: Append-only-Datei, gesammeltes fsync, Abarbeitung in einem Hintergrund-Thread
+    def __init__(self, dateiname: str = SPOOL_DATEI):
+        self.dateiname = dateiname
+        self.positionsdatei = dateiname + ".pos"  # Byte-Position bis zu der bereits gebucht wurde
+        self.fehlerdatei = dateiname + ".fehler"  # Einträge, die nicht gebucht werden konnten (z.B. unbekannter Barcode)
+        self._lock = threading.Lock()
+        self._datei = open(dateiname, "ab")
+        self._ende = self._datei.tell()
+        self._position = self._lese_position()
+        self._ungesichert = False
+        self._signal = threading.Event()
+        self._stop = threading.Event()
+        self._verbindung = None
+        if self.ausstehend():
+            print(f"Spool enthält noch {self._ende - self._position} Bytes ungebuchter Käufe.")
+        self._thread = threading.Thread(target=self._abarbeiten, daemon=True)
+        self._thread.start()
+
+    def _lese_position(self) -> int:
+        try:
+            with open(self.positionsdatei) as f:
+                return min(int(f.read().strip() or 0), self._ende)
+        except FileNotFoundError:
+            return 0
+
+    def _schreibe_position(self, position: int):
+        tmp = self.positionsdatei + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(position))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.positionsdatei)  # Atomar ersetzen
+
+    def ausstehend(self) -> bool:
+        with self._lock:
+            return self._position < self._ende
+
+    def einreihen(self, TN_Barcode: str, P_Barcode: str, menge: int):
+        # Nimmt den Scan sofort an; gesichert wird gesammelt im Hintergrund
+        eintrag = {
+            "schluessel": f"spool:{uuid.uuid4().hex}",
+            "tn_barcode": TN_Barcode,
+            "p_barcode": P_Barcode,
+            "menge": menge,
+            "datum": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            self._datei.write((json.dumps(eintrag) + "\n").encode("utf-8"))
+            self._datei.flush()
+            self._ende = self._datei.tell()
+            self._ungesichert = True
+        self._signal.set()
+        print(f"Kauf im Spool gespeichert: {TN_Barcode} -> {P_Barcode}")
+
+    def _abarbeiten(self):
+        while not self._stop.is_set():
+            self._signal.wait(SPOOL_FSYNC_INTERVALL)
+            self._signal.clear()
+            self._sichern()
+            if not self.ausstehend():
+                continue
+            try:
+                self._in_datenbank_schreiben()
+            except sqlite3.Error as e:
+                _ausgabenlimits.ungueltig()  # Heute gescannte Einträge waren schon mitgezählt, sind aber zurückgerollt
+                print(f"Spool: Datenbank nicht verfügbar ({e}), neuer Versuch in {SPOOL_WIEDERHOLUNG} s")
+                if self._verbindung is not None:
+                    self._verbindung.close()
+                    self._verbindung = None
+                self._stop.wait(SPOOL_WIEDERHOLUNG)
+        if self._verbindung is not None:
+            self._verbindung.close()  # Die Verbindung gehört dem Hintergrund-Thread
+
+    def _sichern(self):
+        with self._lock:
+            if self._ungesichert:
+                os.fsync(self._datei.fileno())  # Ein fsync für alle seit dem letzten Durchlauf angenommenen Scans
+                self._ungesichert = False
+
+    def _in_datenbank_schreiben(self):
+        with self._lock:
+            start, ende = self._position, self._ende
+        with open(self.dateiname, "rb") as f:
+            f.seek(start)
+            daten = f.read(ende - start)
+        daten = daten[:daten.rfind(b"\n") + 1]  # Nur vollständige Zeilen
+        if not daten:
+            return
+        if self._verbindung is None:
+            self._verbindung = sqlite3.connect(DB_NAME, timeout=5)  # Eigene Verbindung für den Hintergrund-Thread
+        cursor = self._verbindung.cursor()
+        gebucht = 0
+        with self._verbindung:  # Ein Commit für alle Einträge in Reihenfolge
+            cursor.execute("BEGIN IMMEDIATE")  # Sonst schreibt jedes RELEASE seinen Eintrag einzeln fest
+            for zeile in daten.splitlines():
+                try:
+                    eintrag = json.loads(zeile)
+                    schluessel = eintrag["schluessel"]
+                except (ValueError, KeyError, TypeError) as e:
+                    # Zerrissene oder zusammengeklebte Zeile nach einem Absturz: aufheben und überspringen
+                    self._fehler_festhalten({"zeile": zeile.decode("utf-8", "replace"), "fehler": str(e)})
+                    continue
+                # Doppelte Einträge (z.B. nach Absturz vor dem Schreiben der Position) überspringen
+                if cursor.execute("SELECT 1 FROM Kiosk_Anfrage WHERE Schluessel = ?", (schluessel,)).fetchone():
+                    continue
+                cursor.execute("SAVEPOINT spool")
+                try:
+                    _, trans_id = buche_kauf(cursor, eintrag["tn_barcode"], eintrag["p_barcode"], eintrag["menge"], eintrag["datum"],
+                                             limits_pruefen=False)  # Ware ist schon ausgegeben
+                    antwort = {"ok": True, "trans_id": trans_id}
+                    gebucht += 1
+                except (ValueError, KeyError, TypeError) as e:
+                    cursor.execute("ROLLBACK TO spool")
+                    antwort = {"ok": False, "fehler": str(e)}
+                    self._fehler_festhalten({**eintrag, "fehler": str(e)})
+                cursor.execute("INSERT INTO Kiosk_Anfrage (Schluessel, Antwort, Datum) VALUES (?, ?, datetime('now', 'localtime'))",
+                               (schluessel, json.dumps(antwort)))
+                cursor.execute("RELEASE spool")
+        neue_position = start + len(daten)
+        self._schreibe_position(neue_position)
+        print(f"Spool: {gebucht} Käufe nachgebucht.")
+        with self._lock:
+            self._position = neue_position
+            if self._position == self._ende and self._ende > SPOOL_MAX_GROESSE:
+                # Alles gebucht: Datei leeren, damit sie nicht unbegrenzt wächst
+                self._datei.truncate(0)
+                self._ende = self._position = 0
+                self._schreibe_position(0)
+
+    def _fehler_festhalten(self, eintrag: dict):
+        with open(self.fehlerdatei, "a", encoding="utf-8") as f:
+            f.write(json.dumps(eintrag) + "\n")
+        print(f"Spool: Kauf konnte nicht gebucht werden: {eintrag['fehler']}")
+
+    def beenden(self):
+        self._stop.set()
+        self._signal.set()
+        self._thread.join(timeout=5)
+        self._sichern()
+        self._datei.close()
+
+_kauf_spool = None  # Wird in main() gestartet
+
+class LokaleKasse:
+    # Kauf-Tab arbeitet direkt auf der lokalen Datenbank
+    def __init__(self, db: Database, spool: KaufSpool = None):
+        self.db = db
+        self.spool = spool
+
+    def teilnehmer_barcodes(self) -> List[str]:
+        return [barcode[0] for barcode in fetch_tn_barcode(self.db)]
+
+    def produkt_barcodes(self) -> set:
+        return set([barcode[0] for barcode in fetch_p_barcode(self.db)]) | set([barcode[0] for barcode in fetch_p_barcode_plus(self.db)])
+
+    def niedriger_bestand(self) -> List[Tuple[str, int]]:
+        return fetch_niedriger_bestand(self.db)
+
+    def namen(self, barcodes: List[str]) -> dict:
+        # Barcode -> Teilnehmer- oder Produktname über die Suchindizes
+        namen = {}
+        for barcode in barcodes:
+            name = get_user_index(self.db).aufloesen(barcode) or get_product_index(self.db).aufloesen(barcode)
+            if name is not None:
+                namen[barcode] = name
+        return namen
+
+    def kaufen(self, TN_Barcode: str, P_Barcode: str, menge: int):
+        if self.spool is None:
+            add_transaction(self.db, TN_Barcode, P_Barcode, menge)
+            return
+        if self.spool.ausstehend():
+            self.spool.einreihen(TN_Barcode, P_Barcode, menge)  # Reihenfolge wahren, solange der Spool nicht leer ist
+            return
+        try:
+            self.db.connection.execute(f"PRAGMA busy_timeout = {KASSE_BUSY_TIMEOUT_MS}")  # Kasse nicht lange blockieren
+            with kauf_transaktion(self.db) as cursor:
+                k_id, _ = buche_kauf(cursor, TN_Barcode, P_Barcode, menge)
+            self.db.melde(KONTOSTAND_GEAENDERT, k_id=k_id)
+            print("Erfolg: Transaktion erfolgreich hinzugefügt!")
+        except DatenbankGesperrt as e:
+            print(f"Datenbank nicht verfügbar, Kauf wird gespoolt: {e}")
+            self.spool.einreihen(TN_Barcode, P_Barcode, menge)
+        except Exception as e:
+            messagebox.showerror("Fehler", f"Fehler beim Hinzufügen der Transaktion: {e}")
+        finally:
+            self.db.connection.execute("PRAGMA busy_timeout = 5000")  # Standardwert von sqlite3.connect
+
+    def kaufen_korb(self, TN_Barcode: str, positionen: dict):
+        # Alle Positionen in einer Transaktion; ist die Datenbank gesperrt, landen sie einzeln im Spool
+        if self.spool is not None and self.spool.ausstehend():
+            for P_Barcode, menge in positionen.items():
+                self.spool.einreihen(TN_Barcode, P_Barcode, menge)
+            return
+        try:
+            self.db.connection.execute(f"PRAGMA busy_timeout = {KASSE_BUSY_TIMEOUT_MS}")
+            with kauf_transaktion(self.db) as cursor:
+                k_id, _ = buche_korb(cursor, TN_Barcode, positionen)
+            self.db.melde(KONTOSTAND_GEAENDERT, k_id=k_id)
+            print("Erfolg: Einkauf erfolgreich gebucht!")
+        except DatenbankGesperrt as e:
+            if self.spool is None:
+                messagebox.showerror("Fehler", f"Fehler beim Buchen des Einkaufs: {e}")
+                return
+            print(f"Datenbank nicht verfügbar, Einkauf wird gespoolt: {e}")
+            for P_Barcode, menge in positionen.items():
+                self.spool.einreihen(TN_Barcode, P_Barcode, menge)
+        except Exception as e:
+            messagebox.showerror("Fehler", f"Fehler beim Buchen des Einkaufs: {e}")
+        finally:
+            self.db.connection.execute("PRAGMA busy_timeout = 5000")
+
+class KioskServer:
+    # Lokaler asyncio-Server, der als einziger Prozess das Kassenbuch schreibt
+    def __init__(self, db: Database, host: str = "127.0.0.1", port: int = KIOSK_PORT):
+        self.db = db
+        self.host = host
+        self.port = port
+        self._warteschlange = None
+
+    async def starten(self):
+        self._warteschlange = asyncio.Queue()
+        server = await asyncio.start_server(self._kasse_bedienen, self.host, self.port)
+        print(f"Kassenserver läuft auf {self.host}:{self.port}")
+        schreiber = asyncio.create_task(self._schreiber())
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                schreiber.cancel()
+
+    async def _kasse_bedienen(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Eine Verbindung pro Kasse, eine JSON-Anfrage pro Zeile
+        station = writer.get_extra_info("peername")
+        print(f"Kasse verbunden: {station}")
+        try:
+            while True:
+                zeile = await reader.readline()
+                if not zeile:
+                    break
+                try:
+                    anfrage = json.loads(zeile)
+                    if anfrage.get("op") in ("kauf", "korb", "einzahlung"):
+                        ergebnis = asyncio.get_running_loop().create_future()
+                        await self._warteschlange.put((anfrage, ergebnis))
+                        antwort = await ergebnis
+                    else:
+                        antwort = self._lesen(anfrage)
+                except Exception as e:
+                    antwort = {"ok": False, "fehler": str(e)}
+                writer.write((json.dumps(antwort) + "\n").encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            print(f"Verbindung zur Kasse {station} getrennt: {e}")
+        finally:
+            writer.close()
+
+    def _lesen(self, anfrage: dict) -> dict:
+        op = anfrage.get("op")
+        if op == "teilnehmer_barcodes":
+            return {"ok": True, "barcodes": [barcode[0] for barcode in fetch_tn_barcode(self.db)]}
+        if op == "produkt_barcodes":
+            return {"ok": True, "barcodes": sorted(LokaleKasse(self.db).produkt_barcodes(), key=str)}
+        if op == "kontostand":
+            result = self.db.execute_select("SELECT Teilnehmer.Name, ROUND(Konto.Kontostand, 2) FROM Konto JOIN Teilnehmer ON Konto.T_ID = Teilnehmer.T_ID WHERE Teilnehmer.TN_Barcode = ?", (anfrage["tn_barcode"],))
+            if not result:
+                return {"ok": False, "fehler": "User nicht gefunden!"}
+            return {"ok": True, "name": result[0][0], "kontostand": result[0][1]}
+        if op == "niedriger_bestand":
+            return {"ok": True, "produkte": fetch_niedriger_bestand(self.db)}
+        if op == "namen":
+            self.db.pruefe_externe_aenderungen()  # Suchindizes nach Änderungen in der Verwaltung neu aufbauen
+            return {"ok": True, "namen": LokaleKasse(self.db).namen(anfrage["barcodes"])}
+        return {"ok": False, "fehler": f"Unbekannte Anfrage: {op}"}
+
+    async def _schreiber(self):
+        # Sammelt Schreibanfragen aller Kassen und schreibt sie gebündelt in einer Transaktion
+        while True:
+            batch = [await self._warteschlange.get()]
+            ende = asyncio.get_running_loop().time() + KIOSK_BATCH_WARTEZEIT
+            while len(batch) < KIOSK_BATCH_GROESSE:
+                rest = ende - asyncio.get_running_loop().time()
+                if rest <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._warteschlange.get(), timeout=rest))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                antworten = batch_buchen(self.db, [anfrage for anfrage, _ in batch])
+            except Exception as e:
+                antworten = [{"ok": False, "fehler": str(e)}] * len(batch)
+            for (_, ergebnis), antwort in zip(batch, antworten):
+                if not ergebnis.done():
+                    ergebnis.set_result(antwort)
+
+class KioskClient:
+    # Dünner Client für den Kauf-Tab; jede Schreibanfrage trägt einen eindeutigen Schlüssel der Kasse
+    def __init__(self, host: str, port: int = KIOSK_PORT, station: str = None):
+        self.host = host
+        self.port = port
+        self.station = station or socket.gethostname()
+        self._sock = None
+        self._datei = None
+
+    def _verbinden(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=KIOSK_TIMEOUT)
+        self._datei = self._sock.makefile("rwb")
+
+    def _trennen(self):
+        if self._sock is not None:
+            self._datei.close()
+            self._sock.close()
+        self._sock = None
+        self._datei = None
+
+    def _anfrage(self, **anfrage) -> dict:
+        # Bei Verbindungsfehlern einmal neu verbinden und erneut senden; der Schlüssel verhindert Doppelbuchungen
+        for versuch in range(2):
+            try:
+                if self._sock is None:
+                    self._verbinden()
+                self._datei.write((json.dumps(anfrage) + "\n").encode("utf-8"))
+                self._datei.flush()
+                zeile = self._datei.readline()
+                if not zeile:
+                    raise ConnectionError("Server hat die Verbindung geschlossen")
+                return json.loads(zeile)
+            except OSError as e:
+                print(f"Verbindung zum Kassenserver fehlgeschlagen: {e}")
+                self._trennen()
+                if versuch == 1:
+                    raise Exception(f"Kassenserver nicht erreichbar: {e}")
+
+    def teilnehmer_barcodes(self) -> List[str]:
+        return self._anfrage(op="teilnehmer_barcodes")["barcodes"]
+
+    def produkt_barcodes(self) -> set:
+        return set(self._anfrage(op="produkt_barcodes")["barcodes"])
+
+    def kontostand(self, TN_Barcode: str) -> dict:
+        return self._anfrage(op="kontostand", tn_barcode=TN_Barcode)
+
+    def niedriger_bestand(self) -> List[Tuple[str, int]]:
+        return [tuple(zeile) for zeile in self._anfrage(op="niedriger_bestand")["produkte"]]
+
+    def namen(self, barcodes: List[str]) -> dict:
+        return self._anfrage(op="namen", barcodes=list(barcodes))["namen"]
+
+    def kaufen(self, TN_Barcode: str, P_Barcode: str, menge: int):
+        try:
+            antwort = self._anfrage(op="kauf", tn_barcode=TN_Barcode, p_barcode=P_Barcode, menge=menge,
+                                    schluessel=f"{self.station}:{uuid.uuid4().hex}")
+            if not antwort.get("ok"):
+                raise Exception(antwort.get("fehler"))
+            print("Erfolg: Transaktion erfolgreich hinzugefügt!")
+        except Exception as e:
+            messagebox.showerror("Fehler", f"Fehler beim Hinzufügen der Transaktion: {e}")
+
+    def kaufen_korb(self, TN_Barcode: str, positionen: dict):
+        try:
+            antwort = self._anfrage(op="korb", tn_barcode=TN_Barcode, positionen=list(positionen.items()),
+                                    schluessel=f"{self.station}:{uuid.uuid4().hex}")
+            if not antwort.get("ok"):
+                raise Exception(antwort.get("fehler"))
+            print("Erfolg: Einkauf erfolgreich gebucht!")
+        except Exception as e:
+            messagebox.showerror("Fehler", f"Fehler beim Buchen des Einkaufs: {e}")
+
+_kiosk_client = None  # Gesetzt, wenn der Kauf-Tab als Kasse gegen einen Kassenserver läuft
+
+WARENKORB_MAX_SCANS = 6  # Höchstens so viele angenommene Produktscans pro Einkauf
+
+class Warenkorb:
+    # Sammelt die Produktscans eines Einkaufs, bevor gebucht wird: gleiche Produkte werden zu einer Position mit Menge = n
+    # zusammengefasst, erneute Lesungen desselben Barcodes innerhalb der Sperrzeit verworfen
+    def __init__(self, sperrzeit_s: float):
+        self.sperrzeit_s = sperrzeit_s
+        self.positionen = {}  # P_Barcode -> Menge, in Scanreihenfolge
+        self.scans = 0
+        self._letzter_barcode = None
+        self._letzte_zeit = 0.0
+
+    def entprellen(self, barcode: str) -> bool:
+        # False für eine Wiederholung; jede Lesung verlängert die Sperre, solange das Produkt vor der Kamera bleibt
+        jetzt = monotonic()
+        wiederholt = barcode == self._letzter_barcode and jetzt - self._letzte_zeit < self.sperrzeit_s
+        self._letzter_barcode, self._letzte_zeit = barcode, jetzt
+        return not wiederholt
+
+    def hinzufuegen(self, barcode: str, menge: int = 1):
+        self.positionen[barcode] = self.positionen.get(barcode, 0) + menge
+        self.scans += 1
+
+    def voll(self) -> bool:
+        return self.scans >= WARENKORB_MAX_SCANS
+
+    def zusammenfassung(self, namen: dict = None) -> str:
+        # namen: Barcode -> Produktname, damit die Kasse den Einkauf prüfen kann; unbekannte Barcodes bleiben stehen
+        namen = namen or {}
+        return "\n".join(f"{menge} × {namen.get(barcode, barcode)}" for barcode, menge in self.positionen.items())
+
 
 ##### Tab-Erstellungsfunktionen #####
 
 def create_scan_only_tab(tab: tk.Frame, db: Database):
+    kasse = _kiosk_client if _kiosk_client is not None else LokaleKasse(db, _kauf_spool)  # Kassenserver oder lokale Datenbank
+
+    def barcodes_laden():
+        # Lade alle notwendigen Daten einmalig pro Einkauf
+        try:
+            with _latenzen.messen("Kasse: Barcodes laden"):
+                return kasse.teilnehmer_barcodes(), kasse.produkt_barcodes()
+        except Exception as e:
+            messagebox.showerror("Fehler", f"Fehler beim Laden der Barcodes: {e}")
+            return None, None
+
+    def namen_laden(barcodes: List[str]) -> dict:
+        # Namen sind nur zur Anzeige da; ohne sie wird mit den Barcodes weitergearbeitet
+        try:
+            return kasse.namen(barcodes)
+        except Exception as e:
+            print(f"Namen konnten nicht geladen werden: {e}")
+            return {}
+
+    def einkauf_buchen(TN_Barcode: str, warenkorb: Warenkorb, hinweis: str = ""):
+        # Zeigt Teilnehmer und Positionen zur Bestätigung und bucht sie als einen Einkauf
+        namen = namen_laden([TN_Barcode, *warenkorb.positionen])
+        teilnehmer = f"{namen[TN_Barcode]} ({TN_Barcode})" if TN_Barcode in namen else TN_Barcode
+        if not messagebox.askyesno("Einkauf bestätigen", f"Teilnehmer: {teilnehmer}\nFolgende Produkte buchen?\n{warenkorb.zusammenfassung(namen)}{hinweis}"):
+            return
+        with _latenzen.messen("Kasse: Kauf buchen"):
+            kasse.kaufen_korb(TN_Barcode, warenkorb.positionen)  # Eine Transaktion pro Produkt mit Menge = n, gemeinsam festgeschrieben
+        print(f"Einkauf: {TN_Barcode} hat {warenkorb.positionen} gekauft.")
+        bestand_pruefen(nach_kauf=True)
+
+    gemeldet = set()  # Produkte unter dem Meldebestand, für die an dieser Kasse bereits gewarnt wurde
+
+    def bestand_pruefen(art=None, daten=None, nach_kauf: bool = False):
+        # Wer die Ware ausgibt, sieht den niedrigen Bestand hier; nach einem Kauf warnt ein Dialog für neu betroffene Produkte
+        try:
+            niedrig = kasse.niedriger_bestand()
+        except Exception as e:
+            print(f"Lagerbestand konnte nicht geprüft werden: {e}")
+            return
+        neu = [(produkt, bestand) for produkt, bestand in niedrig if produkt not in gemeldet]
+        gemeldet.clear()
+        gemeldet.update(produkt for produkt, _ in niedrig)
+        bestand_label.config(text="Nachbestellen: " + ", ".join(f"{p} ({b})" for p, b in niedrig) if niedrig else "")
+        if nach_kauf and neu:
+            messagebox.showwarning("Nachbestellen", "Meldebestand erreicht:\n" + "\n".join(f"{p}: noch {b} Stück" for p, b in neu))
+
     def scan_transaction(db: Database):
-        # Lade alle notwendigen Daten einmalig
-        users_barcode = [barcode[0] for barcode in fetch_tn_barcode(db)]
-        produk_barcode = set([barcode[0] for barcode in fetch_p_barcode(db)])
-        produk_barcode_plus = set([barcode[0] for barcode in fetch_p_barcode_plus(db)])
+        users_barcode, produk_barcode = barcodes_laden()
+        if users_barcode is None:
+            return
 
         print(f"Users Barcode: {users_barcode}")
 
@@ -223,69 +1975,121 @@ def create_scan_only_tab(tab: tk.Frame, db: Database):
         TN_Barcode = barcode_value
         print(f"TN_Barcode: {TN_Barcode}")
 
-        for _ in range(6):  # Erlaubt genau sechs Produktscans
+        einstellungen = _einstellungen.aktuell()
+        warenkorb = Warenkorb(einstellungen.ScanSperrzeit / 1000)
+        warenkorb.entprellen(TN_Barcode)  # Noch sichtbare Teilnehmerkarte nicht als Produkt melden
+        while not warenkorb.voll():  # ESC, "q" oder der Barcode "Brake" beendet den Einkauf vorzeitig
             P_Barcode = barcode_scanner()
             if P_Barcode is None:
-                messagebox.showerror("Fehler", "Kein Barcode erkannt!")
-                return
+                break
+            if not warenkorb.entprellen(P_Barcode):
+                print(f"Wiederholte Lesung von {P_Barcode} verworfen.")
+                continue
 
-            if P_Barcode not in produk_barcode and P_Barcode not in produk_barcode_plus:
+            if P_Barcode not in produk_barcode:
                 messagebox.showerror("Fehler", "Produkt nicht gefunden!")
                 continue  # Erlaubt dem Benutzer, einen weiteren Scanversuch zu machen, ohne die Schleife zu verlassen
 
-            menge = 1  # Menge auf 1 setzen, da jedes Produkt einmal gescannt wird
-            add_transaction(db, TN_Barcode, P_Barcode, menge)
-            print("Erfolg: Transaktion erfolgreich hinzugefügt!")
-            print(f"Transaktion: {TN_Barcode} hat {P_Barcode} gekauft.")
-                       
-                       
+            menge = 1
+            if einstellungen.MengeAbfragen:
+                produkt = namen_laden([P_Barcode]).get(P_Barcode, P_Barcode)
+                menge = simpledialog.askinteger("Menge", f"Menge für {produkt}:", initialvalue=1, minvalue=1, maxvalue=99)
+                if menge is None:
+                    continue  # Abgebrochen: Scan nicht übernehmen
+            warenkorb.hinzufuegen(P_Barcode, menge)
+
+        if not warenkorb.positionen:
+            messagebox.showerror("Fehler", "Kein Barcode erkannt!")
+            return
+        einkauf_buchen(TN_Barcode, warenkorb)
+
+    def korb_transaktion(db: Database):
+        # Korbmodus: Teilnehmerkarte und Produkte liegen zusammen unter der Kamera und werden in einem Bild erkannt
+        users_barcode, produk_barcode = barcodes_laden()
+        if users_barcode is None:
+            return
+        teilnehmer = set(users_barcode)
+
+        def annehmen(korb) -> bool:
+            # Genau eine Teilnehmerkarte und mindestens ein bekanntes Produkt
+            return (sum(anzahl for barcode, anzahl in korb if barcode in teilnehmer) == 1
+                    and any(barcode in produk_barcode for barcode, anzahl in korb))
+
+        korb = barcode_scanner(korb_annehmen=annehmen)
+        if korb is None:
+            return
+        TN_Barcode = next(barcode for barcode, anzahl in korb if barcode in teilnehmer)
+        warenkorb = Warenkorb(0)
+        for barcode, anzahl in korb:
+            if barcode in produk_barcode:
+                warenkorb.hinzufuegen(barcode, anzahl)
+        unbekannt = [barcode for barcode, anzahl in korb if barcode not in teilnehmer and barcode not in produk_barcode]
+        einkauf_buchen(TN_Barcode, warenkorb, f"\nNicht erkannt: {', '.join(unbekannt)}" if unbekannt else "")
+
     scan_transaction_button = ttk.Button(tab, text="Transaktion scannen", command=lambda: scan_transaction(db))
     scan_transaction_button.grid(row=1, column=0, columnspan=2, padx=10, pady=10)
+    korb_button = ttk.Button(tab, text="Korb scannen", command=lambda: korb_transaktion(db))
+    korb_button.grid(row=2, column=0, columnspan=2, padx=10, pady=10)
+    if db is not None:
+        anzeige_button = ttk.Button(tab, text="Kontoanzeige starten", command=starte_kontoanzeige)
+        anzeige_button.grid(row=3, column=0, columnspan=2, padx=10, pady=10)
+        db.bus.abonnieren(bestand_pruefen, LAGERBESTAND_GEAENDERT)  # Z.B. nach einem Wareneingang
+    bestand_label = ttk.Label(tab, text="", foreground="red")
+    bestand_label.grid(row=4, column=0, columnspan=2, padx=10, pady=5)
+    bestand_pruefen()  # Stand beim Start anzeigen, ohne Dialog
     
     
 def create_watch_tab(tab: tk.Frame, db: Database):
-    highlighted_users = db.execute_select("SELECT Name FROM Teilnehmer WHERE Checkout = 1")
-    def watch_transactions():       
+    highlighted_users = [row[0] for row in db.execute_select("SELECT Name FROM Teilnehmer WHERE Checkout = 1")]
+    ansicht = {"tree": None, "zeilen": {}}  # Aktuelles Treeview und Name -> Zeilen-ID für gezielte Aktualisierungen
+
+    def watch_query(where: str = "") -> str:
+        # Fetch product ids, descriptions, and prices, rounding the prices to two decimal places
+        produkt_infos = db.execute_select("SELECT P_ID, Beschreibung, ROUND(Preis, 2) as Preis FROM Produkt")
+        
+        # Create SQL parts for sum calculations and include rounded price in the column headers
+        produkt_summen = ", ".join([f"SUM(CASE WHEN Transaktion.P_ID = {pid} THEN Transaktion.Menge ELSE 0 END) AS '{desc} ({preis:.2f}€)'" for pid, desc, preis in produkt_infos])
+        
+        return f"""
+            SELECT 
+                Teilnehmer.Name,
+                Konto.Einzahlung AS Einzahlung_€,
+                printf('%04.2f', ROUND(Konto.Kontostand, 2)) AS Kontostand_€,
+                {produkt_summen}
+            FROM Teilnehmer 
+            JOIN Konto ON Teilnehmer.T_ID = Konto.T_ID
+            LEFT JOIN Transaktion ON Konto.K_ID = Transaktion.K_ID
+            {where}
+            GROUP BY Teilnehmer.T_ID, Teilnehmer.Name, ROUND(Konto.Kontostand, 2)
+            ORDER BY Teilnehmer.Name;
+        """
+
+    @_latenzen.gemessen("Überwachung: Tabelle aufbauen")
+    def watch_transactions():
         print("Anzeige der Transaktionen...")
         print("Higlighted Users", highlighted_users)
         try: 
-            # Fetch product ids, descriptions, and prices, rounding the prices to two decimal places
-            produkt_infos = db.execute_select("SELECT P_ID, Beschreibung, ROUND(Preis, 2) as Preis FROM Produkt")
-            
-            # Create SQL parts for sum calculations and include rounded price in the column headers
-            produkt_summen = ", ".join([f"SUM(CASE WHEN Transaktion.P_ID = {pid} THEN Transaktion.Menge ELSE 0 END) AS '{desc} ({preis:.2f}€)'" for pid, desc, preis in produkt_infos])
-            
-            sql_query = f"""
-                SELECT 
-                    Teilnehmer.Name,
-                    Konto.Einzahlung AS Einzahlung_€,
-                    printf('%04.2f', ROUND(Konto.Kontostand, 2)) AS Kontostand_€,
-                    {produkt_summen}
-                FROM Teilnehmer 
-                JOIN Konto ON Teilnehmer.T_ID = Konto.T_ID
-                LEFT JOIN Transaktion ON Konto.K_ID = Transaktion.K_ID
-                GROUP BY Teilnehmer.T_ID, Teilnehmer.Name, ROUND(Konto.Kontostand, 2)
-                ORDER BY Teilnehmer.Name;
-            """
-            result = db.execute_select(sql_query)  # Execute the dynamic SQL query to fetch transaction data
-            
-            # Create a DataFrame from the query result
-            df = pd.DataFrame(result, columns=[desc[0] for desc in db.cursor.description])
+            ergebnis = db.execute_select_tabelle(watch_query())  # Execute the dynamic SQL query to fetch transaction data
+            name_spalte = ergebnis.spalte("Name")
             
             # Create a Treeview widget to display the data
+            if ansicht["tree"] is not None:
+                ansicht["tree"].destroy()  # Altes Treeview ersetzen statt übereinander zu stapeln
             tree = ttk.Treeview(tab)
-            tree["columns"] = df.columns.tolist()  # Definiere die Spalten des Treeview
+            tree["columns"] = ergebnis.spalten  # Definiere die Spalten des Treeview
             tree["show"] = "headings"  # Zeige die Überschriften der Spalten
             
             # Setze Spaltenüberschriften und konfiguriere Spalten
-            for col in df.columns:
+            for col in ergebnis.spalten:
                 tree.heading(col, text=col)
                 tree.column(col, anchor="center")
             
             # Füge Zeilen in das Treeview ein
-            for index, row in df.iterrows():
-                iid = tree.insert("", "end", values=row.tolist())
-                if row['Name'] in highlighted_users:
+            ansicht["zeilen"] = {}
+            for row in ergebnis.zeilen:
+                iid = tree.insert("", "end", values=row)
+                ansicht["zeilen"][row[name_spalte]] = iid
+                if row[name_spalte] in highlighted_users:
                     tree.item(iid, tags=('highlighted',))
             tree.tag_configure('highlighted', background='yellow')
             
@@ -293,10 +2097,40 @@ def create_watch_tab(tab: tk.Frame, db: Database):
             tree.grid(row=1, column=0, sticky='nsew')
             tab.grid_rowconfigure(1, weight=1)
             tab.grid_columnconfigure(0, weight=1)
+            ansicht["tree"] = tree
 
         except Exception as e:
             messagebox.showerror("Fehler", f"Fehler beim Ausführen der Abfrage: {e}")  # Show error message if the query fails
 
+    @_latenzen.gemessen("Überwachung: Zeile aktualisieren")
+    def zeile_aktualisieren(art, daten):
+        # Lädt nur die Zeile des betroffenen Kontos neu
+        tree = ansicht["tree"]
+        if tree is None:
+            return
+        if "k_id" in daten:
+            result = db.execute_select(watch_query("WHERE Konto.K_ID = ?"), (daten["k_id"],))
+        else:
+            result = db.execute_select(watch_query("WHERE Teilnehmer.Name = ?"), (daten["name"],))
+        for row in result:
+            iid = ansicht["zeilen"].get(row[0])
+            if iid is None:
+                watch_transactions()  # Neuer Teilnehmer: Reihenfolge ändert sich, daher komplett neu aufbauen
+                return
+            tree.item(iid, values=list(row))
+
+    def ansicht_neu_laden(art, daten):
+        if art == DATENBANK_GEAENDERT and not daten.get("extern") and ansicht["tree"] is not None:
+            ansicht["tree"].destroy()  # Datenbank wurde gelöscht
+            ansicht["tree"] = None
+        if art == TEILNEHMER_AUSGECHECKT:
+            highlighted_users.extend(daten["namen"])
+        if ansicht["tree"] is not None:
+            watch_transactions()  # Spalten oder Zeilen haben sich geändert
+
+    db.bus.abonnieren(zeile_aktualisieren, KONTOSTAND_GEAENDERT)
+    db.bus.abonnieren(ansicht_neu_laden, *TEILNEHMER_EREIGNISSE, *PRODUKT_EREIGNISSE, TEILNEHMER_AUSGECHECKT, DATENBANK_GEAENDERT)
+
     watch_button = ttk.Button(tab, text="Transaktionen anzeigen", command=watch_transactions)  # Erstellt einen Button, um die Transaktionsanzeige auszulösen
     watch_button.grid(row=0, column=0, padx=10, pady=5)
    
@@ -325,20 +2159,206 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                                 GROUP BY Produkt.Beschreibung
                                 ORDER BY Anzahl_verkauft DESC;
                             '''
-                result = db.execute_select(sql_query)  # Führt eine SQL-Abfrage aus, um die Kaufstatistik abzurufen
-                df = pd.DataFrame(result, columns=[desc[0] for desc in db.cursor.description])  # Erstellt ein DataFrame aus dem Abfrageergebnis
+                ergebnis = db.execute_select_tabelle(sql_query)  # Führt eine SQL-Abfrage aus, um die Kaufstatistik abzurufen
                 tree = ttk.Treeview(tab)  # Erstellt ein Treeview-Widget, um die Daten anzuzeigen
-                tree["columns"] = df.columns.tolist()  # Definiert die Spalten des Treeviews
+                tree["columns"] = ergebnis.spalten  # Definiert die Spalten des Treeviews
                 tree["show"] = "headings"  # Zeigt die Überschriften der Spalten an
-                for col in df.columns:
+                for col in ergebnis.spalten:
                     tree.heading(col, text=col)
                     tree.column(col, anchor="center")
-                for index, row in df.iterrows():
-                    tree.insert("", "end", values=row.tolist())
+                for row in ergebnis.zeilen:
+                    tree.insert("", "end", values=row)
                 tree.grid(row=1, column=0, columnspan=3, sticky='nsew')
             except Exception as e:
                 messagebox.showerror("Fehler", f"Fehler beim Ausführen der Abfrage: {e}")
             
+        def verkaufsanalyse_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Verkaufsanalyse...")
+            art_var = StringVar(value=VERKAUFSDIAGRAMME[0])
+            art_combobox = ttk.Combobox(tab, textvariable=art_var, values=VERKAUFSDIAGRAMME, state="readonly", width=30)
+            art_combobox.grid(row=0, column=0, padx=10, pady=5, sticky='w')
+            status_label = ttk.Label(tab, text="")
+            status_label.grid(row=0, column=2, padx=10, pady=5)
+            bild_label = ttk.Label(tab)
+            bild_label.grid(row=1, column=0, columnspan=3, padx=10, pady=5)
+
+            def anzeigen(future):
+                # Wartet ohne Blockieren auf den Hintergrund-Thread
+                if not future.done():
+                    tab.after(50, anzeigen, future)
+                    return
+                try:
+                    bild = tk.PhotoImage(data=future.result())
+                except Exception as e:
+                    leere_diagramm_cache()
+                    status_label.config(text="")
+                    messagebox.showerror("Fehler", f"Fehler beim Zeichnen des Diagramms: {e}")
+                    return
+                bild_label.config(image=bild)
+                bild_label.image = bild  # Referenz halten, sonst räumt Tk das Bild ab
+                status_label.config(text="")
+
+            def aktualisieren(event=None):
+                try:
+                    future = verkaufsdiagramm_anfordern(db, art_var.get())
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Aktualisieren der Verkaufsdaten: {e}")
+                    return
+                status_label.config(text="Wird gezeichnet..." if not future.done() else "")
+                anzeigen(future)
+
+            aktualisieren_button = ttk.Button(tab, text="Aktualisieren", command=aktualisieren)
+            aktualisieren_button.grid(row=0, column=1, padx=10, pady=5)
+            art_combobox.bind("<<ComboboxSelected>>", aktualisieren)
+            tab.bind("<Map>", aktualisieren)  # Beim Öffnen des Tabs neu laden; unveränderte Diagramme kommen aus dem Cache
+            db.bus.abonnieren(leere_diagramm_cache, *PRODUKT_EREIGNISSE, DATENBANK_GEAENDERT)
+
+        def lager_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Lagerbestand...")
+            warnung_label = ttk.Label(tab, text="", foreground="red")
+            warnung_label.grid(row=0, column=0, columnspan=4, padx=10, pady=5, sticky='w')
+
+            spalten = ("Produkt", "Bestand", "Meldebestand", "Verkauf/Tag", "Reicht noch (Tage)", "Leer am")
+            tree = ttk.Treeview(tab, columns=spalten, show="headings", height=15)
+            for spalte in spalten:
+                tree.heading(spalte, text=spalte)
+                tree.column(spalte, anchor="center", width=110)
+            tree.tag_configure("niedrig", background="#f4b6b6")
+            tree.grid(row=1, column=0, columnspan=4, padx=10, pady=5, sticky='nsew')
+
+            produkt_var = StringVar()
+            produkt_combobox = ttk.Combobox(tab, textvariable=produkt_var)
+            produkt_combobox.grid(row=2, column=0, padx=10, pady=5)
+            aktiviere_product_typeahead(produkt_combobox, db)
+            menge_entry = ttk.Entry(tab, width=10)
+            menge_entry.grid(row=2, column=1, padx=10, pady=5)
+
+            gemeldet = set()  # Produkte, für die bereits gewarnt wurde
+
+            def warnung_aktualisieren(art=None, daten=None):
+                # Leichte Prüfung nach jedem Kauf: nur die Zeilen unter dem Meldebestand
+                niedrig = fetch_niedriger_bestand(db)
+                for produkt, bestand in niedrig:
+                    if produkt not in gemeldet:
+                        print(f"Warnung: {produkt} hat nur noch {bestand} Stück auf Lager.")
+                gemeldet.clear()
+                gemeldet.update(produkt for produkt, _ in niedrig)
+                warnung_label.config(text="Nachbestellen: " + ", ".join(f"{p} ({b})" for p, b in niedrig) if niedrig else "")
+
+            def liste_aktualisieren(event=None):
+                try:
+                    prognose = prognose_lagerreichweite(db)
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Laden des Lagerbestands: {e}")
+                    return
+                tree.delete(*tree.get_children())
+                for produkt, bestand, meldebestand, pro_tag, reichweite in prognose:
+                    if np.isinf(reichweite):
+                        reicht, leer_am = "-", "-"
+                    else:
+                        reicht, leer_am = f"{reichweite:.1f}", f"{datetime.now() + timedelta(days=reichweite):%d.%m. %H:%M}"
+                    tree.insert("", "end", values=(produkt, bestand, meldebestand, f"{pro_tag:.1f}", reicht, leer_am),
+                                tags=("niedrig",) if bestand <= meldebestand else ())
+                warnung_aktualisieren()
+
+            def eingang_buchen():
+                try:
+                    bestand = buche_wareneingang(db, produkt_var.get(), int(menge_entry.get()))
+                    messagebox.showinfo("Erfolg", f"Wareneingang gebucht, neuer Bestand: {bestand}")
+                except ValueError as e:
+                    messagebox.showerror("Fehler", f"Ungültige Eingabe: {e}")
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Buchen des Wareneingangs: {e}")
+
+            def meldebestand_setzen():
+                try:
+                    setze_meldebestand(db, produkt_var.get(), int(menge_entry.get()))
+                except ValueError as e:
+                    messagebox.showerror("Fehler", f"Ungültige Eingabe: {e}")
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Setzen des Meldebestands: {e}")
+
+            eingang_button = ttk.Button(tab, text="Wareneingang buchen", command=eingang_buchen)
+            eingang_button.grid(row=2, column=2, padx=10, pady=5)
+            meldebestand_button = ttk.Button(tab, text="Als Meldebestand setzen", command=meldebestand_setzen)
+            meldebestand_button.grid(row=2, column=3, padx=10, pady=5)
+            aktualisieren_button = ttk.Button(tab, text="Prognose aktualisieren", command=liste_aktualisieren)
+            aktualisieren_button.grid(row=3, column=0, padx=10, pady=5)
+
+            tab.bind("<Map>", liste_aktualisieren)
+            db.bus.abonnieren(warnung_aktualisieren, KONTOSTAND_GEAENDERT, DATENBANK_GEAENDERT)
+            db.bus.abonnieren(lambda art, daten: liste_aktualisieren(), LAGERBESTAND_GEAENDERT, PRODUKT_GELOESCHT)
+            warnung_aktualisieren()
+
+        def ausgabenlimits_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Ausgabenlimits...")
+            tageslimit_label = ttk.Label(tab, text="Tageslimit pro Teilnehmer (€, leer = keins):")
+            tageslimit_label.grid(row=0, column=0, padx=10, pady=5, sticky='w')
+            tageslimit_entry = ttk.Entry(tab, width=10)
+            tageslimit_entry.grid(row=0, column=1, padx=10, pady=5)
+
+            produkt_label = ttk.Label(tab, text="Produkt / Höchstmenge pro Tag (leer = keine):")
+            produkt_label.grid(row=1, column=0, padx=10, pady=5, sticky='w')
+            produkt_var = StringVar()
+            produkt_combobox = ttk.Combobox(tab, textvariable=produkt_var)
+            produkt_combobox.grid(row=1, column=1, padx=10, pady=5)
+            aktiviere_product_typeahead(produkt_combobox, db)
+            menge_entry = ttk.Entry(tab, width=10)
+            menge_entry.grid(row=1, column=2, padx=10, pady=5)
+
+            tree = ttk.Treeview(tab, columns=("Produkt", "Höchstmenge"), show="headings", height=10)
+            for spalte in ("Produkt", "Höchstmenge"):
+                tree.heading(spalte, text=spalte)
+                tree.column(spalte, anchor="center")
+            tree.grid(row=2, column=0, columnspan=4, padx=10, pady=5, sticky='nsew')
+
+            def anzeigen(art=None, daten=None):
+                tageslimit_entry.delete(0, tk.END)
+                tageslimit_entry.insert(0, einstellung_als_text("Tageslimit", get_einstellungen(db).Tageslimit))
+                tree.delete(*tree.get_children())
+                for produkt, max_menge in db.execute_select("""SELECT P.Beschreibung, L.Max_Menge FROM Produktlimit L
+                                                               JOIN Produkt P ON P.P_ID = L.P_ID ORDER BY P.Beschreibung"""):
+                    tree.insert("", "end", values=(produkt, max_menge))
+
+            def tageslimit_speichern():
+                try:
+                    eingabe = tageslimit_entry.get().strip().replace(",", ".")
+                    setze_tageslimit(db, float(eingabe) if eingabe else None)
+                    anzeigen()
+                except ValueError:
+                    messagebox.showerror("Fehler", "Ungültiger Betrag!")
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Speichern des Tageslimits: {e}")
+
+            def produktlimit_speichern():
+                try:
+                    eingabe = menge_entry.get().strip()
+                    setze_produktlimit(db, produkt_var.get(), int(eingabe) if eingabe else None)
+                    anzeigen()
+                except ValueError as e:
+                    messagebox.showerror("Fehler", f"Ungültige Eingabe: {e}")
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Speichern des Produktlimits: {e}")
+
+            tageslimit_button = ttk.Button(tab, text="Speichern", command=tageslimit_speichern)
+            tageslimit_button.grid(row=0, column=3, padx=10, pady=5)
+            produktlimit_button = ttk.Button(tab, text="Speichern", command=produktlimit_speichern)
+            produktlimit_button.grid(row=1, column=3, padx=10, pady=5)
+            db.bus.abonnieren(anzeigen, PRODUKT_GEAENDERT, PRODUKT_GELOESCHT, EINSTELLUNG_GEAENDERT, DATENBANK_GEAENDERT)
+            anzeigen()
+
+        def nummer_vergeben(entry: ttk.Entry, art: str):
+            # Trägt die nächste freie Kurznummer ein; geprüft gegen alle Teilnehmer- und Produktbarcodes
+            # und gegen die von den Barcode-Skripten schon gedruckten (Barcodes_*.csv)
+            vergeben = Barcode_Nummern.vorhandene_barcodes(db.connection) | Barcode_Nummern.reservierte_barcodes()
+            try:
+                barcode = Barcode_Nummern.naechste_barcodes(vergeben, art)[0]
+            except ValueError as e:
+                messagebox.showerror("Fehler", str(e))
+                return
+            entry.delete(0, tk.END)
+            entry.insert(0, barcode)
+
         def add_user(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Benutzer hinzufügen...")  # Gibt eine Nachricht aus, die die Erstellung des "Benutzer hinzufügen"-Tabs anzeigt
             
@@ -350,15 +2370,20 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                     return
 
                 # Überprüfen, ob der Benutzer existiert
-                users = fetch_users(db)  # Ruft die Liste der Benutzer ab
                 new_user = user_entry.get()  # Ruft den neuen Benutzer ab
-                if new_user in users:
+                if new_user in get_user_index(db):
                     messagebox.showerror("Fehler", "Benutzer bereits vorhanden!")  # Zeigt eine Fehlermeldung an, wenn der Benutzer bereits existiert
                     return
+                barcode = Barcode_Nummern.normalisieren(barcode)  # Gleiche Form wie beim Scannen
+                if barcode and barcode in Barcode_Nummern.vorhandene_barcodes(db.connection):
+                    messagebox.showerror("Fehler", "Barcode bereits vergeben!")  # Jeder Barcode gehört zu genau einem Teilnehmer oder Produkt
+                    return
                 else:
-                    db.execute_insert("INSERT INTO Teilnehmer (Name, TN_Barcode) VALUES (?, ?)", (new_user, barcode))  # Fügt den neuen Benutzer mit Barcode in die Datenbank ein
+                    db.execute_insert("INSERT INTO Teilnehmer (Name, TN_Barcode) VALUES (?, ?)", (new_user, barcode),
+                                      ereignis=(TEILNEHMER_HINZUGEFUEGT, {"name": new_user, "barcode": barcode}))  # Fügt den neuen Benutzer mit Barcode in die Datenbank ein
                     t_id = db.execute_select("SELECT T_ID FROM Teilnehmer WHERE Name = ?", (new_user,))[0][0]  # Ruft die ID des neuen Benutzers ab
-                    db.execute_insert("INSERT INTO Konto (Einzahlung, Kontostand, Eröffnungsdatum, T_ID) VALUES (?, ?, CURRENT_TIMESTAMP, ?)", (amount, amount, t_id))  # Erstellt ein neues Konto für den Benutzer mit Datum und Uhrzeit
+                    db.execute_insert("INSERT INTO Konto (Einzahlung, Kontostand, Eröffnungsdatum, T_ID) VALUES (?, ?, CURRENT_TIMESTAMP, ?)", (amount, amount, t_id),
+                                      ereignis=(KONTOSTAND_GEAENDERT, {"name": new_user}))  # Erstellt ein neues Konto für den Benutzer mit Datum und Uhrzeit
                     db.execute_insert("INSERT INTO Transaktion (K_ID, P_ID, Menge, Typ, Datum) VALUES ((SELECT K_ID FROM Konto WHERE T_ID = ?), NULL, ?, 'Einzahlung', datetime('now', 'localtime'))", (t_id, amount))  # Fügt eine Transaktion für die Einzahlung hinzu
                     print("Erfolg: Nutzer erfolgreich hinzugefügt.")  # Gibt eine Erfolgsmeldung aus
                     def clear_entries():
@@ -371,24 +2396,6 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                     print("Erfolg: Nutzer erfolgreich hinzugefügt. Eingabefelder werden zurückgesetzt.")
                     clear_entries()
                 
-            def scan_barcode():
-                cap = cv2.VideoCapture(0)
-                barcode_value = None
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        messagebox.showerror("Fehler", "Kamerafehler!")
-                        break
-                    decoded_objects = pyzbar.decode(frame)
-                    if decoded_objects:
-                        barcode_value = decoded_objects[0].data.decode("utf-8")
-                        break
-                    cv2.imshow("Barcode Scanner", frame)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
-                cap.release()
-                cv2.destroyAllWindows()
-                return barcode_value
 
             user_label = ttk.Label(tab, text="Neuer Nutzer:")  # Erstellt ein Label für die Auswahl des Benutzers
             user_label.grid(row=0, column=0, padx=10, pady=5)
@@ -399,8 +2406,10 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             barcode_label.grid(row=1, column=0, padx=10, pady=5)
             barcode_entry = ttk.Entry(tab)  # Erstellt ein Eingabefeld für den Barcode
             barcode_entry.grid(row=1, column=1, padx=10, pady=5)
-            scan_button = ttk.Button(tab, text="Barcode scannen", command=lambda: barcode_entry.insert(tk.END, scan_barcode()))  # Erstellt einen Button, um den Barcode zu scannen
+            scan_button = ttk.Button(tab, text="Barcode scannen", command=lambda: barcode_entry.insert(tk.END, barcode_scanner() or ""))  # Erstellt einen Button, um den Barcode zu scannen
             scan_button.grid(row=1, column=2, padx=10, pady=5)
+            nummer_button = ttk.Button(tab, text="Nummer vergeben", command=lambda: nummer_vergeben(barcode_entry, Barcode_Nummern.ART_TEILNEHMER))
+            nummer_button.grid(row=1, column=3, padx=10, pady=5)
             
             initial_amount_label = ttk.Label(tab, text="Anfangsguthaben:")  # Erstellt ein Label für die Eingabe des Anfangsguthabens
             initial_amount_label.grid(row=2, column=0, padx=10, pady=5)
@@ -413,12 +2422,10 @@ def create_admin_tab(tab: tk.Frame, db: Database):
         def add_fund(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Einzahlungen...")  # Gibt eine Nachricht aus, die die Erstellung des "Einzahlung hinzufügen"-Tabs anzeigt
             def update_user_dropdowns(combobox):
-                users = fetch_users(db)  # Ruft die Liste der Benutzer ab
-                combobox['values'] = users  # Aktualisiert die Werte der Combobox
+                aktiviere_user_typeahead(combobox, db)  # Füllt die Combobox aus dem Suchindex, filtert beim Tippen und folgt Änderungen
             def add_custom_fund(db: Database, user: str, amount: float):
                 # Überprüfen, ob der Benutzer existiert
-                users = fetch_users(db)  # Ruft die Liste der Benutzer ab
-                if user not in users:
+                if user not in get_user_index(db):
                     messagebox.showerror("Fehler", "Benutzer nicht gefunden!")  # Zeigt eine Fehlermeldung an, wenn der Benutzer nicht gefunden wird
                     return
                 
@@ -437,7 +2444,8 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                 new_balance = user_balance[0][0] + amount  # Berechnet das neue Guthaben
                 
                 # Guthaben aktualisieren
-                db.execute_update("UPDATE Konto SET Kontostand = ? WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (new_balance, user))  # Aktualisiert das Guthaben des Benutzers
+                db.execute_update("UPDATE Konto SET Kontostand = ? WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (new_balance, user),
+                                  ereignis=(KONTOSTAND_GEAENDERT, {"name": user}))  # Aktualisiert das Guthaben des Benutzers
                 db.execute_insert("INSERT INTO Transaktion (K_ID, P_ID, Menge, Typ, Datum) VALUES ((SELECT K_ID FROM Konto WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)), NULL, ?, 'Einzahlung', datetime('now', 'localtime'))", (user, amount))
                 # Erfolgsmeldung anzeigen
                 print(f"Erfolg: {amount} € erfolgreich hinzugefügt.")  # Zeigt eine Erfolgsmeldung an
@@ -461,7 +2469,7 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Auszahlungen...")  # Gibt eine Nachricht aus, die die Erstellung des "Auszahlung hinzufügen"-Tabs anzeigt
             def withdraw_custom_fund(db: Database, user: str, amount: float):
                 # Überprüfen, ob der Benutzer existiert
-                if user not in fetch_users(db):
+                if user not in get_user_index(db):
                     messagebox.showerror("Fehler", "Benutzer nicht gefunden!")  # Zeigt eine Fehlermeldung an, wenn der Benutzer nicht gefunden wird
                     return
                 
@@ -483,16 +2491,17 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                 
                 # Geld abziehen
                 new_balance = user_balance[0][0] - amount  # Berechnet das neue Guthaben
-                db.execute_update("UPDATE Konto SET Kontostand = ? WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (new_balance, user))  # Aktualisiert das Guthaben des Benutzers
+                db.execute_update("UPDATE Konto SET Kontostand = ? WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (new_balance, user),
+                                  ereignis=(KONTOSTAND_GEAENDERT, {"name": user}))  # Aktualisiert das Guthaben des Benutzers
                 db.execute_insert("INSERT INTO Transaktion (K_ID, P_ID, Menge, Typ, Datum) VALUES ((SELECT K_ID FROM Konto WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)), NULL, ?, 'Auszahlung', datetime('now', 'localtime'))", (user, amount))
                 print(f"Erfolg: {amount} € erfolgreich abgehoben.")  # Zeigt eine Erfolgsmeldung an
             
             user_label = ttk.Label(tab, text="Benutzer auswählen:")  # Erstellt ein Label für die Auswahl des Benutzers
             user_label.grid(row=0, column=0, padx=10, pady=5)
             
-            users = fetch_users(db)  # Ruft die Liste der Benutzer ab
-            user_combobox = ttk.Combobox(tab, values=users)  # Erstellt eine Combobox für die Auswahl des Benutzers
+            user_combobox = ttk.Combobox(tab)  # Erstellt eine Combobox für die Auswahl des Benutzers
             user_combobox.grid(row=0, column=1, padx=10, pady=5)
+            aktiviere_user_typeahead(user_combobox, db)
             
             balance_label = ttk.Label(tab, text="Guthaben:")  # Erstellt ein Label für das Guthaben des Benutzers
             balance_label.grid(row=0, column=2, padx=10, pady=5)
@@ -508,6 +2517,7 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                     balance_label.config(text="Guthaben: Nicht verfügbar")
 
             user_combobox.bind("<<ComboboxSelected>>", update_balance_label)
+            db.bus.abonnieren(lambda art, daten: update_balance_label(None), KONTOSTAND_GEAENDERT)  # Guthaben bei Änderungen neu anzeigen
             
             amount_label = ttk.Label(tab, text="Betrag:")  # Erstellt ein Label für die Eingabe des Betrags
             amount_label.grid(row=1, column=0, padx=10, pady=5)
@@ -522,12 +2532,27 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             def update_user():
                 selected_user = user_combobox.get()  # Ruft den ausgewählten Benutzer ab
                 new_name = new_name_entry.get()  # Ruft den neuen Namen ab
-                new_barcode = new_barcode_entry.get()  # Ruft den neuen Barcode ab
+                new_barcode = Barcode_Nummern.normalisieren(new_barcode_entry.get())  # Gleiche Form wie beim Scannen
                 if selected_user and new_name and new_barcode:
+                    user_index = get_user_index(db)
+                    if selected_user not in user_index:
+                        messagebox.showerror("Fehler", "Benutzer nicht gefunden!")
+                        return
+                    if new_name != selected_user and new_name in user_index:
+                        messagebox.showerror("Fehler", "Benutzer bereits vorhanden!")
+                        return
+                    # Der eigene Barcode darf bleiben, jeder andere vergebene Barcode gehört schon einem Teilnehmer oder Produkt
+                    eigener_barcode = db.execute_select("SELECT TN_Barcode FROM Teilnehmer WHERE Name = ?", (selected_user,))[0][0]
+                    if (new_barcode != Barcode_Nummern.normalisieren(str(eigener_barcode or ""))
+                            and (new_barcode in Barcode_Nummern.vorhandene_barcodes(db.connection)
+                                 or user_index.aufloesen(new_barcode) not in (None, selected_user)
+                                 or get_product_index(db).aufloesen(new_barcode) is not None)):
+                        messagebox.showerror("Fehler", "Barcode bereits vergeben!")
+                        return
                     try:
-                        db.execute_update("UPDATE Teilnehmer SET Name = ?, TN_Barcode = ? WHERE Name = ?", (new_name, new_barcode, selected_user))  # Aktualisiert den Namen und Barcode des Benutzers
+                        db.execute_update("UPDATE Teilnehmer SET Name = ?, TN_Barcode = ? WHERE Name = ?", (new_name, new_barcode, selected_user),
+                                          ereignis=(TEILNEHMER_GEAENDERT, {"alt": selected_user, "name": new_name, "barcode": new_barcode}))  # Aktualisiert den Namen und Barcode des Benutzers
                         print("Erfolg: Benutzerdaten erfolgreich aktualisiert.")  # Zeigt eine Erfolgsmeldung an
-                        update_user_dropdowns(user_combobox, db=db)  # Aktualisiert die Benutzer-Dropdown
                     except Exception as e:
                         messagebox.showerror("Fehler", f"Fehler beim Aktualisieren der Benutzerdaten: {e}")  # Zeigt eine Fehlermeldung an
                 else:
@@ -536,9 +2561,9 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             user_label = ttk.Label(tab, text="Benutzer auswählen:")  # Erstellt ein Label für die Auswahl des Benutzers
             user_label.grid(row=0, column=0, padx=10, pady=5)
 
-            users = fetch_users(db)  # Ruft die Liste der Benutzer ab
-            user_combobox = ttk.Combobox(tab, values=users)  # Erstellt eine Combobox für die Auswahl des Benutzers
+            user_combobox = ttk.Combobox(tab)  # Erstellt eine Combobox für die Auswahl des Benutzers
             user_combobox.grid(row=0, column=1, padx=10, pady=5)
+            aktiviere_user_typeahead(user_combobox, db)
 
             new_name_label = ttk.Label(tab, text="Neuer Name:")  # Erstellt ein Label für die Eingabe des neuen Namens
             new_name_label.grid(row=1, column=0, padx=10, pady=5)
@@ -550,25 +2575,6 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             new_barcode_entry = ttk.Entry(tab)  # Erstellt ein Eingabefeld für den neuen Barcode
             new_barcode_entry.grid(row=2, column=1, padx=10, pady=5)
             
-            def scan_barcode():
-                cap = cv2.VideoCapture(0)  # Startet die Kamera
-                barcode_value = None
-                while True:
-                    ret, frame = cap.read()  # Liest ein Bild von der Kamera
-                    if not ret:
-                        messagebox.showerror("Fehler", "Kamerafehler!")
-                        break
-                    decoded_objects = pyzbar.decode(frame)  # Dekodiert Barcodes im Bild
-                    if decoded_objects:
-                        barcode_value = decoded_objects[0].data.decode("utf-8")  # Speichert den Barcode-Wert
-                        print("Barcode gelesen: " + barcode_value)  # Zeigt die Barcode-Information an
-                        break
-                    cv2.imshow("Barcode Scanner", frame)  # Zeigt das Kamerabild an
-                    if cv2.waitKey(1) & 0xFF == ord('q'):  # Beendet die Schleife, wenn 'q' gedrückt wird
-                        break
-                cap.release()  # Gibt die Kamera frei
-                cv2.destroyAllWindows()  # Schließt alle Fenster
-                return barcode_value
 
             scan_button = ttk.Button(tab, text="Barcode scannen", command=lambda: new_barcode_entry.insert(0, barcode_scanner()))  # Erstellt einen Button zum Starten des Scans
             scan_button.grid(row=3, column=0, columnspan=2, pady=10)
@@ -579,13 +2585,23 @@ def create_admin_tab(tab: tk.Frame, db: Database):
         def add_product(tab: tk.Frame, db: Database ):
             print("Erstelle Tab für Produkt hinzufügen...")  # Gibt eine Nachricht aus, die die Erstellung des "Produkt hinzufügen"-Tabs anzeigt
             def add_custom_product(db: Database, price: float, barcode: str, product: str):
-                # Überprüfen, ob das Produkt bereits existiert
-                products = fetch_products(db)  # Ruft die Liste der Produkte a
-                if barcode in products:
-                    print("Fehler: Produkt bereits vorhanden!")  # Zeigt eine Fehlermeldung an, wenn das Produkt bereits existiert
+                product = product.strip()
+                barcode = Barcode_Nummern.normalisieren(barcode)  # Gleiche Form wie beim Scannen
+                # Überprüfen, ob das Produkt oder der Barcode bereits existiert
+                if not product:
+                    messagebox.showerror("Fehler", "Produktname fehlt!")
+                    return
+                if product in get_product_index(db):
+                    messagebox.showerror("Fehler", "Produkt bereits vorhanden!")  # Zeigt eine Fehlermeldung an, wenn das Produkt bereits existiert
+                    return
+                if barcode and barcode in Barcode_Nummern.vorhandene_barcodes(db.connection):
+                    messagebox.showerror("Fehler", "Barcode bereits vergeben!")
                     return
                 else:
-                    db.execute_insert("INSERT INTO Produkt (Beschreibung,P_Barcode, Preis, Anzahl_verkauft) VALUES (?, ?, ?, 0)", (barcode, barcode, price))  # Fügt das neue Produkt in die Datenbank ein
+                    with db.transaction() as cursor:
+                        cursor.execute("INSERT INTO Produkt (Beschreibung,P_Barcode, Preis, Anzahl_verkauft) VALUES (?, ?, ?, 0)", (product, barcode, price))  # Fügt das neue Produkt in die Datenbank ein
+                        cursor.execute("INSERT INTO Preis_Historie (P_ID, Preis, Gueltig_ab) VALUES (?, ?, CURRENT_TIMESTAMP)", (cursor.lastrowid, price))
+                    db.melde(PRODUKT_HINZUGEFUEGT, name=product, barcode=barcode)
                     print("Erfolg: Produkt erfolgreich hinzugefügt.")  # Zeigt eine Erfolgsmeldung an
                     def clear_entries():
                         product_entry.delete(0, tk.END)  # Löscht den Inhalt des Produkt-Eingabefelds
@@ -610,28 +2626,31 @@ def create_admin_tab(tab: tk.Frame, db: Database):
 
             add_scan_button = ttk.Button(tab, text="Barcode scannen", command=lambda: add_barcode_entry.insert(0, barcode_scanner()))  # Erstellt einen Button, um den Barcode zu scannen
             add_scan_button.grid(row=1, column=2, padx=10, pady=5)
+            nummer_button = ttk.Button(tab, text="Nummer vergeben", command=lambda: nummer_vergeben(add_barcode_entry, Barcode_Nummern.ART_PRODUKT))
+            nummer_button.grid(row=1, column=3, padx=10, pady=5)
             hinzufuegen_button = ttk.Button(tab, text="Produkt hinzufügen", command=lambda: add_custom_product(db, float(preis_entry.get()), str(add_barcode_entry.get()), str(product_entry.get())))  # Erstellt einen Button, um das Produkt hinzuzufügen
             hinzufuegen_button.grid(row=3, column=0, columnspan=3, pady=10)
             
         def add_barcode_to_product(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Barcode hinzufügen...")
             def add_custom_barcode(db: Database, product: str, barcode: str):
+                barcode = Barcode_Nummern.normalisieren(barcode)  # Gleiche Form wie beim Scannen
                 # Überprüfen, ob das Produkt existiert
-                products = fetch_products(db)
-                if product not in products:
+                product_index = get_product_index(db)
+                if product not in product_index:
                     messagebox.showerror("Fehler", "Produkt nicht gefunden!")
                     return
-                elif barcode in products:
+                elif product_index.aufloesen(barcode) is not None or barcode in Barcode_Nummern.vorhandene_barcodes(db.connection):
                     messagebox.showerror("Fehler", "Barcode bereits vorhanden!")
                     return
                 else:
                     try:
                         db.execute_insert(
                             "INSERT INTO Produkt_Barcode (P_ID, Barcode) SELECT P_ID, ? FROM Produkt WHERE Beschreibung = ?",
-                            (barcode, product)
+                            (barcode, product),
+                            ereignis=(PRODUKT_GEAENDERT, {"alt": product, "name": product, "barcode": barcode})
                         )
                         print("Erfolg: Barcode erfolgreich hinzugefügt.")
-                        update_product_dropdowns(product_combobox, db)
                         def clear_entries():
                             product_combobox.set('')
                             barcode_entry.delete(0, tk.END)
@@ -643,9 +2662,9 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             
             product_label = ttk.Label(tab, text="Produkt auswählen:")
             product_label.grid(row=0, column=0, padx=10, pady=5)
-            products = fetch_products(db)
-            product_combobox = ttk.Combobox(tab, values=products)
+            product_combobox = ttk.Combobox(tab)
             product_combobox.grid(row=0, column=1, padx=10, pady=5)
+            aktiviere_product_typeahead(product_combobox, db)
             
             barcode_label = ttk.Label(tab, text="Neuer Barcode:")
             barcode_label.grid(row=1, column=0, padx=10, pady=5)
@@ -657,92 +2676,130 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             
             add_button = ttk.Button(tab, text="Hinzufügen", command=lambda: add_custom_barcode(db, product_combobox.get(), barcode_entry.get()))
             add_button.grid(row=2, column=0, columnspan=2, pady=10)
-            update_product_dropdowns(product_combobox, db)
             
         def edit_product_prices(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Preisbearbeitung...")  # Gibt eine Nachricht aus, die die Erstellung des "Produktpreise bearbeiten"-Tabs anzeigt
             def update_product_price():
-                selected_product = barcode_scanner()  # Ruft das ausgewählte Produkt ab
+                selected_product = get_product_index(db).aufloesen(product_combobox.get())  # Produktname oder eingegebener Barcode
                 new_price = new_price_entry.get()  # Ruft den neuen Preis ab
                 if selected_product and new_price:
                     try:
-                        db.execute_update("UPDATE Produkt SET Preis = ? WHERE Beschreibung = ?", (new_price, selected_product))  # Aktualisiert den Preis des Produkts
+                        setze_preis(db, selected_product, float(new_price))  # Alter Preis bleibt in der Preishistorie erhalten
                         print("Erfolg: Produktpreis erfolgreich aktualisiert.")  # Zeigt eine Erfolgsmeldung an
-                        update_product_dropdowns(product_combobox, db)  # Aktualisiert die Produkt-Dropdown
                     except Exception as e:
-                        print(f"Fehler: Fehler beim Aktualisieren des Produktpreises: {e}")  # Zeigt eine Fehlermeldung an
+                        messagebox.showerror("Fehler", f"Fehler beim Aktualisieren des Produktpreises: {e}")
                 else:
                     # Zeigt eine Warnung an, wenn kein Produkt ausgewählt oder kein neuer Preis eingegeben wurde
-                    print("Warnung: Bitte wählen Sie ein Produkt und geben Sie einen neuen Preis ein.")
+                    messagebox.showwarning("Warnung", "Bitte wählen Sie ein Produkt und geben Sie einen neuen Preis ein.")
                     
             product_label = ttk.Label(tab, text="Produkt auswählen:")  # Erstellt ein Label für die Produktwahl
             product_label.grid(row=0, column=0, padx=10, pady=5)
-            products = fetch_products(db)  # Ruft die Liste der verfügbaren Produkte ab
-            product_combobox = ttk.Combobox(tab, values=products)  # Erstellt eine Combobox zur Auswahl eines Produkts
+            product_combobox = ttk.Combobox(tab)  # Erstellt eine Combobox zur Auswahl eines Produkts
             product_combobox.grid(row=0, column=1, padx=10, pady=5)
+            aktiviere_product_typeahead(product_combobox, db)
             new_price_label = ttk.Label(tab, text="Neuer Preis:")  # Erstellt ein Label für die Eingabe des neuen Preises
             new_price_label.grid(row=1, column=0, padx=10, pady=5)
             new_price_entry = ttk.Entry(tab)  # Erstellt ein Eingabefeld für den neuen Preis
             new_price_entry.grid(row=1, column=1, padx=10, pady=5)
             update_button = ttk.Button(tab, text="Aktualisieren", command=update_product_price)  # Erstellt einen Button zur Aktualisierung des Preises
             update_button.grid(row=2, column=0, columnspan=2, pady=10)
-            # Aktualisiert die Dropdown-Liste der Produkte mit der aktuellen Datenbank
-            update_product_dropdowns(product_combobox, db=db)
+
+        def preisperioden_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Preisperioden...")
+            spalten = ("Produkt", "Preis_€", "Gültig ab", "Gültig bis", "Menge", "Umsatz_€")
+            tree = ttk.Treeview(tab, columns=spalten, show="headings", height=20)
+            for spalte in spalten:
+                tree.heading(spalte, text=spalte)
+                tree.column(spalte, anchor="center", width=130)
+            tree.grid(row=0, column=0, padx=10, pady=5, sticky='nsew')
+
+            def anzeigen(art=None, daten=None):
+                tree.delete(*tree.get_children())
+                for produkt, preis, ab, bis, menge, umsatz in db.execute_select(PREISPERIODEN_SQL):
+                    tree.insert("", "end", values=(produkt, f"{preis:.2f}", ab or "Beginn", bis or "heute", menge, f"{umsatz:.2f}"))
+
+            aktualisieren_button = ttk.Button(tab, text="Aktualisieren", command=anzeigen)
+            aktualisieren_button.grid(row=1, column=0, padx=10, pady=5)
+            db.bus.abonnieren(anzeigen, *PRODUKT_EREIGNISSE, DATENBANK_GEAENDERT)
+            anzeigen()
 
         def delete_user_tab(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Benutzer löschen...")
             def delete_user():
-                selected_user = barcode_scanner()
+                selected_user = get_user_index(db).aufloesen(user_combobox.get())  # Name aus der Liste oder gescannter Barcode
                 if selected_user:
+                    if not messagebox.askyesno("Benutzer löschen", f"{selected_user} wirklich löschen?"):
+                        return
                     try:
                         db.execute_update("DELETE FROM Konto WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (selected_user,))
-                        db.execute_update("DELETE FROM Teilnehmer WHERE Name = ?", (selected_user,))
+                        db.execute_update("DELETE FROM Teilnehmer WHERE Name = ?", (selected_user,),
+                                          ereignis=(TEILNEHMER_GELOESCHT, {"name": selected_user}))
+                        user_combobox.set("")
                         print("Erfolg: Benutzer erfolgreich gelöscht.")
-                        update_user_dropdowns(user_combobox, db=db)
                     except Exception as e:
-                        print(f"Fehler: Fehler beim Löschen des Benutzers: {e}")
+                        messagebox.showerror("Fehler", f"Fehler beim Löschen des Benutzers: {e}")
                 else:    
-                    print("Warnung: Bitte wählen Sie einen Benutzer.")
+                    messagebox.showwarning("Warnung", "Bitte wählen Sie einen Benutzer.")
+
+            def scannen():
+                barcode_value = barcode_scanner()
+                if barcode_value:
+                    user_combobox.set(barcode_value)
                     
             user_label = ttk.Label(tab, text="Benutzer auswählen:")  # Erstellt ein Label für die Auswahl des Benutzers
             user_label.grid(row=0, column=0, padx=10, pady=5)
-            users = fetch_users(db)  # Ruft die Liste der Benutzer ab
-            user_combobox = ttk.Combobox(tab, values=users)  # Erstellt eine Combobox für die Auswahl des Benutzers
+            user_combobox = ttk.Combobox(tab)  # Erstellt eine Combobox für die Auswahl des Benutzers
             user_combobox.grid(row=0, column=1, padx=10, pady=5)
+            aktiviere_user_typeahead(user_combobox, db)
+            scan_button = ttk.Button(tab, text="Barcode scannen", command=scannen)
+            scan_button.grid(row=0, column=2, padx=10, pady=5)
             delete_button = ttk.Button(tab, text="Benutzer löschen", command=delete_user)  # Erstellt einen Button, um den Benutzer zu löschen
             delete_button.grid(row=1, column=0, columnspan=2, pady=10)
             
         def delete_product_tab(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Produkt löschen...")
             def delete_product():
-                selected_product = barcode_scanner()
+                selected_product = get_product_index(db).aufloesen(product_combobox.get())  # Name aus der Liste oder gescannter Barcode
                 if selected_product:
+                    if not messagebox.askyesno("Produkt löschen", f"{selected_product} wirklich löschen?"):
+                        return
                     try:
-                        db.execute_update("DELETE FROM Produkt WHERE Beschreibung = ?", (selected_product,))
+                        db.execute_update("DELETE FROM Produkt WHERE Beschreibung = ?", (selected_product,),
+                                          ereignis=(PRODUKT_GELOESCHT, {"name": selected_product}))
+                        product_combobox.set("")
                         print("Erfolg: Produkt erfolgreich gelöscht.")
-                        update_product_dropdowns(product_combobox, db)
                     except Exception as e:
-                        print(f"Fehler: Fehler beim Löschen des Produkts: {e}")
+                        messagebox.showerror("Fehler", f"Fehler beim Löschen des Produkts: {e}")
                 else:
-                    print("Warnung: Bitte wählen Sie ein Produkt.")
+                    messagebox.showwarning("Warnung", "Bitte wählen Sie ein Produkt.")
+
+            def scannen():
+                barcode_value = barcode_scanner()
+                if barcode_value:
+                    product_combobox.set(barcode_value)
                     
             product_label = ttk.Label(tab, text="Produkt auswählen:")
             product_label.grid(row=0, column=0, padx=10, pady=5)
-            products = fetch_products(db)
-            product_combobox = ttk.Combobox(tab, values=products)
+            product_combobox = ttk.Combobox(tab)
             product_combobox.grid(row=0, column=1, padx=10, pady=5)
+            aktiviere_product_typeahead(product_combobox, db)
+            scan_button = ttk.Button(tab, text="Barcode scannen", command=scannen)
+            scan_button.grid(row=0, column=2, padx=10, pady=5)
             delete_button = ttk.Button(tab, text="Produkt löschen", command=delete_product)
             delete_button.grid(row=1, column=0, columnspan=2, pady=10)
         
         def create_Barcode_tab(tab: tk.Frame, db: Database):
             print("Erstelle Barcode-Tab...")
-            def open_file_dialog():
-                subprocess.run(["python3", "TN_Barcode_erstellen.py"])
-                print("Barcode_erstellen.py wurde im gleichen Verzeichnis ausgeführt.")
+            def open_file_dialog(skript: str):
+                subprocess.run(["python3", skript])
+                print(f"{skript} wurde im gleichen Verzeichnis ausgeführt.")
+                reset_such_indizes()  # Kann neue Nummern vergeben haben
             
             
-            button = ttk.Button(tab, text="Barcode erstellen", command=open_file_dialog)  # Erstellt einen Button, um den Barcode-Dialog zu öffnen
+            button = ttk.Button(tab, text="Teilnehmer-Barcodes erstellen", command=lambda: open_file_dialog("02_TN_Barcode_erstellen.py"))  # Erstellt einen Button, um den Barcode-Dialog zu öffnen
             button.pack(pady=10)  # Fügt den Button zum Tab hinzu
+            produkt_button = ttk.Button(tab, text="Produkt-Barcodes erstellen", command=lambda: open_file_dialog("02_Produkt_Barcode_erstellen.py"))
+            produkt_button.pack(pady=10)
         
         def run_backup_tab(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Backup...")
@@ -753,12 +2810,148 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                         for line in db.connection.iterdump():
                             f.write('%s\n' % line)
                     print("Backup der Datenbank wurde erfolgreich erstellt.")
+                    pruefe_konten(db, inkrementell=True)  # Nach jedem Backup die Konten gegen das Transaktionslog prüfen
                 except Exception as e:
                         print("Fehler beim Erstellen des Backups: {e}")
             
+            def run_export(format: str):
+                dateiname = filedialog.asksaveasfilename(title="Export speichern unter", initialfile=f"Lagerbank_{datetime.now():%Y%m%d_%H%M}")
+                if not dateiname:
+                    return
+                praefix = os.path.splitext(dateiname)[0]
+                try:
+                    dateien = exportiere_kassenbuch(db, praefix, format, None if nur_neue_var.get() else 0)
+                    messagebox.showinfo("Export", "Export erstellt:\n" + "\n".join(dateien))
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Export: {e}")
+
             backup_button = ttk.Button(tab, text="Backup erstellen", command=run_backup)
             backup_button.grid(row=0, column=0, padx=10, pady=5)
+            nur_neue_var = tk.BooleanVar(value=False)
+            nur_neue_check = ttk.Checkbutton(tab, text="Nur neue Transaktionen seit dem letzten Export", variable=nur_neue_var)
+            nur_neue_check.grid(row=1, column=0, columnspan=2, padx=10, pady=5)
+            csv_button = ttk.Button(tab, text="Export als CSV", command=lambda: run_export("csv"))
+            csv_button.grid(row=2, column=0, padx=10, pady=5)
+            parquet_button = ttk.Button(tab, text="Export als Parquet", command=lambda: run_export("parquet"))
+            parquet_button.grid(row=2, column=1, padx=10, pady=5)
         
+        def jahreswechsel_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Jahreswechsel...")
+            jahre_spalten = ("Jahr", "Teilnehmer", "Einzahlungen_€", "Umsatz_€", "Umsatz pro Teilnehmer_€")
+            jahre_tree = ttk.Treeview(tab, columns=jahre_spalten, show="headings", height=6)
+            produkt_spalten = ("Jahr", "Produkt", "Menge", "Umsatz_€")
+            produkt_tree = ttk.Treeview(tab, columns=produkt_spalten, show="headings", height=12)
+            for tree, spalten in ((jahre_tree, jahre_spalten), (produkt_tree, produkt_spalten)):
+                for spalte in spalten:
+                    tree.heading(spalte, text=spalte)
+                    tree.column(spalte, anchor="center", width=140)
+            jahre_tree.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky='nsew')
+            produkt_tree.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky='nsew')
+
+            def vergleich_anzeigen():
+                try:
+                    jahre, produkte = jahresvergleich(db)
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Laden der Archive: {e}")
+                    return
+                jahre_tree.delete(*jahre_tree.get_children())
+                for jahr, teilnehmer, einzahlungen, umsatz in jahre:
+                    pro_kopf = umsatz / teilnehmer if teilnehmer else 0.0
+                    jahre_tree.insert("", "end", values=(jahr, teilnehmer, f"{einzahlungen:.2f}", f"{umsatz:.2f}", f"{pro_kopf:.2f}"))
+                produkt_tree.delete(*produkt_tree.get_children())
+                for jahr, produkt, menge, umsatz in produkte:
+                    produkt_tree.insert("", "end", values=(jahr, produkt, menge, f"{umsatz:.2f}"))
+
+            def jahr_abschliessen():
+                if not messagebox.askyesno("Jahreswechsel", "Das laufende Lagerjahr archivieren und ein neues Kassenbuch beginnen?\n"
+                                           "Teilnehmer, Produkte und Barcodes bleiben erhalten, Restguthaben werden übertragen."):
+                    return
+                try:
+                    archiv = jahreswechsel(db)
+                    messagebox.showinfo("Jahreswechsel", f"Archiv erstellt:\n{archiv}")
+                    vergleich_anzeigen()
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Jahreswechsel: {e}")
+
+            abschliessen_button = ttk.Button(tab, text="Jahr abschließen und archivieren", command=jahr_abschliessen)
+            abschliessen_button.grid(row=0, column=0, padx=10, pady=5)
+            vergleich_button = ttk.Button(tab, text="Jahresvergleich aktualisieren", command=vergleich_anzeigen)
+            vergleich_button.grid(row=0, column=1, padx=10, pady=5)
+
+        def diagnose_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Diagnose...")
+            spalten = ("Stufe", "Anzahl", "pro Minute", "p50 (ms)", "p95 (ms)", "p99 (ms)")
+            tree = ttk.Treeview(tab, columns=spalten, show="headings", height=18)
+            for spalte in spalten:
+                tree.heading(spalte, text=spalte)
+                tree.column(spalte, anchor="center", width=90)
+            tree.column("Stufe", anchor="w", width=420)
+            tree.grid(row=0, column=0, columnspan=4, padx=10, pady=5, sticky='nsew')
+
+            def anzeigen():
+                if not tab.winfo_ismapped():
+                    return  # Nur rechnen, solange der Tab sichtbar ist
+                zeilen = _latenzen.statistik()
+                if _scanner_prozess is not None and _scanner_prozess.prozess.is_alive():
+                    zeilen += _scanner_prozess.zeiten_statistik()
+                tree.delete(*tree.get_children())
+                for stufe, anzahl, pro_minute, p50, p95, p99 in zeilen:
+                    tree.insert("", "end", values=(stufe, anzahl, f"{pro_minute:.1f}", f"{p50:.1f}", f"{p95:.1f}", f"{p99:.1f}"))
+
+            def regelmaessig_anzeigen():
+                try:
+                    anzeigen()
+                except Exception as e:
+                    print(f"Fehler beim Aktualisieren der Diagnose: {e}")
+                tab.after(DIAGNOSE_INTERVALL_MS, regelmaessig_anzeigen)
+
+            sekunden_label = ttk.Label(tab, text="Profil-Dauer (s):")
+            sekunden_label.grid(row=1, column=0, padx=10, pady=5, sticky='e')
+            sekunden_entry = ttk.Entry(tab, width=6)
+            sekunden_entry.insert(0, "30")
+            sekunden_entry.grid(row=1, column=1, padx=10, pady=5, sticky='w')
+            status_label = ttk.Label(tab, text="")
+            status_label.grid(row=1, column=3, padx=10, pady=5)
+
+            def profil_beenden(profil: cProfile.Profile, praefix: str, tracemalloc_lief: bool):
+                profil.disable()
+                schnappschuss = tracemalloc.take_snapshot()
+                if not tracemalloc_lief:
+                    tracemalloc.stop()
+                profil.dump_stats(praefix + ".prof")  # Für snakeviz oder pstats
+                with open(praefix + "_Profil.txt", "w", encoding="utf-8") as f:
+                    pstats.Stats(profil, stream=f).sort_stats("cumulative").print_stats(40)
+                with open(praefix + "_Speicher.txt", "w", encoding="utf-8") as f:
+                    for eintrag in schnappschuss.statistics("lineno")[:30]:
+                        f.write(f"{eintrag}\n")
+                profil_button.config(state="normal")
+                status_label.config(text=f"Gespeichert: {praefix}_Profil.txt")
+                print(f"Profil gespeichert: {praefix}.prof, {praefix}_Profil.txt, {praefix}_Speicher.txt")
+
+            def profil_starten():
+                # Profiliert den GUI-Thread (Kasse, Abfragen, Tabellen) und zeichnet Speicherzuweisungen auf
+                try:
+                    sekunden = int(sekunden_entry.get())
+                    if sekunden <= 0:
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("Fehler", "Ungültige Dauer!")
+                    return
+                praefix = f"Diagnose_{datetime.now():%Y%m%d_%H%M%S}"
+                tracemalloc_lief = tracemalloc.is_tracing()
+                if not tracemalloc_lief:
+                    tracemalloc.start()
+                profil = cProfile.Profile()
+                profil.enable()
+                profil_button.config(state="disabled")
+                status_label.config(text=f"Profil läuft {sekunden} s ...")
+                tab.after(sekunden * 1000, profil_beenden, profil, praefix, tracemalloc_lief)
+
+            profil_button = ttk.Button(tab, text="Profil aufnehmen", command=profil_starten)
+            profil_button.grid(row=1, column=2, padx=10, pady=5)
+            tab.bind("<Map>", lambda event: anzeigen())
+            regelmaessig_anzeigen()
+
         def delete_database_tab(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Datenbank löschen...")
             def delete_database():
@@ -862,83 +3055,27 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             print("Erstelle Tab für Checkout...")
             def last_day():
                 def Kontosant_in_geld(kontostand):
-                    if kontostand:
-                        kontostand_value = kontostand[0][0]  # Zugriff auf den ersten Wert der ersten Zeile
-                        zwischenstand = round(kontostand_value, 2)  # Rundet den Kontostand auf zwei Nachkommastellen
-                        print(zwischenstand)
-                    zwanziger = zehner = fuenfer = zweier = einer = halber = 0
-                    zwanzig_cent = zehn_cent = fuenf_cent = zwei_cent = ein_cent = 0
-                    
-                    zzwanziger = zwischenstand // 20
-                    zwanziger += zzwanziger
-                    zwischenstand -= zzwanziger * 20
-                    zzehner = zwischenstand // 10
-                    zehner += zzehner
-                    zwischenstand -= zzehner * 10
-                    zfuenfer = zwischenstand // 5
-                    fuenfer += zfuenfer
-                    zwischenstand -= zfuenfer * 5
-                    zzweier = zwischenstand // 2
-                    zweier += zzweier
-                    zwischenstand -= zzweier * 2
-                    zeiner = zwischenstand // 1
-                    einer += zeiner
-                    zwischenstand -= zeiner * 1
-                    zhalber = zwischenstand // 0.5
-                    halber += zhalber
-                    zwischenstand -= zhalber * 0.5
-                    zzwanzig_cent = zwischenstand // 0.2
-                    zwanzig_cent += zzwanzig_cent
-                    zwischenstand -= zzwanzig_cent * 0.2
-                    zzehn_cent = zwischenstand // 0.1
-                    zehn_cent += zzehn_cent
-                    zwischenstand -= zzehn_cent * 0.1
-                    zfuenf_cent = zwischenstand // 0.05
-                    fuenf_cent += zfuenf_cent
-                    zwischenstand -= zfuenf_cent * 0.05
-                    zzwei_cent = zwischenstand // 0.02
-                    zwei_cent += zzwei_cent
-                    zwischenstand -= zzwei_cent * 0.02
-                    zein_cent = zwischenstand // 0.01
-                    ein_cent += zein_cent
-                    zwischenstand -= zein_cent * 0.01
-                    
-                    print(f"20€ Scheine: {zwanziger}")
-                    print(f"10€ Scheine: {zehner}")
-                    print(f"5€ Scheine: {fuenfer}")
-                    print(f"2€ Münzen: {zweier}")
-                    print(f"1€ Münzen: {einer}")    
-                    print(f"50 Cent Münzen: {halber}")
-                    print(f"20 Cent Münzen: {zwanzig_cent}")
-                    print(f"10 Cent Münzen: {zehn_cent}")
-                    print(f"5 Cent Münzen: {fuenf_cent}")
-                    print(f"2 Cent Münzen: {zwei_cent}")
-                    print(f"1 Cent Münzen: {ein_cent}")
-                    
-                    sume = zwanziger * 20 + zehner * 10 + fuenfer * 5 + zweier * 2 + einer * 1 + halber * 0.5 + zwanzig_cent * 0.2 + zehn_cent * 0.1 + fuenf_cent * 0.05 + zwei_cent * 0.02 + ein_cent * 0.01
-                    print(f"Summe: {sume:.2f}")
+                    kontostand_value = round(kontostand[0][0], 2) if kontostand else 0  # Kontostand auf zwei Nachkommastellen
+                    aufteilung = berechne_geldaufteilung(kontostand_value)  # Gleiche Rechnung in ganzen Cent wie beim Sammel-Checkout
+                    for (_, bezeichnung), anzahl in zip(GELD_STUECKELUNG, aufteilung):
+                        print(f"{bezeichnung}: {anzahl}")
+                    print(f"Summe: {sum(wert * anzahl for (wert, _), anzahl in zip(GELD_STUECKELUNG, aufteilung)) / 100:.2f}")
                     print(f"Gesamtkontostand: {kontostand_value:.2f} €")
+                    return aufteilung
                     
-                    return zwanziger, zehner, fuenfer, zweier, einer, halber, zwanzig_cent, zehn_cent, fuenf_cent, zwei_cent, ein_cent
-                    
-                users = fetch_users(db)
                 benutzer_id = tn_combobox.get()
                 
                 if not benutzer_id:
                     print("Bitte wählen Sie einen Teilnehmer aus.")
                     return
-                if benutzer_id not in users:
+                if benutzer_id not in get_user_index(db):
                     print("Der ausgewählte Teilnehmer existiert nicht.")
                     return
                 
                 kontostand = db.execute_select("SELECT Kontostand FROM Konto WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (benutzer_id,))
-                geldwerte = Kontosant_in_geld(kontostand)
-                if geldwerte is None:
-                    zwanziger = zehner = fuenfer = zweier = einer = halber = zwanzig_cent = zehn_cent = fuenf_cent = zwei_cent = ein_cent = 0
-                else:
-                    zwanziger, zehner, fuenfer, zweier, einer, halber, zwanzig_cent, zehn_cent, fuenf_cent, zwei_cent, ein_cent = geldwerte
-                checkout_ui(benutzer_id, kontostand[0][0] if kontostand else 0, zwanziger, zehner, fuenfer, zweier, einer, halber, zwanzig_cent, zehn_cent, fuenf_cent, zwei_cent, ein_cent)
-            def checkout_ui(benutzer_id, kontostand, zwanziger, zehner, fuenfer, zweier, einer, halber, zwanzig_cent, zehn_cent, fuenf_cent, zwei_cent, ein_cent):
+                aufteilung = Kontosant_in_geld(kontostand)
+                checkout_ui(benutzer_id, kontostand[0][0] if kontostand else 0, aufteilung)
+            def checkout_ui(benutzer_id, kontostand, aufteilung):
                         checkout_window = tk.Toplevel()
                         checkout_window.title("Checkout Nachverfolgung")
                         checkout_window.geometry("540x540")
@@ -957,32 +3094,28 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                         aufteilung_label.grid(row=3, column=1, padx=10, pady=10)
                         
                         def show_aufteilung():
-                            aufteilung_text = (
-                                f"20€ Scheine: {zwanziger}\n"
-                                f"10€ Scheine: {zehner}\n"
-                                f"5€ Scheine: {fuenfer}\n"
-                                f"2€ Münzen: {zweier}\n"
-                                f"1€ Münzen: {einer}\n"
-                                f"50 Cent Münzen: {halber}\n"
-                                f"20 Cent Münzen: {zwanzig_cent}\n"
-                                f"10 Cent Münzen: {zehn_cent}\n"
-                                f"5 Cent Münzen: {fuenf_cent}\n"
-                                f"2 Cent Münzen: {zwei_cent}\n"
-                                f"1 Cent Münzen: {ein_cent}"
-                            )
+                            aufteilung_text = "\n".join(f"{bezeichnung}: {anzahl}" for (_, bezeichnung), anzahl in zip(GELD_STUECKELUNG, aufteilung))
                             aufteilung_label.config(text=aufteilung_text)
                         
                         show_aufteilung()
                         
                         def update_status():
-                            db.execute_update("UPDATE Konto SET Kontostand = 0 WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (benutzer_id,))
+                            with db.transaction() as cursor:
+                                cursor.execute("BEGIN IMMEDIATE")  # Kein gleichzeitiger Kauf zwischen Ausgleich und Nullsetzen
+                                # Ausgleich im Transaktionslog festhalten, damit die Kontenprüfung aufgeht
+                                k_id = cursor.execute("SELECT K_ID FROM Konto WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (benutzer_id,)).fetchone()
+                                if k_id is not None:
+                                    cursor.execute(CHECKOUT_AUSGLEICH_SQL, k_id)
+                                cursor.execute("UPDATE Konto SET Kontostand = 0 WHERE T_ID = (SELECT T_ID FROM Teilnehmer WHERE Name = ?)", (benutzer_id,))
+                                cursor.execute("UPDATE Teilnehmer SET Checkout = 1 WHERE Name = ?", (benutzer_id,))
+                            db.melde(KONTOSTAND_GEAENDERT, name=benutzer_id)
+                            db.melde(TEILNEHMER_AUSGECHECKT, namen=[benutzer_id])
                             print(f"Kontostand von Benutzer {benutzer_id} wurde auf 0 gesetzt.")
                             status_label.config(text="Checkout abgeschlossen.")
                             highlighted_users.append(benutzer_id)
-                            db.execute_update("UPDATE Teilnehmer SET Checkout = 1 WHERE Name = ?", (benutzer_id,))
                             print("Higlighted Users", highlighted_users)
-                            sleep(2)
-                            checkout_window.destroy()
+                            checkout_button.config(state="disabled")  # Kein zweiter Checkout, solange das Fenster noch offen ist
+                            checkout_window.after(2000, checkout_window.destroy)  # Meldung kurz zeigen, ohne die Oberfläche anzuhalten
                         
                         
                         checkout_button = tk.Button(checkout_window, text="Checkout bestätigen", command=update_status)
@@ -992,12 +3125,152 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             tn_label.grid(row=0, column=0, padx=10, pady=5)
             tn_combobox = ttk.Combobox(tab)
             tn_combobox.grid(row=0, column=1, padx=10, pady=5)
-            users = fetch_users(db)
-            tn_combobox["values"] = users
+            aktiviere_user_typeahead(tn_combobox, db)
             
             checkout_button = ttk.Button(tab, text="Checkout", command=last_day)
             checkout_button.grid(row=1, column=0, columnspan=2, pady=10)
             
+        def sammel_checkout(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Sammel-Checkout...")
+            def update_liste():
+                teilnehmer_listbox.delete(0, tk.END)
+                for row in db.execute_select("SELECT Teilnehmer.Name FROM Teilnehmer JOIN Konto ON Konto.T_ID = Teilnehmer.T_ID WHERE Teilnehmer.Checkout = 0 ORDER BY Teilnehmer.Name"):
+                    teilnehmer_listbox.insert(tk.END, row[0])
+
+            def checkout_durchfuehren():
+                namen = [teilnehmer_listbox.get(i) for i in teilnehmer_listbox.curselection()]
+                if not namen:
+                    messagebox.showwarning("Warnung", "Bitte wählen Sie mindestens einen Teilnehmer aus.")
+                    return
+                if not messagebox.askyesno("Checkout bestätigen", f"{len(namen)} Teilnehmer auschecken und Kontostände auf 0 setzen?"):
+                    return
+                try:
+                    auszahlungen = batch_checkout(db, namen)
+                    text = schreibe_auszahlungsliste(auszahlungen, f"Auszahlungsliste_{datetime.now():%Y%m%d_%H%M%S}.txt")
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Sammel-Checkout: {e}")
+                    return
+
+                liste_window = tk.Toplevel()
+                liste_window.title("Auszahlungsliste")
+                liste_window.geometry("640x540")
+                liste_text = tk.Text(liste_window, font=("Courier", 10))
+                liste_text.insert("1.0", text)
+                liste_text.config(state="disabled")
+                liste_text.pack(expand=1, fill="both")
+
+            teilnehmer_listbox = tk.Listbox(tab, selectmode=tk.EXTENDED, height=15)
+            teilnehmer_listbox.grid(row=0, column=0, rowspan=4, padx=10, pady=5, sticky='nsew')
+            scrollbar = ttk.Scrollbar(tab, orient="vertical", command=teilnehmer_listbox.yview)
+            scrollbar.grid(row=0, column=1, rowspan=4, sticky='ns')
+            teilnehmer_listbox.config(yscrollcommand=scrollbar.set)
+
+            alle_button = ttk.Button(tab, text="Alle auswählen", command=lambda: teilnehmer_listbox.select_set(0, tk.END))
+            alle_button.grid(row=0, column=2, padx=10, pady=5)
+            aktualisieren_button = ttk.Button(tab, text="Aktualisieren", command=update_liste)
+            aktualisieren_button.grid(row=1, column=2, padx=10, pady=5)
+            def kontoauszuege_erstellen():
+                try:
+                    sammeldatei = erstelle_kontoauszuege(db)
+                    messagebox.showinfo("Kontoauszüge", f"Kontoauszüge erstellt:\n{sammeldatei}")
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Erstellen der Kontoauszüge: {e}")
+
+            checkout_button = ttk.Button(tab, text="Checkout durchführen", command=checkout_durchfuehren)
+            checkout_button.grid(row=2, column=2, padx=10, pady=5)
+            auszuege_button = ttk.Button(tab, text="Kontoauszüge für alle erstellen", command=kontoauszuege_erstellen)
+            auszuege_button.grid(row=3, column=2, padx=10, pady=5)
+            update_liste()
+            db.bus.abonnieren(lambda art, daten: update_liste(), *TEILNEHMER_EREIGNISSE, TEILNEHMER_AUSGECHECKT, DATENBANK_GEAENDERT)
+
+        def transaktionsverlauf_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Transaktionsverlauf...")
+            verlauf = {"k_id": None, "nach": None, "fertig": True}
+
+            def naechste_seite():
+                if verlauf["fertig"] or verlauf["k_id"] is None:
+                    return
+                try:
+                    seite = fetch_transactions(db, verlauf["k_id"], verlauf["nach"])
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Laden des Verlaufs: {e}")
+                    return
+                for trans_id, datum, typ, beschreibung, menge, preis, betrag in seite:
+                    tree.insert("", "end", values=(datum, typ, beschreibung or "", menge,
+                                                   f"{preis:.2f}" if preis is not None else "",
+                                                   f"{betrag:.2f}" if betrag is not None else ""))
+                if seite:
+                    verlauf["nach"] = (seite[-1][1], seite[-1][0])  # Schlüssel der letzten Zeile für die nächste Seite
+                verlauf["fertig"] = len(seite) < VERLAUF_SEITENGROESSE
+
+            def verlauf_anzeigen():
+                user = user_combobox.get()
+                konto = db.execute_select("SELECT Konto.K_ID FROM Konto JOIN Teilnehmer ON Konto.T_ID = Teilnehmer.T_ID WHERE Teilnehmer.Name = ?", (user,))
+                if not konto:
+                    messagebox.showerror("Fehler", "Benutzer nicht gefunden!")
+                    return
+                tree.delete(*tree.get_children())
+                verlauf.update(k_id=konto[0][0], nach=None, fertig=False)
+                naechste_seite()
+
+            def beim_scrollen(erster, letzter):
+                scrollbar.set(erster, letzter)
+                if float(letzter) > 0.9:  # Nachladen, sobald das Ende der geladenen Zeilen sichtbar wird
+                    naechste_seite()
+
+            user_label = ttk.Label(tab, text="Benutzer auswählen:")
+            user_label.grid(row=0, column=0, padx=10, pady=5)
+            user_combobox = ttk.Combobox(tab)
+            user_combobox.grid(row=0, column=1, padx=10, pady=5)
+            aktiviere_user_typeahead(user_combobox, db)
+            anzeigen_button = ttk.Button(tab, text="Verlauf anzeigen", command=verlauf_anzeigen)
+            anzeigen_button.grid(row=0, column=2, padx=10, pady=5)
+
+            spalten = ("Datum", "Typ", "Produkt", "Menge", "Preis_€", "Betrag_€")
+            tree = ttk.Treeview(tab, columns=spalten, show="headings", height=15)
+            for col in spalten:
+                tree.heading(col, text=col)
+                tree.column(col, anchor="center")
+            tree.grid(row=1, column=0, columnspan=3, sticky='nsew')
+            scrollbar = ttk.Scrollbar(tab, orient="vertical", command=tree.yview)
+            scrollbar.grid(row=1, column=3, sticky='ns')
+            tree.config(yscrollcommand=beim_scrollen)
+            tab.grid_rowconfigure(1, weight=1)
+            tab.grid_columnconfigure(1, weight=1)
+
+        def kontenpruefung_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Kontenprüfung...")
+            def pruefen(inkrementell: bool):
+                try:
+                    ergebnis = pruefe_konten(db, inkrementell)
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler bei der Kontenprüfung: {e}")
+                    return
+                tree.delete(*tree.get_children())
+                for k_id, name, kontostand, erwartet, differenz in ergebnis["abweichungen"]:
+                    tree.insert("", "end", values=(k_id, name or "(kein Teilnehmer)", f"{kontostand:.2f}", f"{erwartet:.2f}", f"{differenz:+.2f}"))
+                zusammenfassung_label.config(text=(
+                    f"{ergebnis['konten']} Konten geprüft, {len(ergebnis['abweichungen'])} Abweichungen\n"
+                    f"Verwaiste Transaktionen: {len(ergebnis['verwaiste_transaktionen'])}   "
+                    f"Verwaiste Konten: {len(ergebnis['verwaiste_konten'])}   "
+                    f"Käufe ohne Produkt: {len(ergebnis['kaeufe_ohne_produkt'])}"))
+
+            voll_button = ttk.Button(tab, text="Vollständig prüfen", command=lambda: pruefen(False))
+            voll_button.grid(row=0, column=0, padx=10, pady=5)
+            inkrementell_button = ttk.Button(tab, text="Seit letzter Prüfung prüfen", command=lambda: pruefen(True))
+            inkrementell_button.grid(row=0, column=1, padx=10, pady=5)
+            zusammenfassung_label = ttk.Label(tab, text="")
+            zusammenfassung_label.grid(row=1, column=0, columnspan=3, padx=10, pady=5)
+
+            spalten = ("K_ID", "Name", "Kontostand_€", "Erwartet_€", "Differenz_€")
+            tree = ttk.Treeview(tab, columns=spalten, show="headings")
+            for col in spalten:
+                tree.heading(col, text=col)
+                tree.column(col, anchor="center")
+            tree.grid(row=2, column=0, columnspan=3, sticky='nsew')
+            tab.grid_rowconfigure(2, weight=1)
+            tab.grid_columnconfigure(2, weight=1)
+
         def fetch_participants(db):
             query = '''
                 SELECT T_ID FROM Teilnehmer
@@ -1007,8 +3280,8 @@ def create_admin_tab(tab: tk.Frame, db: Database):
 
         def calculate_future_expenses(participant_id, current_date, db):
             # Summe der bisherigen Ausgaben des Teilnehmers berechnen
-            query = '''
-                SELECT SUM(P.Preis * T.Menge) AS TotalSpent
+            query = f'''
+                SELECT SUM({PREIS_SQL} * T.Menge) AS TotalSpent
                 FROM Transaktion T
                 JOIN Produkt P ON T.P_ID = P.P_ID
                 JOIN Konto K ON T.K_ID = K.K_ID
@@ -1019,8 +3292,8 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             total_spent = result[0][0] if result[0][0] is not None else 0
 
             # Tägliche Ausgaben berechnen
-            query = '''
-                SELECT DATE(T.Datum) AS TransDate, SUM(P.Preis * T.Menge) AS DailySpent
+            query = f'''
+                SELECT DATE(T.Datum) AS TransDate, SUM({PREIS_SQL} * T.Menge) AS DailySpent
                 FROM Transaktion T
                 JOIN Produkt P ON T.P_ID = P.P_ID
                 JOIN Konto K ON T.K_ID = K.K_ID
@@ -1038,27 +3311,13 @@ def create_admin_tab(tab: tk.Frame, db: Database):
                 avg_daily_expense = sum(daily_expenses) / num_days
 
             # Zukünftige geschätzte Ausgaben bis zum Ende des Lagers
-            # Berechne das Enddatum des Lagers
-            query = '''
-                SELECT Wert
-                FROM Einstellungen
-                WHERE Name = 'Lagerdauer'
-            '''
-            result = db.execute_select(query)
-            lager_dauer = int(result[0][0])
-
-            query = '''
-                SELECT Wert
-                FROM Einstellungen
-                WHERE Name = 'ErsterTag'
-            '''
-            result = db.execute_select(query)
-            erster_tag = datetime.strptime(result[0][0], '%Y-%m-%d').date()
-
-            last_day = erster_tag + timedelta(days=lager_dauer)
+            # Enddatum aus den zwischengespeicherten Einstellungen, ohne eigene Abfrage
+            last_day = get_einstellungen(db).letzter_tag
+            if last_day is None:
+                return total_spent, 0  # Ohne eingetragenen ersten Tag lässt sich nichts hochrechnen
 
             # Berechne die verbleibenden Tage bis zum letzten Tag des Lagers
-            days_remaining = (last_day - current_date).days
+            days_remaining = max((last_day - current_date).days, 0)
             future_expenses_estimate = avg_daily_expense * days_remaining
 
             return total_spent, future_expenses_estimate
@@ -1126,42 +3385,141 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             check_button = ttk.Button(tab, text="Guthaben überprüfen", command=update_labels)
             check_button.grid(row=5, column=0, columnspan=2, padx=10, pady=10)
 
-        def create_Einstellungen_tab(tab, db):
-            def set_lager_dauer():
+        def budget_simulation_tab(tab: tk.Frame, db: Database):
+            print("Erstelle Tab für Budget-Simulation...")
+            ALLE = "(alle Produkte)"
+            simulation = {"daten": None}  # Einmal geladene Arrays, bis sich Konten, Produkte oder Einstellungen ändern
+
+            def daten() -> Budgetsimulation:
+                if simulation["daten"] is None:
+                    simulation["daten"] = Budgetsimulation(db)
+                    produkt_combobox['values'] = [ALLE] + simulation["daten"].produkte
+                return simulation["daten"]
+
+            def verwerfen(art=None, daten=None):
+                simulation["daten"] = None
+
+            produkt_label = ttk.Label(tab, text="Produkt:")
+            produkt_label.grid(row=0, column=0, padx=10, pady=5, sticky='w')
+            produkt_var = StringVar(value=ALLE)
+            produkt_combobox = ttk.Combobox(tab, textvariable=produkt_var, state="readonly", width=30)
+            produkt_combobox.grid(row=0, column=1, padx=10, pady=5, sticky='w')
+            preis_label = ttk.Label(tab, text="Preisänderung (€):")
+            preis_label.grid(row=1, column=0, padx=10, pady=5, sticky='w')
+            preis_entry = ttk.Entry(tab, width=10)
+            preis_entry.insert(0, "0.20")
+            preis_entry.grid(row=1, column=1, padx=10, pady=5, sticky='w')
+            tage_label = ttk.Label(tab, text="Zusätzliche Lagertage:")
+            tage_label.grid(row=2, column=0, padx=10, pady=5, sticky='w')
+            tage_entry = ttk.Entry(tab, width=10)
+            tage_entry.insert(0, "0")
+            tage_entry.grid(row=2, column=1, padx=10, pady=5, sticky='w')
+            ergebnis_label = ttk.Label(tab, text="", justify="left")
+            ergebnis_label.grid(row=3, column=0, columnspan=3, padx=10, pady=5, sticky='w')
+            bild_label = ttk.Label(tab)
+            bild_label.grid(row=4, column=0, columnspan=3, padx=10, pady=5)
+
+            spalten = ["Preisänderung"] + [f"+{tage} Tage" for tage in SIMULATION_ZUSATZTAGE]
+            raster_tree = ttk.Treeview(tab, columns=spalten, show="headings", height=len(SIMULATION_PREISSCHRITTE))
+            for spalte in spalten:
+                raster_tree.heading(spalte, text=spalte)
+                raster_tree.column(spalte, anchor="center", width=90)
+            raster_tree.grid(row=0, column=3, rowspan=5, padx=10, pady=5, sticky='n')
+
+            def berechnen():
+                try:
+                    betrag = float(preis_entry.get().strip().replace(",", ".") or 0)
+                    zusatztage = int(tage_entry.get().strip() or 0)
+                except ValueError:
+                    messagebox.showerror("Fehler", "Ungültige Eingabe!")
+                    return
                 try:
-                    lager_dauer = int(lager_dauer_entry.get())
-                    print(f"Lagerdauer: {lager_dauer}")
-                    db.execute_update("UPDATE Einstellungen SET Wert = ? WHERE Name = 'Lagerdauer'", (lager_dauer,))
-                    print("Lagerdauer erfolgreich aktualisiert.")
+                    sim = daten()
+                    produkt = None if produkt_var.get() == ALLE else produkt_var.get()
+                    start = perf_counter()
+                    endstaende = sim.endkontostaende(sim.preisaenderung(produkt, betrag), zusatztage)[0]
+                    raster = sim.raster(produkt)
+                    dauer_ms = (perf_counter() - start) * 1000
                 except Exception as e:
-                    print(f"Fehler beim Aktualisieren der Lagerdauer: {e}")
+                    messagebox.showerror("Fehler", f"Fehler bei der Simulation: {e}")
+                    return
+                im_minus = int((endstaende < 0).sum())
+                ergebnis_label.config(text=(
+                    f"{im_minus} von {len(endstaende)} Teilnehmern am Lagerende im Minus "
+                    f"(Summe {-endstaende[endstaende < 0].sum():.2f} €)\n"
+                    f"Median {np.median(endstaende) if len(endstaende) else 0:.2f} €, "
+                    f"niedrigster {endstaende.min() if len(endstaende) else 0:.2f} € · "
+                    f"{sim.rest_tage} + {zusatztage} Resttage · {raster.size + 1} Szenarien in {dauer_ms:.1f} ms"))
+                bild = tk.PhotoImage(data=render_endkontostaende(endstaende, f"{produkt or 'Alle Produkte'} {betrag:+.2f} €, +{zusatztage} Tage"))
+                bild_label.config(image=bild)
+                bild_label.image = bild  # Referenz halten, sonst räumt Tk das Bild ab
+                raster_tree.delete(*raster_tree.get_children())
+                for schritt, zeile in zip(SIMULATION_PREISSCHRITTE, raster):
+                    raster_tree.insert("", "end", values=[f"{schritt:+.2f} €"] + [int(anzahl) for anzahl in zeile])
+
+            berechnen_button = ttk.Button(tab, text="Berechnen", command=berechnen)
+            berechnen_button.grid(row=1, column=2, padx=10, pady=5)
+            db.bus.abonnieren(verwerfen, KONTOSTAND_GEAENDERT, TABELLE_GEAENDERT, *TEILNEHMER_EREIGNISSE, TEILNEHMER_AUSGECHECKT,
+                              *PRODUKT_EREIGNISSE, EINSTELLUNG_GEAENDERT, DATENBANK_GEAENDERT)
+            try:
+                daten()
+            except Exception as e:
+                print(f"Budget-Simulation nicht geladen: {e}")
 
-            def set_first_Day():
+        def create_Einstellungen_tab(tab, db):
+            eingaben = {}
+            for zeile, (name, (typ, standard, minimum, beschriftung)) in enumerate(EINSTELLUNGEN.items()):
+                label = ttk.Label(tab, text=beschriftung + ":")
+                label.grid(row=zeile, column=0, padx=10, pady=5, sticky="w")
+                entry = ttk.Entry(tab)
+                entry.grid(row=zeile, column=1, padx=10, pady=5)
+                eingaben[name] = entry
+
+            def anzeigen(art=None, daten=None):
+                werte = get_einstellungen(db)
+                for name, entry in eingaben.items():
+                    entry.delete(0, tk.END)
+                    entry.insert(0, einstellung_als_text(name, getattr(werte, name)))
+
+            def speichern():
+                # Erst alle Eingaben prüfen, damit nicht nur ein Teil gespeichert wird
+                fehler = []
+                for name, entry in eingaben.items():
+                    try:
+                        einstellung_lesen(name, entry.get())
+                    except ValueError as e:
+                        fehler.append(f"{EINSTELLUNGEN[name][3]}: {e}")
+                if fehler:
+                    messagebox.showerror("Fehler", "Ungültige Einstellungen:\n" + "\n".join(fehler))
+                    return
                 try:
-                    first_day = first_day_entry.get()
-                    print(f"Erster Tag: {first_day}")
-                    db.execute_update("UPDATE Einstellungen SET Wert = ? WHERE Name = 'ErsterTag'", (first_day,))
-                    print("Erster Tag erfolgreich aktualisiert.")
+                    werte = get_einstellungen(db)
+                    for name, entry in eingaben.items():
+                        if entry.get().strip() != einstellung_als_text(name, getattr(werte, name)):
+                            setze_einstellung(db, name, entry.get())
+                    print("Einstellungen erfolgreich aktualisiert.")
                 except Exception as e:
-                    print(f"Fehler beim Aktualisieren des ersten Tags: {e}")
+                    messagebox.showerror("Fehler", f"Fehler beim Speichern der Einstellungen: {e}")
+                anzeigen()
 
-            # First Day Widgets
-            first_day_label = ttk.Label(tab, text="Erster Tag:")
-            first_day_label.grid(row=0, column=0, padx=10, pady=10)
-            first_day_entry = ttk.Entry(tab)
-            first_day_entry.grid(row=0, column=1, padx=10, pady=10)
-
-            # Lager Dauer Widgets
-            lager_dauer_label = ttk.Label(tab, text="Lagerdauer (Tage):")
-            lager_dauer_label.grid(row=1, column=0, padx=10, pady=10)
-            lager_dauer_entry = ttk.Entry(tab)
-            lager_dauer_entry.grid(row=1, column=1, padx=10, pady=10)
+            def einmessen():
+                kamera = get_einstellungen(db).Kamera
+                try:
+                    profil, ergebnisse = kamera_einmessen(kamera)
+                except Exception as e:
+                    messagebox.showerror("Fehler", f"Fehler beim Einmessen der Kamera: {e}")
+                    return
+                zeilen = [f"{e['fourcc']} {e['breite']}x{e['hoehe']}: {e['gemessen_fps']:.1f} Bilder/s" for e in ergebnisse]
+                messagebox.showinfo("Kamera eingemessen", f"{kamera_kennung(kamera)}\n" + "\n".join(zeilen) +
+                                    f"\n\nGewählt: {profil['fourcc']} {profil['breite']}x{profil['hoehe']}")
 
-            # Submit Button
-            submit_button = ttk.Button(tab, text="Submit", command=lambda: [set_lager_dauer(), set_first_Day()])
-            submit_button.grid(row=2, column=0, columnspan=2, padx=10, pady=10)
+            submit_button = ttk.Button(tab, text="Speichern", command=speichern)
+            submit_button.grid(row=len(EINSTELLUNGEN), column=0, columnspan=2, padx=10, pady=10)
+            einmessen_button = ttk.Button(tab, text="Kamera einmessen", command=einmessen)
+            einmessen_button.grid(row=len(EINSTELLUNGEN) + 1, column=0, columnspan=2, padx=10, pady=5)
+            db.bus.abonnieren(anzeigen, EINSTELLUNG_GEAENDERT, DATENBANK_GEAENDERT)
+            anzeigen()
 
-        
         def create_inner_tab(parent, name, command):
             inner_tab = ttk.Frame(parent)
             command(inner_tab, db) 
@@ -1170,7 +3528,12 @@ def create_admin_tab(tab: tk.Frame, db: Database):
         def create_tabs(tab_control):
             create_inner_tab(tab_control, "Einstellungen", create_Einstellungen_tab)
             create_inner_tab(tab_control, "Kaufstatistik", create_kaufstatistik_tab)
+            create_inner_tab(tab_control, "Verkaufsanalyse", verkaufsanalyse_tab)
+            create_inner_tab(tab_control, "Lager", lager_tab)
+            create_inner_tab(tab_control, "Ausgabenlimits", ausgabenlimits_tab)
             create_inner_tab(tab_control, "Ausgabenstatistik", create_ausgaben_statistik_tab)
+            create_inner_tab(tab_control, "Budget-Simulation", budget_simulation_tab)
+            create_inner_tab(tab_control, "Verlauf", transaktionsverlauf_tab)
             create_inner_tab(tab_control, "Geld aufteilen", Kontostand_aufteilen)
             create_inner_tab(tab_control, "Nutzer hinzufügen", add_user) 
             create_inner_tab(tab_control, "Einzahlung hinzufügen", add_fund) 
@@ -1178,12 +3541,17 @@ def create_admin_tab(tab: tk.Frame, db: Database):
             create_inner_tab(tab_control, "Nutzer bearbeiten", edit_users) 
             create_inner_tab(tab_control, "Produkt hinzufügen", add_product)
             create_inner_tab(tab_control, "Produktpreise bearbeiten", edit_product_prices)
+            create_inner_tab(tab_control, "Preisperioden", preisperioden_tab)
             create_inner_tab(tab_control, "Barcode hinzufügen", add_barcode_to_product)
             create_inner_tab(tab_control, "Nutzer löschen", delete_user_tab)
             create_inner_tab(tab_control, "Produkt löschen", delete_product_tab)
             create_inner_tab(tab_control, "Checkout", checkout)
+            create_inner_tab(tab_control, "Sammel-Checkout", sammel_checkout)
             create_inner_tab(tab_control, "Barcode",create_Barcode_tab)
             create_inner_tab(tab_control, "Backup", run_backup_tab)  
+            create_inner_tab(tab_control, "Kontenprüfung", kontenpruefung_tab)
+            create_inner_tab(tab_control, "Jahreswechsel", jahreswechsel_tab)
+            create_inner_tab(tab_control, "Diagnose", diagnose_tab)
             create_inner_tab(tab_control, "Datenbank löschen", delete_database_tab)
         
         create_tabs(tab_control)
@@ -1199,17 +3567,195 @@ def create_admin_tab(tab: tk.Frame, db: Database):
     login_button = ttk.Button(login_frame, text="Einloggen", command=login)
     login_button.grid(row=1, column=0, columnspan=2, padx=10, pady=5)
 
+##### Kontoanzeige #####
+
+ANZEIGE_DAUER_MS = 8000  # So lange bleibt ein abgefragter Kontostand sichtbar
+ANZEIGE_KAMERA_MS = 100  # Wie oft die Kamera der Kontoanzeige auf neue Barcodes geprüft wird
+
+KONTOANZEIGE_SQL = """SELECT Teilnehmer.TN_Barcode, Teilnehmer.Name, ROUND(Konto.Kontostand, 2)
+                      FROM Teilnehmer JOIN Konto ON Konto.T_ID = Teilnehmer.T_ID"""
+
+class Kontoanzeige:
+    # Öffentliche Guthabenanzeige als eigener Prozess mit nur lesender Verbindung. Die Kontostände liegen im Speicher
+    # und werden nur neu gelesen, wenn sich PRAGMA data_version ändert; ein Scan selbst kostet keine Abfrage.
+    def __init__(self, db: Database):
+        self.db = db
+        self.konten = {}  # TN_Barcode -> (Name, Kontostand)
+        self._eingabe = ""
+        self._ausblenden = None
+        self.scanner = None
+        self.root = tk.Tk()
+        self.root.title("Kontostand")
+        self.root.attributes("-fullscreen", True)
+        self.root.bind("<Escape>", lambda event: self.root.attributes("-fullscreen", False))
+        self.root.bind("<Key>", self.taste)  # Handscanner arbeiten als Tastatur und schließen mit Enter ab
+        tk.Label(self.root, text="Karte scannen, um dein Guthaben zu sehen", font=("Helvetica", 28)).pack(pady=40)
+        self.name_label = tk.Label(self.root, text="", font=("Helvetica", 48, "bold"))
+        self.name_label.pack(pady=20)
+        self.betrag_label = tk.Label(self.root, text="", font=("Helvetica", 120, "bold"))
+        self.betrag_label.pack(expand=True)
+        self.stand_label = tk.Label(self.root, text="", font=("Helvetica", 14))
+        self.stand_label.pack(side="bottom", pady=10)
+        db.bus.abonnieren(lambda art, daten: self.aktualisieren(), DATENBANK_GEAENDERT)
+
+    def aktualisieren(self):
+        self.konten = {barcode: (name, kontostand) for barcode, name, kontostand in self.db.execute_select(KONTOANZEIGE_SQL)}
+        self.stand_label.config(text=f"Stand: {datetime.now():%H:%M:%S} · {len(self.konten)} Konten")
+
+    def taste(self, event):
+        if event.keysym == "Return":
+            barcode, self._eingabe = self._eingabe.strip(), ""
+            if barcode:
+                self.zeigen(barcode)
+        elif event.char and event.char.isprintable():
+            self._eingabe += event.char
+
+    def zeigen(self, barcode: str):
+        konto = self.konten.get(Barcode_Nummern.normalisieren(barcode))
+        if konto is None:
+            self.name_label.config(text="Karte unbekannt")
+            self.betrag_label.config(text="", fg="black")
+        else:
+            name, kontostand = konto
+            self.name_label.config(text=name)
+            self.betrag_label.config(text=f"{kontostand:.2f} €", fg="red" if kontostand < 0 else "dark green")
+        if self._ausblenden is not None:
+            self.root.after_cancel(self._ausblenden)
+        self._ausblenden = self.root.after(ANZEIGE_DAUER_MS, self.leeren)
+
+    def leeren(self):
+        self._ausblenden = None
+        self.name_label.config(text="")
+        self.betrag_label.config(text="")
+
+    def pruefe_externe_aenderungen(self):
+        try:
+            self.db.pruefe_externe_aenderungen()  # Liest nur neu, wenn eine Kasse geschrieben hat
+        except Exception as e:
+            print(f"Fehler beim Prüfen auf Änderungen: {e}")
+        self.root.after(AENDERUNGS_PRUEFINTERVALL_MS, self.pruefe_externe_aenderungen)
+
+    def kamera_abfragen(self):
+        try:
+            while self.scanner.verbindung.poll():
+                art, wert = self.scanner.verbindung.recv()
+                if art == "barcode":
+                    self.zeigen(wert)
+                elif art == "fehler":
+                    print(f"Kamera der Kontoanzeige: {wert}")
+        except (EOFError, OSError) as e:
+            print(f"Kamera der Kontoanzeige beendet: {e}")
+            return
+        self.root.after(ANZEIGE_KAMERA_MS, self.kamera_abfragen)
+
+    def run(self):
+        try:
+            kamera = get_einstellungen(self.db).AnzeigeKamera
+        except sqlite3.Error:
+            kamera = _einstellungen.aktuell().AnzeigeKamera  # Ältere Datenbank ohne Einstellungen
+        if kamera >= 0:
+            self.scanner = ScannerProzess(kamera=kamera)  # Zweite Kamera, getrennt vom Scanner der Kasse
+            self.root.after(ANZEIGE_KAMERA_MS, self.kamera_abfragen)
+        self.aktualisieren()
+        self.root.after(AENDERUNGS_PRUEFINTERVALL_MS, self.pruefe_externe_aenderungen)
+        try:
+            self.root.mainloop()
+        finally:
+            if self.scanner is not None:
+                self.scanner.beenden()
+
+def starte_kontoanzeige():
+    # Eigener Prozess, damit die Anzeige weder GIL noch Tk-Hauptschleife mit der Kasse teilt
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--anzeige"])
+
 ##### Main Function #####
 
 def main():
+    global _kiosk_client, _kauf_spool
+    parser = argparse.ArgumentParser(description="BuLa Online Banking")
+    parser.add_argument("--server", metavar="HOST", nargs="?", const="127.0.0.1", help="Als Kassenserver laufen (Standard: nur localhost)")
+    parser.add_argument("--kasse", metavar="HOST", help="Kauf-Tab als Kasse gegen den Kassenserver auf HOST betreiben")
+    parser.add_argument("--port", type=int, default=KIOSK_PORT, help="Port des Kassenservers")
+    parser.add_argument("--export", metavar="PRAEFIX", help="Transaktionen und Kontostände exportieren und beenden")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Format für --export")
+    parser.add_argument("--seit", type=int, default=0, metavar="TRANS_ID", help="Nur Transaktionen nach dieser TRANS_ID exportieren")
+    parser.add_argument("--inkrementell", action="store_true", help="Nur Transaktionen seit dem letzten Export im selben Format exportieren")
+    parser.add_argument("--jahreswechsel", action="store_true", help="Laufendes Lagerjahr archivieren, neues Kassenbuch beginnen und beenden")
+    parser.add_argument("--wartung", action="store_true", help="Vollständige Datenbankwartung ausführen und beenden")
+    parser.add_argument("--kamera-einmessen", type=int, metavar="INDEX", help="Aufnahmemodi der Kamera testen, bestes Profil speichern und beenden")
+    parser.add_argument("--anzeige", action="store_true", help="Öffentliche Kontoanzeige mit nur lesendem Datenbankzugriff starten")
+    args = parser.parse_args()
+
+    if args.kasse:
+        # Kasse ohne eigene Datenbankverbindung: nur der Kauf-Tab
+        _kiosk_client = KioskClient(args.kasse, args.port)
+        gui = MultitabGUI(None)
+        gui.add_tab_with_content("Kauf", create_scan_only_tab)
+        try:
+            gui.run()
+        finally:
+            stop_scanner_prozess()
+        return
+
+    if args.kamera_einmessen is not None:
+        profil, ergebnisse = kamera_einmessen(args.kamera_einmessen)
+        for ergebnis in ergebnisse:
+            print(f"{ergebnis['fourcc']} {ergebnis['breite']}x{ergebnis['hoehe']}: {ergebnis['gemessen_fps']:.1f} Bilder/s")
+        return
+
+    if args.anzeige:
+        # Legt die Datenbank nicht an und schreibt nie; läuft neben Kasse oder Kassenserver
+        try:
+            db = Database(nur_lesen=True)
+        except sqlite3.Error as e:
+            print(f"Kontoanzeige: Datenbank {DB_NAME} kann nicht geöffnet werden: {e}")
+            return
+        with db:
+            Kontoanzeige(db).run()
+        return
+
     os.system("python3 02_DB_erstellen.py")
+
+    if args.export:
+        # Erst nach dem Schema-Schritt, damit Export_Stand auch in älteren Datenbanken existiert
+        with Database() as db:
+            exportiere_kassenbuch(db, args.export, args.format, None if args.inkrementell else args.seit)
+        return
+
+    if args.jahreswechsel:
+        with Database() as db:
+            jahreswechsel(db)
+        return
+
+    if args.wartung:
+        with Database() as db:
+            Datenbankwartung(db).alles()
+        return
+
+    if args.server:
+        with Database() as db:
+            abonniere_such_indizes(db.bus)  # Für die Namen im Bestätigungsdialog der Kassen
+            abonniere_einstellungen(db)
+            abonniere_ausgabenlimits(db)
+            try:
+                asyncio.run(KioskServer(db, args.server, args.port).starten())
+            except KeyboardInterrupt:
+                print("Kassenserver beendet.")
+        return
     
     with Database() as db:
+        abonniere_einstellungen(db)
+        abonniere_ausgabenlimits(db)
+        _kauf_spool = KaufSpool()  # Nimmt Scans an, wenn die Datenbank gesperrt ist
         gui = MultitabGUI(db)
         gui.add_tab_with_content("Kauf", create_scan_only_tab)
         gui.add_tab_with_content("Überwachung", create_watch_tab)
         gui.add_tab_with_content("Admin",create_admin_tab)
-        gui.run()
+        try:
+            gui.run()
+        finally:
+            stop_scanner_prozess()  # Beendet den Scanner-Prozess und gibt den Shared Memory frei
+            _kauf_spool.beenden()
 
 if __name__ == "__main__":
     main()
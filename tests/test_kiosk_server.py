@@ -0,0 +1,62 @@
+# Tests für die gebündelten Schreibvorgänge des Kassenservers
+import os
+import runpy
+import sqlite3
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import Kassenbuch  # noqa: E402  # Ohne Kamera- und GUI-Abhängigkeiten importierbar
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # DB_NAME ist relativ zum Arbeitsverzeichnis
+    runpy.run_path(os.path.join(REPO, "02_DB_erstellen.py"))
+    Kassenbuch._ausgabenlimits.ungueltig()
+    Kassenbuch._einstellungen.ungueltig()
+    datenbank = Kassenbuch.Database()
+    cursor = datenbank.cursor
+    cursor.execute("INSERT INTO Teilnehmer (Name, TN_Barcode, Checkout) VALUES ('Anna', '100017', 0)")
+    cursor.execute("INSERT INTO Konto (Einzahlung, Kontostand, Eröffnungsdatum, T_ID) VALUES (20, 20, CURRENT_TIMESTAMP, ?)", (cursor.lastrowid,))
+    cursor.execute("INSERT INTO Produkt (Beschreibung, P_Barcode, Preis, Anzahl_verkauft) VALUES ('Cola', '200014', 1.5, 0)")
+    datenbank.connection.commit()
+    yield datenbank
+    datenbank.connection.close()
+
+
+def commits_zaehlen(datenbank):
+    befehle = []
+    datenbank.connection.set_trace_callback(befehle.append)
+    return befehle
+
+
+def test_batch_wird_in_einem_commit_geschrieben(db):
+    befehle = commits_zaehlen(db)
+    anfragen = [{"op": "kauf", "tn_barcode": "100017", "p_barcode": "200014", "schluessel": f"k{i}"} for i in range(3)]
+
+    antworten = Kassenbuch.batch_buchen(db, anfragen)
+
+    assert all(antwort["ok"] for antwort in antworten)
+    assert sum(befehl.strip().upper() == "COMMIT" for befehl in befehle) == 1
+    assert db.execute_select("SELECT COUNT(*) FROM Transaktion WHERE Typ = 'Kauf'")[0][0] == 3
+
+
+def test_fehlerhafte_anfrage_laesst_den_rest_des_batches_stehen(db):
+    anfragen = [
+        {"op": "kauf", "tn_barcode": "100017", "p_barcode": "200014", "schluessel": "a"},
+        {"op": "korb", "tn_barcode": "100017", "positionen": 5, "schluessel": "b"},  # TypeError beim Entpacken
+        {"op": "kauf", "tn_barcode": "999999", "p_barcode": "200014", "schluessel": "c"},  # Unbekannter Teilnehmer
+        {"op": "korb", "tn_barcode": "100017", "positionen": [["200014", 2]], "schluessel": "d"},
+    ]
+
+    antworten = Kassenbuch.batch_buchen(db, anfragen)
+
+    assert [antwort["ok"] for antwort in antworten] == [True, False, False, True]
+    assert db.execute_select("SELECT SUM(Menge) FROM Transaktion WHERE Typ = 'Kauf'")[0][0] == 3
+    assert db.execute_select("SELECT ROUND(Kontostand, 2) FROM Konto")[0][0] == 15.5
+    gespeichert = sqlite3.connect(Kassenbuch.DB_NAME).execute("SELECT Schluessel FROM Kiosk_Anfrage ORDER BY Schluessel").fetchall()
+    assert gespeichert == [("a",), ("d",)]